@@ -0,0 +1,85 @@
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, Response
+from fastapi.concurrency import run_in_threadpool
+from async_fetch import aload_quotations
+from serialization import dumps
+from evaluate_ai import evaluate_requirement
+from database import fetch_latest_evaluation, close_pool
+from config import API_WORKERS, API_JOB_HISTORY
+from jobs import EvaluationJobs
+import metrics
+
+def _evaluate(req_id):
+    with metrics.span("procurement.run", req_id=req_id, mode="api"):
+        report = evaluate_requirement(req_id)
+    return {
+        "req_id": report.req_id,
+        "run_id": report.run_id,
+        "vendors": [vendor.model_dump() for vendor in report.vendors],
+    }
+
+# Evaluations run on their own worker pool so request handlers return immediately
+jobs = EvaluationJobs(_evaluate, max_workers=API_WORKERS, history=API_JOB_HISTORY)
+
+@asynccontextmanager
+async def _lifespan(app):
+    yield
+    # Stop taking jobs and release the pooled database connections
+    jobs.shutdown(wait=False)
+    close_pool()
+
+app = FastAPI(title="Procurement Evaluation API", lifespan=_lifespan)
+
+@app.post("/requirements/{req_id}/evaluate", status_code=202)
+async def evaluate(req_id: int):
+    """
+    Start an evaluation of a requirement as a background job.
+
+    A request for a requirement that is already being evaluated returns the running job
+    (`coalesced: true`) instead of starting a second evaluation.
+    """
+    job, coalesced = jobs.submit(req_id)
+    return {"job_id": job["job_id"], "req_id": req_id, "status": job["status"], "coalesced": coalesced}
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """Status of an evaluation job: queued, running, done (with its result) or failed (with the error)."""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+    return job
+
+@app.get("/requirements/{req_id}/quotations")
+async def quotations(req_id: int):
+    """Vendor quotations of a requirement grouped by ITEM_ID, as returned by `get_quotations`."""
+    try:
+        result = await aload_quotations(req_id)
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    if "error" in result:
+        # get_quotations prefixes unexpected (database) errors with "Error:"
+        status_code = 500 if result["error"].startswith("Error:") else 404
+        raise HTTPException(status_code=status_code, detail=result["error"])
+    # Encoded once here, with the same datetime format as the tool output
+    return Response(dumps(result), media_type="application/json")
+
+@app.get("/requirements/{req_id}/results")
+async def results(req_id: int):
+    """Most recent stored evaluation of a requirement (see `database.fetch_latest_evaluation`)."""
+    latest = await run_in_threadpool(fetch_latest_evaluation, req_id)
+    if latest is None:
+        job = jobs.in_flight(req_id)
+        detail = f"Requirement {req_id} is being evaluated (job {job['job_id']})." if job else f"No evaluation found for Requirement ID {req_id}."
+        raise HTTPException(status_code=404, detail=detail)
+    return latest
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Stage latencies, LLM token/cost counters and pool usage in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=8000)
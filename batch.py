@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from evaluate_ai import evaluate_and_save
+from database import fetch_procurement_data_bulk, fetch_requirement_ids
+from quotation_set import QuotationSet
+from config import BATCH_CONCURRENCY, BATCH_PREFETCH_SIZE, METRICS_TEXTFILE
+import metrics
+
+def parse_range(text):
+    """Parse an inclusive "START-END" REQ_ID range."""
+    start, _, end = text.partition("-")
+    try:
+        start, end = int(start), int(end or start)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid range: {text}. Expected START-END.")
+    if end < start:
+        raise argparse.ArgumentTypeError(f"Invalid range: {text}. END is before START.")
+    return range(start, end + 1)
+
+def load_checkpoint(path):
+    """
+    Return the REQ_IDs already evaluated successfully in an existing output file.
+
+    Lines cut short by a crash are ignored, so those requirements are evaluated again.
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("status") == "ok":
+                done.add(record["req_id"])
+    return done
+
+def _tool_inputs(req_id, data):
+    # Same shapes as load_requirement_details / load_items / load_quotations return
+    if data is None:
+        return {"error": f"Requirement ID {req_id} not found."}, {"data": []}, {"error": f"Requirement ID {req_id} not found."}
+
+    items = {"data": data["items"]}
+    if not data["quotations"]:
+        return data["requirement"], items, {"error": f"No items found for Requirement ID {req_id}."}
+    return data["requirement"], items, QuotationSet.from_rows(data["quotations"])
+
+def evaluate_one(req_id, data):
+    """
+    Evaluate one prefetched requirement and save the run.
+
+    Returns:
+        dict: JSONL record, `{"req_id", "status": "ok", "run_id", "vendors", "elapsed"}` or
+        `{"req_id", "status": "error", "error", "elapsed"}`.
+    """
+    started = time.perf_counter()
+    try:
+        with metrics.span("procurement.run", req_id=req_id, mode="batch"):
+            report = evaluate_and_save(*_tool_inputs(req_id, data))
+    except Exception as e:
+        return {"req_id": req_id, "status": "error", "error": str(e), "elapsed": round(time.perf_counter() - started, 3)}
+
+    return {
+        "req_id": req_id,
+        "status": "ok",
+        "run_id": report.run_id,
+        "vendors": [vendor.model_dump() for vendor in report.vendors],
+        "elapsed": round(time.perf_counter() - started, 3),
+    }
+
+def run_batch(req_ids, output, concurrency=BATCH_CONCURRENCY, prefetch_size=BATCH_PREFETCH_SIZE, restart=False):
+    """
+    Evaluate many requirements in one run and stream one JSON line per requirement to `output`.
+
+    REQ_IDs are processed in windows of `prefetch_size`: each window is loaded with set-based
+    `IN (...)` queries while the previous one is being evaluated, and its requirements are
+    evaluated `concurrency` at a time (LLM calls are throttled by the shared OpenAI rate limiter).
+    Every record is flushed to disk as soon as it is written, so the output file doubles as a
+    checkpoint: re-running the same command skips requirements that already succeeded.
+
+    Args:
+        req_ids (iterable[int]): Requirement IDs to evaluate.
+        output (str): Path of the JSONL results file.
+        concurrency (int): Requirements evaluated in parallel.
+        prefetch_size (int): REQ_IDs loaded per prefetch.
+        restart (bool): Ignore and overwrite an existing output file instead of resuming it.
+
+    Returns:
+        dict: Counts of evaluated ("ok"), failed ("error") and skipped requirements.
+    """
+    done = set() if restart else load_checkpoint(output)
+    todo = [req_id for req_id in dict.fromkeys(int(req_id) for req_id in req_ids) if req_id not in done]
+    summary = {"ok": 0, "error": 0, "skipped": len(done)}
+    windows = [todo[start:start + prefetch_size] for start in range(0, len(todo), prefetch_size)]
+
+    mode = "w" if restart else "a"
+    with open(output, mode, encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="batch-prefetch") as prefetcher, \
+            ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch-eval") as executor:
+        # Start on a fresh line if the previous run died halfway through writing one
+        if out.tell() and not _ends_with_newline(output):
+            out.write("\n")
+
+        next_data = prefetcher.submit(fetch_procurement_data_bulk, windows[0]) if windows else None
+        for index, window in enumerate(windows):
+            data = next_data.result()
+            if index + 1 < len(windows):
+                next_data = prefetcher.submit(fetch_procurement_data_bulk, windows[index + 1])
+
+            futures = [executor.submit(evaluate_one, req_id, data.get(req_id)) for req_id in window]
+            for future in futures:
+                record = future.result()
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+                os.fsync(out.fileno())
+                summary[record["status"]] += 1
+                print(f"{'✅' if record['status'] == 'ok' else '❌'} REQ_ID {record['req_id']} ({record['elapsed']:.2f}s)")
+
+            if METRICS_TEXTFILE:
+                metrics.write_textfile(METRICS_TEXTFILE)
+
+    return summary
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate vendor quotations for many requirements in one run.")
+    parser.add_argument("req_ids", nargs="*", type=int, help="Requirement IDs (REQ_ID) to evaluate.")
+    parser.add_argument("--range", dest="ranges", action="append", type=parse_range, default=[], metavar="START-END",
+                        help="Inclusive REQ_ID range; may be repeated.")
+    parser.add_argument("--where", help="SQL condition on requirementdetails selecting the requirements, e.g. \"DATE_CREATED >= '2025-01-01'\".")
+    parser.add_argument("--output", default="batch_results.jsonl", help="JSONL results file, also used as the resume checkpoint.")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="Requirements evaluated in parallel.")
+    parser.add_argument("--restart", action="store_true", help="Overwrite the output file instead of resuming from it.")
+    args = parser.parse_args()
+
+    req_ids = list(args.req_ids)
+    for req_range in args.ranges:
+        req_ids.extend(req_range)
+    if args.where:
+        req_ids.extend(fetch_requirement_ids(args.where))
+    if not req_ids:
+        parser.error("Give REQ_IDs, --range or --where.")
+
+    summary = run_batch(req_ids, args.output, concurrency=args.concurrency, restart=args.restart)
+    print(f"Done: {summary['ok']} evaluated, {summary['error']} failed, {summary['skipped']} skipped (already in {args.output}).")
@@ -0,0 +1,220 @@
+"""
+Deterministic fake of the OpenAI chat completions endpoint for the offline benchmarks.
+
+It is served through an `httpx.MockTransport`, so both the evaluator's `openai.OpenAI` client and
+agno's `OpenAIChat` go through their real request/response code. Answers depend only on the
+request, latency is configurable, and token usage is accounted like the real API reports it.
+Streamed requests get server-sent events, and a share of calls can be failed with 429/503 errors.
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+
+_CSV_SECTION = re.compile(r"## Borderline Vendors:\n(.*?)(?:\n\n|\Z)", re.S)
+_MEMBER_NAME = re.compile(r"^\s*-?\s*(?:Agent \d+:\s*)?Name:\s*(.+)$", re.M)
+_REQ_ID = re.compile(r"(?:#|req_id\D{0,3})(\d+)", re.I)
+
+class FakeLLM:
+    """
+    Fake chat completions endpoint.
+
+    - Evaluation prompts get a `{"vendors": [...]}` answer with a score derived from a hash
+      of the vendor ID, so every run returns the same evaluation.
+    - Team leaders (requests offering `transfer_task_to_member`) delegate to each member in
+      turn and then answer with the vendors returned by the last member.
+    - Member agents call their single tool with the requirement ID, then repeat its result.
+    """
+
+    def __init__(self, latency=0.0, latency_per_1k_tokens=0.0, seed=0, error_rate=0.0):
+        """
+        Args:
+            latency (float): Fixed seconds added to every call (before the first streamed chunk).
+            latency_per_1k_tokens (float): Extra seconds per 1000 completion tokens (spread over
+                the chunks of a streamed answer).
+            seed (int): Changes the generated scores and which calls fail.
+            error_rate (float): Share of calls answered with a 429 or 503 error instead.
+        """
+        self.latency = latency
+        self.latency_per_1k_tokens = latency_per_1k_tokens
+        self.seed = seed
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.usage = {"calls": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    # --- Clients ---------------------------------------------------------------
+
+    def http_client(self):
+        """Return an `httpx.Client` whose requests are answered by this fake."""
+        import httpx
+        return httpx.Client(transport=httpx.MockTransport(self.handle))
+
+    def openai_client(self):
+        """Return an `openai.OpenAI` client talking to this fake."""
+        import openai
+        return openai.OpenAI(api_key="fake", base_url="http://fake-openai/v1", http_client=self.http_client(), max_retries=0)
+
+    def chat_model(self, model_id="gpt-4-turbo"):
+        """Return an agno `OpenAIChat` model talking to this fake."""
+        from agno.models.openai import OpenAIChat
+        return OpenAIChat(id=model_id, api_key="fake", base_url="http://fake-openai/v1", http_client=self.http_client())
+
+    # --- Endpoint --------------------------------------------------------------
+
+    def handle(self, request):
+        import httpx
+
+        body = json.loads(request.content)
+        with self._lock:
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.usage["errors"] += 1
+        if failed:
+            time.sleep(self.latency)
+            status = self._random.choice((429, 503))
+            return httpx.Response(status, headers={"retry-after-ms": "10"} if status == 429 else {},
+                                  json={"error": {"message": "Fake error.", "type": "fake", "code": None}})
+
+        message = self._reply(body)
+        prompt_tokens = _tokens(json.dumps(body.get("messages", [])))
+        completion_tokens = _tokens(json.dumps(message))
+        generation_time = self.latency_per_1k_tokens * completion_tokens / 1000
+
+        with self._lock:
+            self.usage["calls"] += 1
+            self.usage["prompt_tokens"] += prompt_tokens
+            self.usage["completion_tokens"] += completion_tokens
+            call = self.usage["calls"]
+
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        finish_reason = "tool_calls" if message.get("tool_calls") else "stop"
+        base = {"id": f"chatcmpl-fake-{call}", "created": 0, "model": body.get("model", "fake")}
+        time.sleep(self.latency)
+
+        if body.get("stream"):
+            include_usage = (body.get("stream_options") or {}).get("include_usage")
+            return httpx.Response(200, headers={"content-type": "text/event-stream"},
+                                  content=_events(base, message, finish_reason, usage if include_usage else None, generation_time))
+
+        time.sleep(generation_time)
+        return httpx.Response(200, json={
+            **base,
+            "object": "chat.completion",
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": usage,
+        })
+
+    def _reply(self, body):
+        messages = body.get("messages", [])
+        tools = [tool["function"]["name"] for tool in body.get("tools") or []]
+        text = "\n".join(_content(m) for m in messages if m.get("role") in ("system", "developer", "user"))
+
+        if "transfer_task_to_member" in tools:
+            return self._leader_reply(messages, text)
+        if tools:
+            return self._member_reply(messages, tools[0], text)
+        return _assistant(json.dumps({"vendors": self._evaluate(text)}))
+
+    def _evaluate(self, prompt):
+        section = _CSV_SECTION.search(prompt)
+        rows = section.group(1).splitlines()[1:] if section else []
+        vendors = []
+        for row in rows:
+            vendor_id = row.split(",", 1)[0].strip()
+            if not vendor_id:
+                continue
+            digest = hashlib.sha256(f"{self.seed}:{vendor_id}".encode()).digest()
+            score = 30 + digest[0] % 61
+            vendors.append({
+                "vendor_id": vendor_id,
+                "score": score,
+                "status": "accepted" if score >= 60 else "rejected",
+                "reason": f"Synthetic evaluation (score {score}).",
+            })
+        return vendors
+
+    def _leader_reply(self, messages, text):
+        members = _MEMBER_NAME.findall(text)
+        transferred = sum(
+            1 for m in messages if m.get("role") == "assistant"
+            for call in m.get("tool_calls") or [] if call["function"]["name"] == "transfer_task_to_member"
+        )
+        req_id = _req_id(text)
+        if transferred < len(members):
+            return _tool_call("transfer_task_to_member", transferred, {
+                "agent_name": members[transferred].strip(),
+                "task_description": f"Handle procurement requirement #{req_id}.",
+                "expected_output": "The tool output.",
+            })
+
+        # Final answer: the vendor list returned by the last member (the evaluator)
+        vendors = []
+        for m in reversed(messages):
+            if m.get("role") == "tool":
+                vendors = _vendor_list(_content(m))
+                if vendors:
+                    break
+        return _assistant(json.dumps({"req_id": req_id, "vendors": vendors}))
+
+    def _member_reply(self, messages, tool, text):
+        results = [m for m in messages if m.get("role") == "tool"]
+        if not results:
+            return _tool_call(tool, 0, {"req_id": _req_id(text)})
+        return _assistant(_content(results[-1]))
+
+def _events(base, message, finish_reason, usage, generation_time, chunk_size=40):
+    # Server-sent events of a streamed answer: the content in small deltas, then the usage chunk
+    def event(choices, **extra):
+        return f"data: {json.dumps({**base, 'object': 'chat.completion.chunk', 'choices': choices, **extra})}\n\n".encode()
+
+    if message.get("tool_calls"):
+        deltas = [{"role": "assistant", "tool_calls": [dict(call, index=i) for i, call in enumerate(message["tool_calls"])]}]
+    else:
+        content = message.get("content") or ""
+        deltas = [{"role": "assistant", "content": content[i:i + chunk_size]} for i in range(0, len(content), chunk_size)] or [{"role": "assistant"}]
+    for delta in deltas:
+        time.sleep(generation_time / len(deltas))
+        yield event([{"index": 0, "delta": delta, "finish_reason": None}])
+    yield event([{"index": 0, "delta": {}, "finish_reason": finish_reason}])
+    if usage is not None:
+        yield event([], usage=usage)
+    yield b"data: [DONE]\n\n"
+
+def _content(message):
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        content = "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+def _tokens(text):
+    return len(text) // 4 + 1
+
+def _req_id(text):
+    match = _REQ_ID.search(text)
+    return int(match.group(1)) if match else 0
+
+def _vendor_list(text):
+    start = text.find("[")
+    try:
+        data = json.loads(text[start:text.rfind("]") + 1]) if start != -1 else []
+    except ValueError:
+        return []
+    return [entry for entry in data if isinstance(entry, dict) and "vendor_id" in entry]
+
+def _assistant(content):
+    return {"role": "assistant", "content": content}
+
+def _tool_call(name, index, arguments):
+    return {
+        "role": "assistant",
+        "content": None,
+        "tool_calls": [{
+            "id": f"call_{name}_{index}",
+            "type": "function",
+            "function": {"name": name, "arguments": json.dumps(arguments)},
+        }],
+    }
@@ -0,0 +1,313 @@
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import sqlite3
+import tempfile
+import statistics
+import subprocess
+import threading
+from contextlib import redirect_stdout
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (os.path.join(ROOT, "tools"), ROOT):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+os.environ.setdefault("OPENAI_API_KEY", "fake")
+
+from benchmarks import standin
+from benchmarks.fake_llm import FakeLLM
+
+SCENARIOS = ["fetchers", "evaluate", "team", "poller", "workers"]
+
+def latency_stats(timings):
+    """Summarise per-call timings (seconds) as mean/p50/p95/max in milliseconds."""
+    ordered = sorted(timings)
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+    return {
+        "calls": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(pct(0.95), 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+def timed(func, req_ids):
+    """Call `func(req_id)` for every requirement. Returns (timings, results)."""
+    timings, results = [], []
+    for req_id in req_ids:
+        started = time.perf_counter()
+        results.append(func(req_id))
+        timings.append(time.perf_counter() - started)
+    return timings, results
+
+def sample(req_ids, count):
+    """Pick `count` requirements spread evenly over `req_ids` (deterministic)."""
+    if count >= len(req_ids):
+        return list(req_ids)
+    step = len(req_ids) / count
+    return [req_ids[int(i * step)] for i in range(count)]
+
+def setup(args):
+    """Create the stand-in database and route the database and LLM calls of this process to the fakes."""
+    keepalive = standin.generate(args.db, quotations=args.quotations, items_per_requirement=args.items,
+                                 vendors_per_item=args.vendors, seed=args.seed)
+    standin.install(args.db)
+    return keepalive, install_fake_llm(args)
+
+def install_fake_llm(args):
+    """Route the LLM calls of this process to a fake endpoint (configured by `args`) and return it."""
+    import httpx
+    import evaluate_ai
+    import llm_gateway
+    import rate_limit
+    from llm_cache import get_cache
+
+    fake = FakeLLM(latency=args.latency, latency_per_1k_tokens=args.latency_per_1k, seed=args.seed,
+                   error_rate=args.error_rate)
+    # The evaluator and the agents reach the fake through the real gateway (retries, backoff, breaker)
+    llm_gateway._http_client = llm_gateway.make_http_client(httpx.MockTransport(fake.handle), backoff_base=0.01, backoff_max=0.1)
+    evaluate_ai._client = None
+    rate_limit._limiter = rate_limit.RateLimiter(rpm=0, tpm=0)  # The fake has no limits to respect
+    get_cache().enabled = False  # Every call must reach the fake
+    return fake
+
+def bench_fetchers(req_ids, fake, args):
+    from get_requirement_details import get_requirement_details
+    from get_items import get_items
+    from get_quotations import get_quotations
+    from async_fetch import fetch_procurement_data
+    from database import fetch_procurement_data_bulk, fetch_requirement_ids
+
+    results = {}
+    for name, func in [("get_requirement_details", get_requirement_details), ("get_items", get_items),
+                       ("get_quotations", get_quotations), ("fetch_procurement_data", fetch_procurement_data)]:
+        func(req_ids[0])  # Warm up the pool and caches
+        timings, _ = timed(func, req_ids)
+        results[name] = latency_stats(timings)
+
+    all_ids = fetch_requirement_ids()
+    started = time.perf_counter()
+    data = fetch_procurement_data_bulk(all_ids)
+    elapsed = time.perf_counter() - started
+    rows = sum(1 + len(entry["items"]) + len(entry["quotations"]) for entry in data.values())
+    results["fetch_procurement_data_bulk"] = {
+        "requirements": len(data),
+        "rows": rows,
+        "seconds": round(elapsed, 4),
+        "rows_per_sec": round(rows / elapsed, 1),
+    }
+    return results
+
+def bench_evaluate(req_ids, fake, args):
+    from evaluate_ai import evaluate_vendors
+
+    evaluate_vendors(req_ids[0])  # Warm up the tokenizer and HTTP client
+    calls_before = dict(fake.usage)
+    started = time.perf_counter()
+    timings, outputs = timed(evaluate_vendors, req_ids)
+    elapsed = time.perf_counter() - started
+    return {
+        **latency_stats(timings),
+        "requirements_per_sec": round(len(req_ids) / elapsed, 2),
+        "failed": sum(1 for output in outputs if output.startswith("❌")),
+        **_llm_usage(fake, calls_before),
+    }
+
+def bench_team(req_ids, fake, args):
+    try:
+        import agno  # noqa: F401
+    except ImportError:
+        return {"skipped": "agno is not installed"}
+    import team
+
+    calls_before = dict(fake.usage)
+    timings, outputs = timed(team.run_team_pipeline, req_ids[:args.team_samples])
+    return {
+        **latency_stats(timings),
+        "structured": sum(1 for output in outputs if output.lstrip().startswith("[")),
+        **_llm_usage(fake, calls_before),
+    }
+
+def bench_poller(req_ids, fake, args):
+    import team
+    from scheduler import RequirementScheduler
+
+    handled = []
+    lock = threading.Lock()
+    def handler(req_id):
+        with lock:
+            handled.append(req_id)
+
+    scheduler = RequirementScheduler(handler, max_workers=args.workers)
+    started = time.perf_counter()
+    # A first poll pages through every requirement; all freeze times are in the past
+    watermark, scheduled = team.poll_once(scheduler, (datetime(2000, 1, 1), 0))
+    polled = time.perf_counter() - started
+    while scheduler.pending_count():
+        time.sleep(0.001)
+    scheduler.shutdown(wait=True)
+    drained = time.perf_counter() - started
+
+    # Steady state: nothing new since the watermark, only the overlap window is re-read
+    idle_timings = []
+    for _ in range(args.samples):
+        idle_started = time.perf_counter()
+        team.poll_once(scheduler, watermark)
+        idle_timings.append(time.perf_counter() - idle_started)
+
+    return {
+        "requirements": scheduled,
+        "handled": len(handled),
+        "poll_seconds": round(polled, 4),
+        "drain_seconds": round(drained, 4),
+        "requirements_per_sec": round(len(handled) / drained, 1),
+        "idle_poll": latency_stats(idle_timings),
+    }
+
+def bench_workers(req_ids, fake, args):
+    """
+    Poll one stand-in database from several processes (`benchmarks/worker.py`).
+
+    Runs a single worker, then `--processes` workers, then `--processes` workers of which one
+    dies in the middle of its first evaluation. Each run starts from a copy of the generated data,
+    taken before any scenario wrote results (`args.snapshot`), and reports how many requirements
+    were evaluated, how many twice, and how many were taken over from the dead worker.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        results = {}
+        for name, processes, die_after in (("single", 1, 0), ("sharded", args.processes, 0), ("takeover", args.processes, 1)):
+            db = os.path.join(directory, f"{name}.db")
+            with sqlite3.connect(args.snapshot) as source, sqlite3.connect(db) as target:
+                source.backup(target)
+                target.execute("PRAGMA journal_mode=WAL")  # Readers in one process do not block writers in another
+            results[name] = _run_workers(db, processes, die_after, args)
+    return results
+
+def _run_workers(db, processes, die_after, args):
+    command = [sys.executable, os.path.join(ROOT, "benchmarks", "worker.py"), "--db", db, "--threads", str(args.workers),
+               "--latency", str(args.latency), "--latency-per-1k", str(args.latency_per_1k),
+               "--error-rate", str(args.error_rate), "--seed", str(args.seed)]
+    started = time.perf_counter()
+    workers = [
+        subprocess.Popen(command + ["--worker-id", f"w{index}"] + (["--die-after", str(die_after)] if die_after and not index else []),
+                         stdout=subprocess.PIPE, text=True)
+        for index in range(processes)
+    ]
+    summaries = [json.loads(out.splitlines()[-1]) for out, _ in (worker.communicate() for worker in workers) if out.strip()]
+    elapsed = time.perf_counter() - started
+
+    with standin.connect(db) as conn:
+        requirements = conn.execute("SELECT COUNT(*) FROM requirementdetails").fetchone()[0]
+        done, taken_over = conn.execute(
+            "SELECT SUM(STATUS = 'done'), SUM(STATUS = 'done' AND ATTEMPTS > 1) FROM requirementleases").fetchone()
+        twice = conn.execute("""
+            SELECT COUNT(*) FROM (SELECT REQ_ID FROM evaluationresults GROUP BY REQ_ID HAVING COUNT(DISTINCT RUN_ID) > 1)
+        """).fetchone()[0]
+    return {
+        "processes": processes,
+        "requirements": requirements,
+        "evaluated": done or 0,
+        "evaluated_twice": twice,
+        "taken_over": taken_over or 0,
+        "crashed_workers": processes - len(summaries),
+        "seconds": round(elapsed, 4),
+        "requirements_per_sec": round((done or 0) / elapsed, 1),
+        "per_worker": {summary["worker_id"]: len(summary["evaluated"]) for summary in summaries},
+    }
+
+def _llm_usage(fake, before):
+    return {f"llm_{key}": fake.usage[key] - before[key] for key in fake.usage}
+
+BENCHMARKS = {"fetchers": bench_fetchers, "evaluate": bench_evaluate, "team": bench_team, "poller": bench_poller,
+              "workers": bench_workers}
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=ROOT, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(args):
+    """Run the selected scenarios and return the JSON-serialisable report."""
+    keepalive, fake = setup(args)
+    from database import fetch_requirement_ids
+
+    req_ids = sample(fetch_requirement_ids(), args.samples)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        # The generated data as it is before other scenarios save evaluation results
+        args.snapshot = os.path.join(directory, "generated.db")
+        with sqlite3.connect(args.snapshot) as target:
+            keepalive.backup(target)
+
+        for name in args.scenarios:
+            print(f"Running {name}...", file=sys.stderr)
+            with redirect_stdout(io.StringIO()):  # The pipelines print progress for every requirement
+                results[name] = BENCHMARKS[name](req_ids, fake, args)
+    keepalive.close()
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "params": {key: getattr(args, key) for key in
+                   ("quotations", "items", "vendors", "samples", "team_samples", "latency", "latency_per_1k", "error_rate", "seed",
+                    "workers", "processes")},
+        "results": results,
+    }
+
+def compare(report, baseline):
+    """Print every numeric result next to the baseline value and the relative change."""
+    print(f"{'Metric':<58} {'Baseline':>12} {'Current':>12} {'Change':>8}")
+    def walk(current, previous, prefix):
+        for key, value in current.items():
+            name = f"{prefix}.{key}" if prefix else key
+            old = previous.get(key) if isinstance(previous, dict) else None
+            if isinstance(value, dict):
+                walk(value, old, name)
+            elif isinstance(value, (int, float)) and isinstance(old, (int, float)):
+                change = f"{(value - old) / old:+.1%}" if old else "n/a"
+                print(f"{name:<58} {old:>12g} {value:>12g} {change:>8}")
+    walk(report["results"], baseline.get("results", {}), "")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmarks against a SQLite stand-in database and a fake OpenAI endpoint.")
+    parser.add_argument("scenarios", nargs="*", default=SCENARIOS, help=f"Scenarios to run: {', '.join(SCENARIOS)} (default: all).")
+    parser.add_argument("--quotations", type=int, default=1000, help="Quotations to generate (10 to 100000).")
+    parser.add_argument("--items", type=int, default=5, help="Items per requirement.")
+    parser.add_argument("--vendors", type=int, default=8, help="Quotations per item.")
+    parser.add_argument("--samples", type=int, default=20, help="Requirements timed by the fetcher and evaluation scenarios.")
+    parser.add_argument("--team-samples", type=int, default=3, help="Requirements run through the agent team.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every fake LLM call.")
+    parser.add_argument("--latency-per-1k", type=float, default=0.0, help="Extra fake LLM seconds per 1000 completion tokens.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of fake LLM calls answered with a 429 or 503 (retried by the gateway).")
+    parser.add_argument("--workers", type=int, default=4, help="Scheduler workers in the poller scenario (per process in the workers scenario).")
+    parser.add_argument("--processes", type=int, default=3, help="Poller processes in the workers scenario.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic data and fake scores.")
+    parser.add_argument("--db", default=":memory:", help="SQLite file for the stand-in database (default: in memory).")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+    parser.add_argument("--compare", help="Baseline JSON report to print deltas against.")
+    args = parser.parse_args()
+    unknown = sorted(set(args.scenarios) - set(SCENARIOS))
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+    if args.db != ":memory:" and os.path.exists(args.db):
+        os.remove(args.db)  # Always start from freshly generated data
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(report, json.load(f))
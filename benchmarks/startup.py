@@ -0,0 +1,84 @@
+import os
+import re
+import sys
+import subprocess
+import argparse
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Entry-point modules, their cold import budget in milliseconds, and heavy packages they
+# must not import eagerly (they are loaded on first use instead).
+STARTUP_BUDGETS = {
+    "get_items": (150, ["openai", "agno", "numpy"]),
+    "get_requirement_details": (150, ["openai", "agno", "numpy"]),
+    "get_quotations": (150, ["openai", "agno", "numpy"]),
+    "evaluate_ai": (500, ["openai", "agno", "numpy"]),
+    "team": (500, ["openai", "agno", "numpy"]),
+    "batch": (500, ["openai", "agno", "numpy"]),
+    "api": (1200, ["openai", "agno", "numpy"]),
+}
+
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|\s*(\S+)$")
+
+def measure_import(module):
+    """
+    Import `module` in a fresh interpreter with `-X importtime`.
+
+    Returns:
+        tuple[float, set[str]]: Cumulative import time of the module in milliseconds, and the
+        top-level names of every package imported along the way.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, os.path.join(ROOT, "tools"), os.environ.get("PYTHONPATH", "")]))
+    env.pop("OPENAI_API_KEY", None)  # Importing must not need an API key
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env, cwd=ROOT,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+
+    cumulative, imported = None, set()
+    for line in result.stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if not match:
+            continue
+        name = match.group(3)
+        imported.add(name.split(".")[0])
+        if name == module:
+            cumulative = int(match.group(2)) / 1000
+    return cumulative, imported
+
+def run(modules, repeat, scale):
+    """Print the median import time of every module against its budget. Returns True if all pass."""
+    ok = True
+    print(f"{'Module':<26} {'Median (ms)':>12} {'Budget (ms)':>12}  Result")
+    for module in modules:
+        budget, forbidden = STARTUP_BUDGETS[module]
+        budget *= scale
+        timings, imported = [], set()
+        for _ in range(repeat):
+            elapsed, names = measure_import(module)
+            timings.append(elapsed)
+            imported |= names
+
+        median = statistics.median(timings)
+        eager = sorted(set(forbidden) & imported)
+        passed = median <= budget and not eager
+        ok &= passed
+        verdict = "ok" if passed else "FAIL"
+        if median > budget:
+            verdict += " (over budget)"
+        if eager:
+            verdict += f" (imports {', '.join(eager)} eagerly)"
+        print(f"{module:<26} {median:>12.1f} {budget:>12.0f}  {verdict}")
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the cold import time of CLI tools and workers against a budget.")
+    parser.add_argument("modules", nargs="*", default=list(STARTUP_BUDGETS), help="Modules to measure (default: all entry points).")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per module; the median is reported.")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every budget, e.g. 2 on slow CI machines.")
+    args = parser.parse_args()
+
+    sys.exit(0 if run(args.modules, args.repeat, args.scale) else 1)
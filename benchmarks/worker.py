@@ -0,0 +1,87 @@
+"""
+One poller process of the `workers` benchmark scenario.
+
+Polls a stand-in database file shared with other worker processes and evaluates (in direct mode,
+against the fake LLM) the requirements it claims, until every requirement is finished. Prints a
+JSON summary as its last line. With `--die-after N` it exits abruptly in the middle of its Nth
+evaluation, leaving its lease to expire and be taken over by the other workers.
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+from contextlib import redirect_stdout
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (os.path.join(ROOT, "tools"), ROOT):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+os.environ.setdefault("OPENAI_API_KEY", "fake")
+
+from benchmarks import standin
+from benchmarks.run import install_fake_llm
+
+def unfinished_requirements(max_attempts):
+    """Requirements that are not done yet and may still be claimed or retried (the poller skips those with results)."""
+    from database import pooled_connection
+
+    with pooled_connection() as conn:
+        return conn.execute("""
+            SELECT COUNT(*) FROM requirementdetails r
+            WHERE NOT EXISTS (SELECT 1 FROM requirementleases l
+                              WHERE l.REQ_ID = r.REQ_ID AND (l.STATUS = 'done' OR l.ATTEMPTS >= ?))
+              AND NOT EXISTS (SELECT 1 FROM evaluationresults e WHERE e.REQ_ID = r.REQ_ID)
+        """, (max_attempts,)).fetchone()[0]
+
+def run_worker(args):
+    import team
+    from leases import RequirementLeases
+    from scheduler import RequirementScheduler
+
+    standin.install(args.db)
+    install_fake_llm(args)
+
+    evaluated = []
+    def handler(req_id):
+        if args.die_after and len(evaluated) + 1 >= args.die_after:
+            os._exit(1)  # Crash while holding the lease
+        outcome = team.start_procurement(req_id, mode="direct")
+        evaluated.append(req_id)
+        return outcome
+
+    leases = RequirementLeases(args.worker_id, lease_seconds=args.lease, max_attempts=args.max_attempts,
+                               retry_delay=args.retry_delay)
+    scheduler = RequirementScheduler(leases.wrap(handler), max_workers=args.threads)
+    watermark = (datetime(2000, 1, 1), 0)
+    started = time.perf_counter()
+    while True:
+        watermark, _ = team.poll_once(scheduler, watermark, leases)
+        if not scheduler.pending_count() and not unfinished_requirements(args.max_attempts):
+            break
+        time.sleep(args.poll_interval)
+    scheduler.shutdown(wait=True)
+    leases.shutdown()
+    return {"worker_id": args.worker_id, "evaluated": sorted(evaluated), "seconds": round(time.perf_counter() - started, 4)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run one lease-claiming poller against a shared stand-in database.")
+    parser.add_argument("--db", required=True, help="SQLite file of the stand-in database, shared by all workers.")
+    parser.add_argument("--worker-id", required=True, help="Name of this worker in the lease table.")
+    parser.add_argument("--threads", type=int, default=4, help="Requirements evaluated in parallel by this worker.")
+    parser.add_argument("--lease", type=float, default=1.0, help="Lease length in seconds.")
+    parser.add_argument("--max-attempts", type=int, default=3, help="Claims of one requirement before it is left alone.")
+    parser.add_argument("--retry-delay", type=float, default=1.0, help="Seconds before a failed requirement may be claimed again.")
+    parser.add_argument("--poll-interval", type=float, default=0.2, help="Seconds between polls.")
+    parser.add_argument("--die-after", type=int, default=0, help="Exit abruptly while evaluating this many-th claimed requirement (0 = never).")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every fake LLM call.")
+    parser.add_argument("--latency-per-1k", type=float, default=0.0, help="Extra fake LLM seconds per 1000 completion tokens.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of fake LLM calls answered with a 429 or 503.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the fake scores.")
+    args = parser.parse_args()
+
+    with redirect_stdout(io.StringIO()):  # The poller and pipelines print progress for every requirement
+        summary = run_worker(args)
+    print(json.dumps(summary))
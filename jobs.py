@@ -0,0 +1,100 @@
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+class EvaluationJobs:
+    """
+    Run requirement evaluations as background jobs on a bounded worker pool.
+
+    Requests for a REQ_ID that already has a queued or running job are coalesced onto
+    that job, so concurrent callers share one evaluation (and one set of LLM calls).
+    Finished jobs are kept, oldest evicted first, so their status can still be looked up.
+    """
+
+    def __init__(self, handler, max_workers=4, history=1000):
+        """
+        Args:
+            handler (callable): Function called with a REQ_ID; its return value becomes the job result.
+            max_workers (int): Maximum number of evaluations running at the same time.
+            history (int): Number of finished jobs kept for status lookups.
+        """
+        self.handler = handler
+        self.history = history
+        self._jobs = OrderedDict()  # job_id -> job dict, oldest first
+        self._in_flight = {}  # req_id -> job_id of its queued or running job
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="evaluation")
+
+    def submit(self, req_id):
+        """
+        Start an evaluation of `req_id`, or join the one already in flight.
+
+        Returns:
+            tuple[dict, bool]: Snapshot of the job, and whether it was coalesced onto an existing job.
+        """
+        with self._lock:
+            job_id = self._in_flight.get(req_id)
+            if job_id is not None:
+                return dict(self._jobs[job_id]), True
+
+            job = {
+                "job_id": uuid.uuid4().hex,
+                "req_id": req_id,
+                "status": "queued",
+                "created": datetime.now(),
+                "started": None,
+                "finished": None,
+                "result": None,
+                "error": None,
+            }
+            self._jobs[job["job_id"]] = job
+            self._in_flight[req_id] = job["job_id"]
+            self._evict()
+            snapshot = dict(job)
+
+        self._executor.submit(self._run, job["job_id"])
+        return snapshot, False
+
+    def get(self, job_id):
+        """Return a snapshot of a job, or None if it is unknown or was evicted."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def in_flight(self, req_id):
+        """Return a snapshot of the queued or running job of `req_id`, or None."""
+        with self._lock:
+            job_id = self._in_flight.get(req_id)
+            return dict(self._jobs[job_id]) if job_id is not None else None
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job_id):
+        with self._lock:
+            job = self._jobs[job_id]
+            job["status"] = "running"
+            job["started"] = datetime.now()
+
+        try:
+            result, error, status = self.handler(job["req_id"]), None, "done"
+        except Exception as e:
+            result, error, status = None, str(e), "failed"
+
+        with self._lock:
+            job.update(status=status, result=result, error=error, finished=datetime.now())
+            self._in_flight.pop(job["req_id"], None)
+            self._evict()
+
+    def _evict(self):
+        # Called with the lock held. Drop the oldest finished jobs beyond the history size.
+        excess = len(self._jobs) - len(self._in_flight) - self.history
+        for job_id in list(self._jobs):
+            if excess <= 0:
+                break
+            if self._jobs[job_id]["status"] in ("done", "failed"):
+                del self._jobs[job_id]
+                excess -= 1
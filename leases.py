@@ -0,0 +1,109 @@
+import os
+import socket
+import threading
+from database import claim_requirement, renew_leases, complete_claim, fetch_expired_claims
+from config import WORKER_ID, WORKER_LEASE_SECONDS, WORKER_MAX_ATTEMPTS, WORKER_RETRY_DELAY
+import metrics
+
+
+class RequirementLeases:
+    """
+    Split requirements between poller processes with leases held in the database.
+
+    Every worker polls and schedules all requirements, but a requirement is only evaluated by
+    the worker that claims it (`database.claim_requirement`) when its freeze time is over. A
+    worker only claims once one of its pool threads is free, so busy workers leave requirements
+    to idle ones and throughput grows with the number of workers.
+
+    A background thread renews the leases of the requirements this worker is evaluating. If the
+    worker dies, its leases expire after `lease_seconds` and `expired()` hands the requirements
+    to the other workers' next poll. Failed requirements are handed out the same way once
+    `retry_delay` seconds have passed since their last claim. Either way a requirement is claimed
+    at most `max_attempts` times. A worker that
+    stalls for longer than its lease may see its requirement taken over and evaluated twice;
+    the lease keeps that from happening to a live worker, it does not make it impossible.
+    """
+
+    def __init__(self, worker_id=WORKER_ID, lease_seconds=WORKER_LEASE_SECONDS, max_attempts=WORKER_MAX_ATTEMPTS,
+                 retry_delay=WORKER_RETRY_DELAY):
+        """
+        Args:
+            worker_id (str): Name of this worker in the lease table (default: host:pid).
+            lease_seconds (float): Lease length; leases are renewed every third of it.
+            max_attempts (int): Claims of one requirement (the first plus takeovers and retries) before it is left alone.
+            retry_delay (float): Seconds after its last claim before a failed requirement may be claimed again.
+        """
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._held = set()  # REQ_IDs this worker is evaluating
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="lease-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def wrap(self, handler):
+        """Return a handler for `RequirementScheduler` that only runs `handler` on claimed requirements."""
+        return lambda req_id: self.run(handler, req_id)
+
+    def run(self, handler, req_id):
+        """
+        Claim `req_id` and call `handler(req_id)` while holding the lease.
+
+        The lease is completed as "failed" if the handler raises or returns "failed"
+        (see `team.start_procurement`), and as "done" otherwise.
+
+        Returns:
+            bool: False if another worker holds the requirement, or it is done, or it failed and
+            may not be retried yet.
+        """
+        claimed, status = claim_requirement(req_id, self.worker_id, self.lease_seconds, self.max_attempts, self.retry_delay)
+        if not claimed:
+            if status == "running":
+                print(f"REQ_ID {req_id} is claimed by another worker. Skipping.")
+            else:
+                print(f"REQ_ID {req_id} is already {status}. Skipping.")
+            metrics.inc("procurement_leases_total", help="Requirement claims by outcome.", outcome=f"skipped_{status}")
+            return False
+
+        metrics.inc("procurement_leases_total", help="Requirement claims by outcome.", outcome="claimed")
+        with self._lock:
+            self._held.add(req_id)
+        status = "failed"
+        try:
+            status = "failed" if handler(req_id) == "failed" else "done"
+        finally:
+            with self._lock:
+                self._held.discard(req_id)
+            if not complete_claim(req_id, self.worker_id, status):
+                print(f"⚠️ Lease on REQ_ID {req_id} was taken over by another worker before it finished.")
+        return True
+
+    def expired(self, limit=100):
+        """REQ_IDs whose worker stopped renewing its lease, or that failed, ready to be claimed again."""
+        return fetch_expired_claims(self.max_attempts, self.retry_delay, limit)
+
+    def shutdown(self):
+        """Stop renewing leases (call after the scheduler has finished its running evaluations)."""
+        self._stopped.set()
+        self._heartbeat.join()
+
+    def _heartbeat_loop(self):
+        while not self._stopped.wait(self.lease_seconds / 3):
+            with self._lock:
+                held = set(self._held)
+            if not held:
+                continue
+            try:
+                renewed = renew_leases(held, self.worker_id, self.lease_seconds)
+            except Exception as e:
+                print(f"⚠️ Could not renew leases: {e}")
+                continue
+            # A requirement that finished since the snapshot is no longer running; only report real losses
+            with self._lock:
+                lost = (held - renewed) & self._held
+                self._held -= lost  # Stop renewing them; the evaluation itself runs to its end
+            if lost:
+                print(f"⚠️ Lost the lease on REQ_ID(s) {sorted(lost)} to another worker.")
+                metrics.inc("procurement_leases_total", len(lost), help="Requirement claims by outcome.", outcome="lost")
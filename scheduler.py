@@ -0,0 +1,95 @@
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+class RequirementScheduler:
+    """
+    Track many pending requirements at once and start their procurement run
+    as soon as each one's QUOTATION_FREEZ_TIME has passed.
+
+    Pending requirements are kept in a min-heap keyed on freeze time. A single
+    dispatcher thread sleeps until the earliest freeze time (or until a new
+    requirement is scheduled) and hands due REQ_IDs to a bounded worker pool,
+    so evaluations run in parallel and the poll loop never blocks.
+    """
+
+    def __init__(self, handler, max_workers=4):
+        """
+        Args:
+            handler (callable): Function called with a REQ_ID once its freeze time is over.
+            max_workers (int): Maximum number of requirements evaluated at the same time.
+        """
+        self.handler = handler
+        self._heap = []  # (freeze_time, req_id)
+        self._pending = set()  # REQ_IDs waiting in the heap or running in the pool
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="procurement")
+        self._stopped = False
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="scheduler", daemon=True)
+        self._dispatcher.start()
+
+    def schedule(self, req_id, freeze_time):
+        """
+        Queue a requirement for evaluation at its freeze time.
+
+        Args:
+            req_id (int): Requirement ID.
+            freeze_time (datetime): QUOTATION_FREEZ_TIME of the requirement. None means "now".
+
+        Returns:
+            bool: True if the requirement was queued, False if it is already pending.
+        """
+        freeze_time = freeze_time or datetime.now()
+        with self._condition:
+            if req_id in self._pending:
+                return False
+            self._pending.add(req_id)
+            heapq.heappush(self._heap, (freeze_time, req_id))
+            # Wake the dispatcher in case this requirement is due before the current head
+            self._condition.notify()
+        return True
+
+    def is_pending(self, req_id):
+        with self._condition:
+            return req_id in self._pending
+
+    def pending_count(self):
+        with self._condition:
+            return len(self._pending)
+
+    def shutdown(self, wait=True):
+        """Stop dispatching new requirements and wait for running evaluations to finish."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self._dispatcher.join()
+        self._executor.shutdown(wait=wait)
+
+    def _dispatch_loop(self):
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    if self._heap:
+                        delay = (self._heap[0][0] - datetime.now()).total_seconds()
+                        if delay <= 0:
+                            break
+                        self._condition.wait(timeout=delay)
+                    else:
+                        self._condition.wait()
+                if self._stopped:
+                    return
+                _, req_id = heapq.heappop(self._heap)
+
+            print(f"Freeze time over for REQ_ID: {req_id}. Proceeding with the procurement process.")
+            self._executor.submit(self._run, req_id)
+
+    def _run(self, req_id):
+        try:
+            self.handler(req_id)
+        except Exception as e:
+            print(f"❌ Procurement failed for REQ_ID {req_id}: {e}")
+        finally:
+            with self._condition:
+                self._pending.discard(req_id)
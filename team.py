@@ -1,143 +1,374 @@
 import time
-import sys
-from datetime import datetime
-from agno.agent import Agent
-from agno.team.team import Team
-from agno.models.openai import OpenAIChat
+import json
+import argparse
+from datetime import datetime, timedelta
+from functools import partial
 from tools.get_items import get_items
 from tools.get_requirement_details import get_requirement_details
 from tools.get_quotations import get_quotations
-from evaluate_ai import evaluate_vendors
-from database import get_db_connection
-
-requirement_agent = Agent(
-    name="Requirement Fetcher",
-    role="Fetches procurement terms",
-    model=OpenAIChat(id="gpt-4-turbo"),
-    #debug_mode = True,
-    tools=[get_requirement_details]
-)
-
-item_agent = Agent(
-    name="Item Fetcher",
-    role="Fetches product specifications",
-    model=OpenAIChat(id="gpt-4-turbo"),
-    #debug_mode = True,
-    tools=[get_items]
-)
-
-quotation_agent = Agent(
-    name="Quotation Fetcher",
-    role="Fetches vendor quotations",
-    model=OpenAIChat(id="gpt-4-turbo"),
-    #debug_mode=True,
-    tools=[get_quotations]
-)
-
-evaluation_agent = Agent(
-    name="Vendor Evaluator",
-    role="Evaluates vendor offers",
-    model=OpenAIChat(id="gpt-4-turbo"),
-    #debug_mode=True,
-    tools=[evaluate_vendors]
-)
-
-# Define the procurement team with instructions
-procurement_team = Team(
-    name="Procurement Team",
-    mode="coordinate",
-    model=OpenAIChat(id="gpt-4-turbo"),
-    members=[requirement_agent, item_agent, quotation_agent, evaluation_agent],  # Team members
-    instructions=[
-        "1. **Requirement Fetching**: First, the **Requirement Fetcher** must fetch the procurement terms from the provided request data. This includes gathering all necessary procurement requirements.",
-        "    - **Task for Requirement Fetcher**: Fetch the requirement details using the `get_requirement_details` tool.",
-        "    - **Expected output**: A detailed list of the procurement terms that include specifications, quantity, delivery timelines, and any other relevant terms.",
-        "2. **Product Specifications**: Once the procurement terms are fetched, the **Item Fetcher** is responsible for gathering the product specifications as per the given requirements.",
-        "    - **Task for Item Fetcher**: Use the `get_items` tool to fetch the product specifications.",
-        "    - **Expected output**: A detailed specification of the product(s) requested, including quality, material, and size.",
-        "3. **Quotation Retrieval**: The **Quotation Fetcher** will retrieve the quotations from vendors who meet the criteria.",
-        "    - **Task for Quotation Fetcher**: Use the `get_quotations` tool to retrieve vendor quotations that match the product specifications.",
-        "    - **Expected output**: A list of vendor quotations, including price, delivery terms, and vendor information.",
-        "4. **Vendor Evaluation**: The **Vendor Evaluator** will evaluate the vendor quotations to ensure they align with the procurement terms and requirements.",
-        "    - **Task for Vendor Evaluator**: Use the `evaluate_vendors` tool to evaluate the retrieved vendor quotations.",
-        "    - **Before evaluation**: Create evaluation criteria based on the requirement details (price, quality, delivery time, etc.).",
-        "    - **Expected output**: A list of accepted/rejected vendors based on the evaluation criteria.",
-        "5. **Final Response**: After the vendor evaluation, the team will compile the final response, which will include a list of approved vendors along with their quotations.",
-        "    - **Final Output**: A summary of the vendor evaluation and the final vendor list, including their quotations and contact details.",
-        "Key Notes:",
-        "1. **Task Transfer**: If any task cannot be completed by a given agent, it should be transferred to the appropriate agent. Ensure the task is clearly defined with expected output.",
-        "2. **Validation**: After each agent completes its task, validate the output before moving to the next step. If the output is not satisfactory, re-assign the task or request additional information.",
-        "3. **Coordination**: Since this is a multi-agent team, ensure that each agent's output is passed to the next agent in the sequence as per the instructions.",
-        "4. **Data Flow**: Make sure to properly collect and pass all required data between agents. The Vendor Evaluator needs the req_id, items data, quotations data, and evaluation criteria to function properly."
-    ],
-    #response_model=dict,  # Define the expected response format
-    show_tool_calls=True,  # Optionally enable to see the tool calls
-    markdown=True,  # Enable markdown formatting for responses
-    #debug_mode=True,  # Enable debug mode for debugging purposes
-    show_members_responses=True,  # Show responses from all members
-)
-
-# Track processed requirements
-processed_requirements = set()
-
-def fetch_new_requirements():
-    conn = get_db_connection()
-    cursor = conn.cursor()
+import evaluate_ai
+from evaluate_ai import evaluate_vendors, evaluate_quotations
+from async_fetch import fetch_procurement_data
+from fetch_cache import requirement_scope, get_fetch_cache
+from llm_cache import get_cache
+from schemas import VendorRanking
+from database import fetch_evaluated_requirements, fetch_requirements_since, fetch_pending_requirements
+from database import load_watermark, save_watermark
+from config import PROCUREMENT_WORKERS, POLL_MIN_INTERVAL, POLL_MAX_INTERVAL, POLL_BATCH_SIZE
+from config import POLL_OVERLAP_SECONDS, POLL_INITIAL_LOOKBACK, METRICS_TEXTFILE, WORKER_LEASES_ENABLED
+from scheduler import RequirementScheduler
+from leases import RequirementLeases
+import metrics
+
+def build_procurement_team():
+    """
+    Build a fresh procurement team.
+
+    Agents and the team keep per-run state, so every requirement evaluated by the
+    scheduler's worker pool gets its own team instead of sharing one instance.
+    agno (and the OpenAI SDK behind it) is imported here, on the first team run, so
+    direct mode and short-lived commands never pay for it.
+    """
+    from agno.agent import Agent
+    from agno.team.team import Team
+
+    requirement_agent = Agent(
+        name="Requirement Fetcher",
+        role="Fetches procurement terms",
+        model=_chat_model(),
+        #debug_mode = True,
+        tools=[get_requirement_details]
+    )
+
+    item_agent = Agent(
+        name="Item Fetcher",
+        role="Fetches product specifications",
+        model=_chat_model(),
+        #debug_mode = True,
+        tools=[get_items]
+    )
+
+    quotation_agent = Agent(
+        name="Quotation Fetcher",
+        role="Fetches vendor quotations",
+        model=_chat_model(),
+        #debug_mode=True,
+        tools=[get_quotations]
+    )
+
+    evaluation_agent = Agent(
+        name="Vendor Evaluator",
+        role="Evaluates vendor offers",
+        model=_chat_model(),
+        #debug_mode=True,
+        tools=[evaluate_vendors]
+    )
+
+    # Define the procurement team with instructions
+    procurement_team = Team(
+        name="Procurement Team",
+        mode="coordinate",
+        model=_chat_model(),
+        members=[requirement_agent, item_agent, quotation_agent, evaluation_agent],  # Team members
+        instructions=[
+            "1. **Requirement Fetching**: First, the **Requirement Fetcher** must fetch the procurement terms from the provided request data. This includes gathering all necessary procurement requirements.",
+            "    - **Task for Requirement Fetcher**: Fetch the requirement details using the `get_requirement_details` tool.",
+            "    - **Expected output**: A detailed list of the procurement terms that include specifications, quantity, delivery timelines, and any other relevant terms.",
+            "2. **Product Specifications**: Once the procurement terms are fetched, the **Item Fetcher** is responsible for gathering the product specifications as per the given requirements.",
+            "    - **Task for Item Fetcher**: Use the `get_items` tool to fetch the product specifications.",
+            "    - **Expected output**: A detailed specification of the product(s) requested, including quality, material, and size.",
+            "3. **Quotation Retrieval**: The **Quotation Fetcher** will retrieve the quotations from vendors who meet the criteria.",
+            "    - **Task for Quotation Fetcher**: Use the `get_quotations` tool to retrieve vendor quotations that match the product specifications.",
+            "    - **Expected output**: A list of vendor quotations, including price, delivery terms, and vendor information.",
+            "4. **Vendor Evaluation**: The **Vendor Evaluator** will evaluate the vendor quotations to ensure they align with the procurement terms and requirements.",
+            "    - **Task for Vendor Evaluator**: Use the `evaluate_vendors` tool to evaluate the retrieved vendor quotations.",
+            "    - **Before evaluation**: Create evaluation criteria based on the requirement details (price, quality, delivery time, etc.).",
+            "    - **Expected output**: A list of accepted/rejected vendors based on the evaluation criteria.",
+            "5. **Final Response**: After the vendor evaluation, the team will compile the final response, which will include a list of approved vendors along with their quotations.",
+            "    - **Final Output**: A summary of the vendor evaluation and the final vendor list, including their quotations and contact details.",
+            "Key Notes:",
+            "1. **Task Transfer**: If any task cannot be completed by a given agent, it should be transferred to the appropriate agent. Ensure the task is clearly defined with expected output.",
+            "2. **Validation**: After each agent completes its task, validate the output before moving to the next step. If the output is not satisfactory, re-assign the task or request additional information.",
+            "3. **Coordination**: Since this is a multi-agent team, ensure that each agent's output is passed to the next agent in the sequence as per the instructions.",
+            "4. **Data Flow**: Make sure to properly collect and pass all required data between agents. The Vendor Evaluator needs the req_id, items data, quotations data, and evaluation criteria to function properly."
+        ],
+        response_model=VendorRanking,  # Validated {vendor_id, score, status, reason} list instead of markdown
+        show_tool_calls=True,  # Optionally enable to see the tool calls
+        #debug_mode=True,  # Enable debug mode for debugging purposes
+        show_members_responses=True,  # Show responses from all members
+    )
+    return procurement_team
+
+def _chat_model():
+    # One model instance per agent, all sharing the LLM gateway (rate limits, retries, fallback) with the evaluator
+    from agno.models.openai import OpenAIChat
+    from llm_gateway import get_http_client
+    return OpenAIChat(id="gpt-4-turbo", http_client=get_http_client(), max_retries=0)
+
+# Name of the persisted high-watermark used by the poller
+WATERMARK_NAME = "requirements"
+
+def fetch_new_requirements(mode="team", worker_id=None):
+    """
+    Detect new requirements incrementally and schedule them for evaluation.
+
+    Requirements are read in (DATE_CREATED, REQ_ID) order from a high-watermark persisted in
+    the database, so the poller catches up after downtime and nothing is missed when a poll
+    runs long. Each poll re-reads a short overlap window for rows committed late; those are
+    de-duplicated against the scheduler and the stored evaluation results, so memory use does
+    not grow with history. The poll interval shrinks while requirements keep arriving and
+    backs off when nothing is new.
+
+    Several pollers (processes or hosts) can run against the same database: each requirement is
+    evaluated by the one that claims its lease, and the requirements of a poller that dies are
+    taken over by the others (see `RequirementLeases`). Set WORKER_LEASES_ENABLED=false to run
+    a single poller without the lease table.
+    """
+    handler = partial(start_procurement, mode=mode)
+    leases = None
+    if WORKER_LEASES_ENABLED:
+        leases = RequirementLeases(worker_id) if worker_id else RequirementLeases()
+        handler = leases.wrap(handler)
+        print(f"Claiming requirements as worker {leases.worker_id}.")
+    # Requirements wait here for their freeze time instead of blocking the poll loop
+    scheduler = RequirementScheduler(handler, max_workers=PROCUREMENT_WORKERS)
+
+    saved = load_watermark(WATERMARK_NAME)
+    watermark = saved or (datetime.now() - timedelta(seconds=POLL_INITIAL_LOOKBACK), 0)
+    interval = POLL_MIN_INTERVAL
+    if saved:
+        resume_pending(scheduler, saved)
 
     while True:
         print("Checking for new requirements...")
+        watermark, scheduled = poll_once(scheduler, watermark, leases)
+
+        # Poll again quickly while requirements keep arriving, back off when idle
+        interval = POLL_MIN_INTERVAL if scheduled else min(interval * 2, POLL_MAX_INTERVAL)
+        print(f"{scheduler.pending_count()} requirement(s) pending or in progress. Next check in {interval:.0f}s.")
+        if METRICS_TEXTFILE:
+            metrics.write_textfile(METRICS_TEXTFILE)
+        time.sleep(interval)
+
+def resume_pending(scheduler, watermark):
+    """
+    Re-schedule requirements detected before a restart that were still waiting for their freeze time.
+
+    The scheduler's queue lives in memory, and the persisted watermark is already past these
+    requirements, so the poll alone would never see them again.
+
+    Args:
+        scheduler (RequirementScheduler): Scheduler the requirements are queued on.
+        watermark (tuple[datetime, int]): The persisted watermark the poller resumes from.
+
+    Returns:
+        int: Number of requirements scheduled.
+    """
+    scheduled = 0
+    # Freeze times before the last row seen had passed by the time it was polled: those requirements ran
+    for req in fetch_pending_requirements(watermark[0], watermark[1], watermark[0]):
+        if scheduler.schedule(req.REQ_ID, req.QUOTATION_FREEZ_TIME):
+            print(f"Resuming REQ_ID {req.REQ_ID}, scheduled at {req.QUOTATION_FREEZ_TIME} before the restart.")
+            scheduled += 1
+    return scheduled
+
+def poll_once(scheduler, watermark, leases=None):
+    """
+    Read every requirement created since `watermark` and schedule the ones not evaluated yet.
+
+    Args:
+        scheduler (RequirementScheduler): Scheduler the new requirements are queued on.
+        watermark (tuple[datetime, int]): (DATE_CREATED, REQ_ID) of the last row already seen.
+        leases (RequirementLeases): If given, requirements left behind by dead workers are
+            scheduled again as well.
+
+    Returns:
+        tuple[tuple[datetime, int], int]: The advanced (and persisted) watermark, and the number
+        of requirements scheduled.
+    """
+    scheduled = 0
+
+    # Start slightly before the watermark to pick up rows that were committed late
+    position = (watermark[0] - timedelta(seconds=POLL_OVERLAP_SECONDS), 0)
+    while True:
+        new_requirements = fetch_requirements_since(position[0], position[1], POLL_BATCH_SIZE)
+        if not new_requirements:
+            break
 
-        # Fetch new requirements based on DATE_CREATED
-        cursor.execute("""
-            SELECT REQ_ID, QUOTATION_FREEZ_TIME, DATE_CREATED 
-            FROM requirementdetails
-            WHERE DATE_CREATED >= DATEADD(SECOND, -10, GETDATE())
-        """)
-        new_requirements = cursor.fetchall()
+        candidates = [req for req in new_requirements if not scheduler.is_pending(req.REQ_ID)]
+        # Requirements with stored results were evaluated before (possibly by an earlier run)
+        already_evaluated = fetch_evaluated_requirements(req.REQ_ID for req in candidates)
 
-        for req in new_requirements:
+        for req in candidates:
             req_id, freeze_time, date_created = req.REQ_ID, req.QUOTATION_FREEZ_TIME, req.DATE_CREATED
 
             # Process only new requirements
-            if req_id not in processed_requirements:
+            if req_id not in already_evaluated:
                 print(f"New Requirement Detected: {req_id}")
 
                 # Notify all vendors
                 notify_vendors(req_id)
 
-                # Wait until freeze time is over
-                current_time = datetime.now()
-                time_diff = (freeze_time - current_time).total_seconds()
-                print(time_diff)
+                # Queue the procurement process to start once freeze time is over
+                print(f"Scheduling Procurement Process for REQ_ID: {req_id} at {freeze_time}")
+                scheduler.schedule(req_id, freeze_time)
+                scheduled += 1
 
-                if time_diff > 0:
-                    print(f" Waiting {time_diff} seconds until freeze time is over for REQ_ID: {req_id}")
-                    for remaining in range(int(time_diff), 0, -1):
-                        sys.stdout.write(f"\r Time remaining: {remaining} seconds ")  # Overwrite the line
-                        sys.stdout.flush()
-                        time.sleep(1)
+        last = new_requirements[-1]
+        position = (last.DATE_CREATED, last.REQ_ID)
+        if position > watermark:
+            watermark = position
+            save_watermark(WATERMARK_NAME, *watermark)
 
-                    print("\n Freeze time over. Proceeding with the procurement process.")
+        if len(new_requirements) < POLL_BATCH_SIZE:
+            break
 
-                # Start the procurement process
-                print(f"Triggering Procurement Process for REQ_ID: {req_id}")
-                start_procurement(req_id)
+    # Requirements whose worker stopped renewing its lease, or that failed, are due right away
+    for req_id in leases.expired() if leases else ():
+        if scheduler.schedule(req_id, None):
+            print(f"Taking over REQ_ID {req_id}: its worker's lease expired or its last attempt failed.")
+            # A stalled run of this process may still hold a scope on it; the new run must not reuse its snapshot
+            get_fetch_cache().invalidate(req_id)
+            scheduled += 1
 
-                # Mark the requirement as processed
-                processed_requirements.add(req_id)
-
-        time.sleep(10)  # Check for new requirements every 10 seconds
+    return watermark, scheduled
 
 # Function to notify vendors
 def notify_vendors(req_id):
     print(f"Notifying all vendors for Requirement {req_id}")
 
 # Function to start procurement process
-def start_procurement(req_id):
-    procurement_team.print_response(
-    f"Please analyze procurement requirement #{req_id} and provide vendor recommendations."
-)
+def start_procurement(req_id, mode="team"):
+    """
+    Evaluate one requirement and print the result.
+
+    Returns:
+        str: "ok", or "failed" if the pipeline reported an error ("❌ ..." output). Unexpected
+        errors are raised.
+    """
+    print(f"Triggering Procurement Process for REQ_ID: {req_id} ({mode} mode)")
+    outcome = "error"
+    try:
+        with metrics.span("procurement.run", req_id=req_id, mode=mode):
+            output = run_direct_pipeline(req_id) if mode == "direct" else run_team_pipeline(req_id)
+        outcome = "failed" if output.startswith("❌") else "ok"
+        print(output)
+    finally:
+        metrics.inc("procurement_runs_total", help="Procurement runs by mode and outcome.", mode=mode, outcome=outcome)
+    return outcome
+
+def run_team_pipeline(req_id):
+    """
+    Evaluate a requirement with the multi-agent procurement team.
+
+    Args:
+        req_id (int): Requirement ID.
+
+    The agents and the evaluator share one fetched snapshot of the requirement for the whole
+    run (see `fetch_cache.py`), so repeated tool calls do not query the database again.
+
+    Returns:
+        str: JSON list of `{vendor_id, score, status, reason}` entries, or the team's raw
+        answer if it did not produce a structured report.
+    """
+    with requirement_scope(req_id):
+        return _format_team_output(_run_team(req_id).content)
+
+def _run_team(req_id):
+    with metrics.span("team.run", req_id=req_id) as span:
+        procurement_team = build_procurement_team()
+        response = procurement_team.run(
+            f"Please analyze procurement requirement #{req_id} and provide vendor recommendations."
+        )
+        # The evaluator's own calls are counted in evaluate_ai
+        evaluate_ai._record_token_metrics(span, "team", *_team_tokens(response))
+    return response
+
+def _format_team_output(content):
+    if isinstance(content, VendorRanking):
+        return json.dumps([vendor.model_dump() for vendor in content.vendors], indent=2)
+    return str(content)
+
+def run_direct_pipeline(req_id):
+    """
+    Evaluate a requirement without the agent team.
+
+    Requirement details, items and quotations are fetched concurrently in code and passed
+    straight to the evaluator, so the only LLM call is the vendor evaluation itself.
+
+    Args:
+        req_id (int): Requirement ID.
+
+    Returns:
+        str: JSON list of `{vendor_id, score, status, reason}` entries, or an error message.
+    """
+    try:
+        requirement_details, items, quotations = fetch_procurement_data(req_id)
+    except TimeoutError as e:
+        return f"❌ {str(e)}"
+
+    return evaluate_quotations(requirement_details, items, quotations)
+
+def _sum_metric(metrics, name):
+    # agno reports metrics either as plain numbers or as one value per model call
+    value = (metrics or {}).get(name) or 0
+    return sum(value) if isinstance(value, list) else value
+
+def _team_tokens(response):
+    # Prompt and completion tokens of the team leader and of every member agent
+    prompt_tokens = completion_tokens = 0
+    for run in [response] + list(getattr(response, "member_responses", None) or []):
+        prompt_tokens += _sum_metric(getattr(run, "metrics", None), "input_tokens")
+        completion_tokens += _sum_metric(getattr(run, "metrics", None), "output_tokens")
+    return prompt_tokens, completion_tokens
+
+def compare_modes(req_id):
+    """
+    Run both pipelines on the same requirement and print their latency and token usage side by side.
+
+    The LLM cache is disabled so neither run is served from the other's answers.
+    """
+    get_cache().enabled = False
+    results = {}
+
+    for mode in ("direct", "team"):
+        usage_before = dict(evaluate_ai.llm_usage)
+        started = time.perf_counter()
+        prompt_tokens = completion_tokens = 0
+
+        if mode == "direct":
+            output = run_direct_pipeline(req_id)
+        else:
+            response = _run_team(req_id)
+            output = _format_team_output(response.content)
+            prompt_tokens, completion_tokens = _team_tokens(response)
+
+        elapsed = time.perf_counter() - started
+        # Tokens spent inside evaluate_vendors / evaluate_quotations
+        prompt_tokens += evaluate_ai.llm_usage["prompt_tokens"] - usage_before["prompt_tokens"]
+        completion_tokens += evaluate_ai.llm_usage["completion_tokens"] - usage_before["completion_tokens"]
+        results[mode] = (elapsed, prompt_tokens, completion_tokens, output)
+
+    for mode, (elapsed, prompt_tokens, completion_tokens, output) in results.items():
+        print(f"\n===== {mode} mode output =====\n{output}")
+
+    print(f"\n{'Mode':<8} {'Latency (s)':>12} {'Prompt tokens':>14} {'Completion tokens':>18} {'Total tokens':>13}")
+    for mode, (elapsed, prompt_tokens, completion_tokens, _) in results.items():
+        print(f"{mode:<8} {elapsed:>12.2f} {prompt_tokens:>14} {completion_tokens:>18} {prompt_tokens + completion_tokens:>13}")
 
 # Start monitoring requirements
 if __name__ == "__main__":
-    fetch_new_requirements()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Monitor new requirements and evaluate vendor quotations.")
+    parser.add_argument("--mode", choices=["team", "direct"], default="team",
+                        help="'team' runs the multi-agent procurement team; 'direct' fetches data in code and makes a single evaluation call.")
+    parser.add_argument("--req-id", type=int, help="Evaluate this requirement once instead of monitoring for new ones.")
+    parser.add_argument("--compare", type=int, metavar="REQ_ID", help="Run both modes on REQ_ID and compare latency and token usage.")
+    parser.add_argument("--worker-id", help="Name of this poller in the lease table when several run side by side (default: host:pid).")
+    args = parser.parse_args()
+
+    if args.compare is not None:
+        compare_modes(args.compare)
+    elif args.req_id is not None:
+        start_procurement(args.req_id, mode=args.mode)
+    else:
+        fetch_new_requirements(mode=args.mode, worker_id=args.worker_id)
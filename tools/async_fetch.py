@@ -0,0 +1,95 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from get_requirement_details import load_requirement_details
+from get_items import load_items
+from get_quotations import load_quotations
+import metrics
+from config import DB_FETCH_THREADS, DB_FETCH_TIMEOUT
+
+# pyodbc has no async API, so the blocking fetchers run on their own threads. The pool is sized
+# like the connection pool, so awaiting more fetches than that queues here instead of in
+# `ConnectionPool.connection()`.
+_executor = ThreadPoolExecutor(max_workers=DB_FETCH_THREADS, thread_name_prefix="db-fetch")
+
+async def _run_blocking(func, req_id, timeout):
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(_executor, metrics.bind_context(func), req_id)
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        # The worker thread cannot be interrupted; the query is bounded by DB_QUERY_TIMEOUT
+        raise TimeoutError(f"{func.__name__}({req_id}) timed out after {timeout:g}s")
+
+async def aload_requirement_details(req_id, timeout=DB_FETCH_TIMEOUT):
+    """Async `load_requirement_details`. Raises TimeoutError if it takes longer than `timeout` seconds."""
+    return await _run_blocking(load_requirement_details, req_id, timeout)
+
+async def aload_items(req_id, timeout=DB_FETCH_TIMEOUT):
+    """Async `load_items`. Raises TimeoutError if it takes longer than `timeout` seconds."""
+    return await _run_blocking(load_items, req_id, timeout)
+
+async def aload_quotations(req_id, timeout=DB_FETCH_TIMEOUT):
+    """Async `load_quotations`. Raises TimeoutError if it takes longer than `timeout` seconds."""
+    return await _run_blocking(load_quotations, req_id, timeout)
+
+async def afetch_procurement_data(req_id, timeout=DB_FETCH_TIMEOUT):
+    """
+    Fetch requirement details, items and quotations of a requirement concurrently.
+
+    If one fetch fails or times out, the others are cancelled and the error is raised.
+
+    Args:
+        req_id (int): Requirement ID.
+        timeout (float): Per-call timeout in seconds.
+
+    Returns:
+        tuple[dict, dict, dict]: Outputs of `load_requirement_details`, `load_items` and
+        `load_quotations`, ready for `evaluate_quotations` without a JSON round trip.
+
+    Raises:
+        TimeoutError: If any of the fetches takes longer than `timeout`.
+    """
+    with metrics.span("fetch.procurement_data", req_id=req_id):
+        tasks = [
+            asyncio.ensure_future(aload_requirement_details(req_id, timeout)),
+            asyncio.ensure_future(aload_items(req_id, timeout)),
+            asyncio.ensure_future(aload_quotations(req_id, timeout)),
+        ]
+        try:
+            requirement_details, items, quotations = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+    return requirement_details, items, quotations
+
+def run_sync(coro):
+    """
+    Run a coroutine to completion from synchronous code.
+
+    Uses `asyncio.run`, or a helper thread when the caller is already inside an event loop
+    (e.g. a sync tool invoked by an async agent run).
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    result = {}
+    def runner():
+        try:
+            result["value"] = asyncio.run(coro)
+        except BaseException as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=metrics.bind_context(runner), name="async-fetch")
+    thread.start()
+    thread.join()
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+def fetch_procurement_data(req_id, timeout=DB_FETCH_TIMEOUT):
+    """Synchronous wrapper of `afetch_procurement_data`."""
+    return run_sync(afetch_procurement_data(req_id, timeout))
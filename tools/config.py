@@ -14,3 +14,88 @@ DB_DRIVER = os.getenv("DB_DRIVER")
 # AI API Keys
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
+
+# Procurement scheduler
+PROCUREMENT_WORKERS = int(os.getenv("PROCUREMENT_WORKERS", "4"))  # Requirements evaluated in parallel
+
+# Database connection pool
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))  # Max open connections per process
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # Seconds to wait for a free connection
+DB_POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", "300"))  # Close connections idle longer than this
+DB_POOL_PING_AFTER = float(os.getenv("DB_POOL_PING_AFTER", "30"))  # Health-check connections idle longer than this
+DB_QUERY_TIMEOUT = int(os.getenv("DB_QUERY_TIMEOUT", "0"))  # Server-side query timeout in seconds (0 = none)
+
+# Async fetch layer
+DB_FETCH_THREADS = int(os.getenv("DB_FETCH_THREADS", os.getenv("DB_POOL_SIZE", "5")))  # Threads running blocking fetchers
+DB_FETCH_TIMEOUT = float(os.getenv("DB_FETCH_TIMEOUT", "60"))  # Per-call timeout for async fetchers
+
+# Per-run cache of the requirement, item and quotation fetchers (tools/fetch_cache.py)
+FETCH_CACHE_ENABLED = os.getenv("FETCH_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+FETCH_CACHE_TTL = float(os.getenv("FETCH_CACHE_TTL", "120"))  # Seconds a fetched snapshot is reused within a run
+FETCH_CACHE_MAX_ENTRIES = int(os.getenv("FETCH_CACHE_MAX_ENTRIES", "256"))  # Least recently used entries are evicted beyond this
+
+# Rows fetched per round trip when streaming large result sets
+QUOTATION_FETCH_BATCH = int(os.getenv("QUOTATION_FETCH_BATCH", "1000"))
+
+# Rule-based pre-scoring ahead of the LLM
+PRESCORE_ACCEPT_SCORE = float(os.getenv("PRESCORE_ACCEPT_SCORE", "75"))  # Clean vendors at or above this are accepted locally
+PRESCORE_REJECT_SCORE = float(os.getenv("PRESCORE_REJECT_SCORE", "40"))  # Vendors below this are rejected locally
+PRESCORE_LATE_GRACE_DAYS = float(os.getenv("PRESCORE_LATE_GRACE_DAYS", "7"))  # Later than this past REQUIRED_DATE is a hard reject
+
+# LLM evaluation prompt sizing
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "60000"))  # Max prompt tokens per evaluation call
+EVAL_MAX_CONCURRENCY = int(os.getenv("EVAL_MAX_CONCURRENCY", "4"))  # Chunks evaluated in parallel
+
+# LLM response cache
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "86400"))  # Seconds before a cached answer expires
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))  # Least recently used entries are evicted beyond this
+EVAL_MAX_REPAIRS = int(os.getenv("EVAL_MAX_REPAIRS", "2"))  # Re-asks for missing/invalid vendor entries
+
+# Requirement poller
+POLL_MIN_INTERVAL = float(os.getenv("POLL_MIN_INTERVAL", "1"))  # Seconds between polls while new requirements keep arriving
+POLL_MAX_INTERVAL = float(os.getenv("POLL_MAX_INTERVAL", "30"))  # Polls back off up to this when nothing is new
+POLL_BATCH_SIZE = int(os.getenv("POLL_BATCH_SIZE", "500"))  # Requirements read per page
+POLL_OVERLAP_SECONDS = float(os.getenv("POLL_OVERLAP_SECONDS", "60"))  # Re-read window for rows committed late
+POLL_INITIAL_LOOKBACK = float(os.getenv("POLL_INITIAL_LOOKBACK", "10"))  # How far back the very first poll (no watermark yet) starts
+
+# Work claiming between poller processes (team.py on several hosts or several times on one)
+WORKER_LEASES_ENABLED = os.getenv("WORKER_LEASES_ENABLED", "true").lower() in ("1", "true", "yes")
+WORKER_ID = os.getenv("WORKER_ID", "")  # Name of this worker in the lease table (default: host:pid)
+WORKER_LEASE_SECONDS = float(os.getenv("WORKER_LEASE_SECONDS", "120"))  # A dead worker's requirements are taken over after this
+WORKER_MAX_ATTEMPTS = int(os.getenv("WORKER_MAX_ATTEMPTS", "3"))  # Takeovers and retries stop after this many claims of one requirement
+WORKER_RETRY_DELAY = float(os.getenv("WORKER_RETRY_DELAY", "300"))  # A failed requirement may be claimed again this long after its last claim
+
+# OpenAI rate limits (0 disables a limit)
+OPENAI_RPM = int(os.getenv("OPENAI_RPM", "500"))  # Requests per minute
+OPENAI_TPM = int(os.getenv("OPENAI_TPM", "150000"))  # Tokens per minute
+
+# Batch evaluation
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))  # Requirements evaluated in parallel by batch.py
+BATCH_PREFETCH_SIZE = int(os.getenv("BATCH_PREFETCH_SIZE", "200"))  # REQ_IDs loaded per set-based prefetch
+
+# Evaluation API service
+API_WORKERS = int(os.getenv("API_WORKERS", "4"))  # Evaluations run in parallel by the API
+API_JOB_HISTORY = int(os.getenv("API_JOB_HISTORY", "1000"))  # Finished jobs kept for status lookups
+
+# Metrics and tracing
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+METRICS_TEXTFILE = os.getenv("METRICS_TEXTFILE")  # Write Prometheus metrics here (textfile collector); unset = off
+TRACE_LOG_PATH = os.getenv("TRACE_LOG_PATH")  # Append one JSON line per span here; unset = off
+LLM_PRICE_PROMPT_PER_1K = float(os.getenv("LLM_PRICE_PROMPT_PER_1K", "0.01"))  # USD per 1K prompt tokens (cost estimate)
+LLM_PRICE_COMPLETION_PER_1K = float(os.getenv("LLM_PRICE_COMPLETION_PER_1K", "0.03"))  # USD per 1K completion tokens
+
+# Vendor history index
+VENDOR_HISTORY_ENABLED = os.getenv("VENDOR_HISTORY_ENABLED", "true").lower() in ("1", "true", "yes")
+VENDOR_HISTORY_TTL = float(os.getenv("VENDOR_HISTORY_TTL", "300"))  # Seconds before the in-memory snapshot is reloaded
+
+# LLM gateway (tools/llm_gateway.py), shared by the evaluator and the agents
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))  # Seconds per request; for streamed answers, between chunks
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))  # Seconds to connect to the API
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))  # Retries of 429/5xx/connection errors per model
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1"))  # Seconds before the first retry, doubled per retry (jittered)
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "30"))  # Longest single backoff
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))  # Consecutive failures that open a model's circuit (0 = off)
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))  # Seconds an open circuit waits before a trial request
+LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "")  # Model tried when the primary one is unavailable (e.g. gpt-4o-mini); empty = none
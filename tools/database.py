@@ -1,15 +1,227 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from contextlib import contextmanager
 import pyodbc
+import metrics
 from config import DB_SERVER, DB_NAME, DB_USERNAME, DB_PASSWORD, DB_DRIVER
+from config import DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_POOL_MAX_IDLE, DB_POOL_PING_AFTER, DB_QUERY_TIMEOUT
+from config import QUOTATION_FETCH_BATCH
 
 def get_db_connection():
     conn_str = f"DRIVER={DB_DRIVER};SERVER={DB_SERVER};DATABASE={DB_NAME};UID={DB_USERNAME};PWD={DB_PASSWORD};Encrypt=no;TrustServerCertificate=yes"
-    return pyodbc.connect(conn_str)
+    conn = pyodbc.connect(conn_str)
+    conn.timeout = DB_QUERY_TIMEOUT  # Abandoned (timed out) async fetches stop on the server too
+    return conn
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes available within the checkout timeout."""
+
+class ConnectionPool:
+    """
+    Thread-safe pool of reusable database connections.
+
+    Connections are opened lazily up to `size`, health-checked on checkout when they
+    have been idle for a while, evicted once idle longer than `max_idle`, and replaced
+    when a query fails with a driver error. Checkout wait time and utilisation are
+    tracked so the pool can be sized under load (see `stats()`).
+    """
+
+    def __init__(self, connect=None, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT,
+                 max_idle=DB_POOL_MAX_IDLE, ping_after=DB_POOL_PING_AFTER):
+        # Resolved at construction so a replaced `get_db_connection` (e.g. the benchmark stand-in) is used
+        self._connect = connect or get_db_connection
+        self.size = size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.ping_after = ping_after
+        self._idle = deque()  # (conn, last_used), most recently used on the right
+        self._open = 0  # Connections currently open (idle + checked out)
+        self._in_use = 0
+        self._condition = threading.Condition()
+        self._stats = {
+            "checkouts": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "timeouts": 0,
+            "peak_in_use": 0,
+            "connects": 0,
+            "reconnects": 0,
+            "evictions": 0,
+        }
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the duration of a `with` block."""
+        started = time.perf_counter()
+        conn = self._checkout()
+        elapsed = time.perf_counter() - started
+        metrics.observe("procurement_db_connection_seconds", elapsed,
+                        help="Time to obtain a pooled connection (wait, connect and health check).")
+        metrics.annotate(db_connect_ms=round(elapsed * 1000, 3))
+        broken = False
+        try:
+            yield conn
+        except pyodbc.Error:
+            # A failed query may have killed the connection; replace it if it no longer answers
+            broken = not self._is_alive(conn)
+            raise
+        finally:
+            self._checkin(conn, broken)
+
+    def stats(self):
+        """Return a snapshot of pool counters, including average checkout wait and utilisation."""
+        with self._condition:
+            snapshot = dict(self._stats)
+            snapshot.update({
+                "size": self.size,
+                "open": self._open,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "utilisation": self._in_use / self.size if self.size else 0.0,
+            })
+        checkouts = snapshot["checkouts"]
+        snapshot["wait_time_avg"] = snapshot["wait_time_total"] / checkouts if checkouts else 0.0
+        return snapshot
+
+    def close(self):
+        """Close every idle connection. Checked-out connections are closed when returned."""
+        with self._condition:
+            idle, self._idle = list(self._idle), deque()
+            self._open -= len(idle)
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+    def _checkout(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        stale = []
+        with self._condition:
+            stale += self._evict_idle()
+            while not self._idle and self._open >= self.size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(f"No database connection available after {self.timeout} seconds.")
+                self._condition.wait(timeout=remaining)
+                stale += self._evict_idle()
+
+            if self._idle:
+                conn, last_used = self._idle.pop()
+            else:
+                conn, last_used = None, None
+                self._open += 1  # Reserve the slot before connecting outside the lock
+
+            self._in_use += 1
+            waited = time.monotonic() - started
+            self._stats["checkouts"] += 1
+            self._stats["wait_time_total"] += waited
+            self._stats["wait_time_max"] = max(self._stats["wait_time_max"], waited)
+            self._stats["peak_in_use"] = max(self._stats["peak_in_use"], self._in_use)
+
+        for stale_conn in stale:
+            self._close_quietly(stale_conn)
+
+        try:
+            if conn is None:
+                conn = self._new_connection()
+            elif time.monotonic() - last_used > self.ping_after and not self._is_alive(conn):
+                self._close_quietly(conn)
+                conn = self._new_connection()
+                with self._condition:
+                    self._stats["reconnects"] += 1
+        except Exception:
+            with self._condition:
+                self._open -= 1
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+        return conn
+
+    def _checkin(self, conn, broken=False):
+        if not broken:
+            try:
+                conn.rollback()  # Leave no open transaction behind for the next borrower
+            except pyodbc.Error:
+                broken = True
+
+        with self._condition:
+            self._in_use -= 1
+            if broken:
+                self._open -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+
+        if broken:
+            self._close_quietly(conn)
+
+    def _evict_idle(self):
+        # Called with the lock held; returns the evicted connections so they are closed
+        # outside it. The oldest idle connections sit on the left.
+        evicted = []
+        now = time.monotonic()
+        while self._idle and now - self._idle[0][1] > self.max_idle:
+            conn, _ = self._idle.popleft()
+            self._open -= 1
+            self._stats["evictions"] += 1
+            evicted.append(conn)
+        return evicted
+
+    def _new_connection(self):
+        conn = self._connect()
+        with self._condition:
+            self._stats["connects"] += 1
+        return conn
+
+    @staticmethod
+    def _is_alive(conn):
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except pyodbc.Error:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except pyodbc.Error:
+            pass
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Return the process-wide connection pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+                metrics.register_gauge("procurement_db_pool_connections", _pool_gauge,
+                                       help="Pooled database connections by state.")
+    return _pool
+
+def close_pool():
+    """Close the idle connections of the process-wide pool, if one was created (e.g. on shutdown)."""
+    if _pool is not None:
+        _pool.close()
+
+def _pool_gauge():
+    stats = _pool.stats()
+    return {(("state", state),): stats[state] for state in ("open", "in_use", "idle")}
+
+def pooled_connection():
+    """Check out a connection from the shared pool: `with pooled_connection() as conn: ...`"""
+    return get_pool().connection()
 
 def fetch_requirement_details(req_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
         # Ensure req_id is an integer before passing it to the SQL query
         if not str(req_id).isdigit():
             raise ValueError(f"Invalid req_id: {req_id}. Expected an integer.")
@@ -20,14 +232,15 @@ def fetch_requirement_details(req_id):
         FROM requirementdetails
         WHERE REQ_ID = ?
         """
-        
-        cursor.execute(query, int(req_id))  # Convert req_id to int before executing
-        result = cursor.fetchone()
-        
-        conn.close()
-        
+
+        with pooled_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, int(req_id))  # Convert req_id to int before executing
+            result = cursor.fetchone()
+            columns = [column[0] for column in cursor.description]
+
         if result:
-            return dict(zip([column[0] for column in cursor.description], result))
+            return dict(zip(columns, result))
         else:
             return {"error": f"Requirement ID {req_id} not found."}
 
@@ -38,9 +251,6 @@ def fetch_requirement_details(req_id):
 
 def fetch_requirement_items(req_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
         # Ensure req_id is an integer before querying
         if not str(req_id).isdigit():
             raise ValueError(f"Invalid req_id: {req_id}. Expected an integer.")
@@ -50,11 +260,14 @@ def fetch_requirement_items(req_id):
                OTHER_BRAND, HSN_CODE, REQUIRED_DATE
         FROM requirementitems WHERE REQ_ID = ?
         """
-        cursor.execute(query, int(req_id))  # Convert req_id to int before executing
-        data = cursor.fetchall()
-        conn.close()
 
-        return [dict(zip([column[0] for column in cursor.description], row)) for row in data]
+        with pooled_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, int(req_id))  # Convert req_id to int before executing
+            data = cursor.fetchall()
+            columns = [column[0] for column in cursor.description]
+
+        return [dict(zip(columns, row)) for row in data]
 
     except ValueError as ve:
         return {"error": str(ve)}
@@ -63,9 +276,6 @@ def fetch_requirement_items(req_id):
 
 def fetch_quotations(req_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
         # Ensure req_id is an integer before querying
         if not str(req_id).isdigit():
             raise ValueError(f"Invalid req_id: {req_id}. Expected an integer.")
@@ -75,13 +285,715 @@ def fetch_quotations(req_id):
                DELIVERY_DATE, TAX, C_GST, S_GST, I_GST, AMC, ITEM_WARRANTY
         FROM quotations WHERE REQ_ID = ?
         """
-        cursor.execute(query, int(req_id))  # Convert req_id to int before executing
-        data = cursor.fetchall()
-        conn.close()
 
-        return [dict(zip([column[0] for column in cursor.description], row)) for row in data]
+        with pooled_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, int(req_id))  # Convert req_id to int before executing
+            data = cursor.fetchall()
+            columns = [column[0] for column in cursor.description]
+
+        return [dict(zip(columns, row)) for row in data]
 
     except ValueError as ve:
         return {"error": str(ve)}
     except Exception as e:
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
+
+# Evaluation results. One row per vendor and one per scored quotation, for every evaluation run.
+RESULTS_TABLES_DDL = """
+IF OBJECT_ID('evaluationresults', 'U') IS NULL
+CREATE TABLE evaluationresults (
+    REQ_ID INT NOT NULL,
+    U_ID NVARCHAR(100) NOT NULL,
+    RUN_ID NVARCHAR(64) NOT NULL,
+    SCORE DECIMAL(5, 1) NOT NULL,
+    STATUS NVARCHAR(20) NOT NULL,
+    REASON NVARCHAR(4000) NULL,
+    EVALUATED_ON DATETIME2 NOT NULL DEFAULT SYSDATETIME(),
+    DECIDED_BY NVARCHAR(20) NULL,
+    CONSTRAINT PK_evaluationresults PRIMARY KEY (REQ_ID, U_ID, RUN_ID)
+);
+
+IF OBJECT_ID('evaluationitemscores', 'U') IS NULL
+CREATE TABLE evaluationitemscores (
+    REQ_ID INT NOT NULL,
+    U_ID NVARCHAR(100) NOT NULL,
+    RUN_ID NVARCHAR(64) NOT NULL,
+    QUOT_ID INT NOT NULL,
+    ITEM_ID INT NOT NULL,
+    LANDED_PRICE DECIMAL(18, 2) NULL,
+    LATE_DAYS FLOAT NULL,
+    BRAND_MATCH BIT NOT NULL,
+    SCORE DECIMAL(5, 2) NOT NULL,
+    HARD_FAIL BIT NOT NULL,
+    CONTENT_HASH CHAR(64) NULL,
+    CONSTRAINT PK_evaluationitemscores PRIMARY KEY (REQ_ID, U_ID, RUN_ID, QUOT_ID)
+);
+
+IF COL_LENGTH('evaluationitemscores', 'CONTENT_HASH') IS NULL
+ALTER TABLE evaluationitemscores ADD CONTENT_HASH CHAR(64) NULL;
+
+IF COL_LENGTH('evaluationresults', 'DECIDED_BY') IS NULL
+ALTER TABLE evaluationresults ADD DECIDED_BY NVARCHAR(20) NULL;
+"""
+
+_results_tables_ready = False
+
+def ensure_results_tables():
+    """Create the evaluation results tables if they do not exist yet (once per process)."""
+    global _results_tables_ready
+    if _results_tables_ready:
+        return
+    with pooled_connection() as conn:
+        conn.cursor().execute(RESULTS_TABLES_DDL)
+        conn.commit()
+    _results_tables_ready = True
+
+def save_evaluation_results(report, item_scores=None):
+    """
+    Bulk-upsert one evaluation run's vendor and per-quotation scores in a single transaction.
+
+    Rows are sent with pyodbc `fast_executemany` into session temp tables and MERGEd into
+    `evaluationresults` / `evaluationitemscores`, so saving the same run again is idempotent
+    (keyed on REQ_ID, U_ID and RUN_ID, plus QUOT_ID for item scores).
+
+    Args:
+        report (EvaluationReport): Evaluated vendors of one requirement, with its run_id.
+        item_scores (list[QuotationScore], optional): Rule-based score of every quotation.
+            Defaults to `report.item_scores`.
+
+    Returns:
+        tuple[int, int]: Number of vendor rows and item rows written.
+    """
+    item_scores = report.item_scores if item_scores is None else item_scores
+    vendor_rows = [
+        (report.req_id, vendor.vendor_id, report.run_id, vendor.score, vendor.status, vendor.reason[:4000], vendor.decided_by)
+        for vendor in report.vendors
+    ]
+    item_rows = [
+        (report.req_id, score.U_ID, report.run_id, score.QUOT_ID, score.ITEM_ID, score.LANDED_PRICE,
+         score.LATE_DAYS, score.BRAND_MATCH, score.SCORE, score.HARD_FAIL, score.CONTENT_HASH)
+        for score in item_scores
+    ]
+
+    ensure_results_tables()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.fast_executemany = True
+
+        cursor.execute("""
+            IF OBJECT_ID('tempdb..#vendor_stage') IS NOT NULL DROP TABLE #vendor_stage;
+            IF OBJECT_ID('tempdb..#item_stage') IS NOT NULL DROP TABLE #item_stage;
+            SELECT TOP 0 REQ_ID, U_ID, RUN_ID, SCORE, STATUS, REASON, DECIDED_BY INTO #vendor_stage FROM evaluationresults;
+            SELECT TOP 0 REQ_ID, U_ID, RUN_ID, QUOT_ID, ITEM_ID, LANDED_PRICE, LATE_DAYS, BRAND_MATCH, SCORE, HARD_FAIL, CONTENT_HASH
+                INTO #item_stage FROM evaluationitemscores;
+        """)
+
+        if vendor_rows:
+            cursor.executemany("INSERT INTO #vendor_stage VALUES (?, ?, ?, ?, ?, ?, ?)", vendor_rows)
+        if item_rows:
+            cursor.executemany("INSERT INTO #item_stage VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", item_rows)
+
+        cursor.execute("""
+            MERGE evaluationresults AS target
+            USING #vendor_stage AS source
+               ON target.REQ_ID = source.REQ_ID AND target.U_ID = source.U_ID AND target.RUN_ID = source.RUN_ID
+            WHEN MATCHED THEN
+                UPDATE SET SCORE = source.SCORE, STATUS = source.STATUS, REASON = source.REASON,
+                           DECIDED_BY = source.DECIDED_BY, EVALUATED_ON = SYSDATETIME()
+            WHEN NOT MATCHED THEN
+                INSERT (REQ_ID, U_ID, RUN_ID, SCORE, STATUS, REASON, DECIDED_BY)
+                VALUES (source.REQ_ID, source.U_ID, source.RUN_ID, source.SCORE, source.STATUS, source.REASON, source.DECIDED_BY);
+
+            MERGE evaluationitemscores AS target
+            USING #item_stage AS source
+               ON target.REQ_ID = source.REQ_ID AND target.U_ID = source.U_ID
+              AND target.RUN_ID = source.RUN_ID AND target.QUOT_ID = source.QUOT_ID
+            WHEN MATCHED THEN
+                UPDATE SET ITEM_ID = source.ITEM_ID, LANDED_PRICE = source.LANDED_PRICE, LATE_DAYS = source.LATE_DAYS,
+                           BRAND_MATCH = source.BRAND_MATCH, SCORE = source.SCORE, HARD_FAIL = source.HARD_FAIL,
+                           CONTENT_HASH = source.CONTENT_HASH
+            WHEN NOT MATCHED THEN
+                INSERT (REQ_ID, U_ID, RUN_ID, QUOT_ID, ITEM_ID, LANDED_PRICE, LATE_DAYS, BRAND_MATCH, SCORE, HARD_FAIL, CONTENT_HASH)
+                VALUES (source.REQ_ID, source.U_ID, source.RUN_ID, source.QUOT_ID, source.ITEM_ID, source.LANDED_PRICE,
+                        source.LATE_DAYS, source.BRAND_MATCH, source.SCORE, source.HARD_FAIL, source.CONTENT_HASH);
+
+            DROP TABLE #vendor_stage;
+            DROP TABLE #item_stage;
+        """)
+        conn.commit()
+
+    return len(vendor_rows), len(item_rows)
+
+def fetch_evaluated_requirements(req_ids):
+    """
+    Return which of the given requirements already have stored evaluation results.
+
+    Args:
+        req_ids (iterable[int]): Requirement IDs to check.
+
+    Returns:
+        set[int]: The subset of req_ids present in `evaluationresults`.
+    """
+    req_ids = [int(req_id) for req_id in req_ids]
+    if not req_ids:
+        return set()
+
+    ensure_results_tables()
+    evaluated = set()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        for batch, placeholders in _in_list_batches(req_ids):
+            cursor.execute(f"SELECT DISTINCT REQ_ID FROM evaluationresults WHERE REQ_ID IN ({placeholders})", batch)
+            evaluated.update(row[0] for row in cursor.fetchall())
+    return evaluated
+
+def fetch_latest_evaluation(req_id):
+    """
+    Read back the most recent stored evaluation run of a requirement.
+
+    Args:
+        req_id (int): Requirement ID.
+
+    Returns:
+        dict | None: `{req_id, run_id, evaluated_on, vendors}` with vendors in the
+        `{vendor_id, score, status, reason}` format plus `decided_by` ("rules", "llm",
+        "fallback", or None for runs saved before it was recorded), highest score first, or
+        None if the requirement has not been evaluated.
+    """
+    ensure_results_tables()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT U_ID, RUN_ID, SCORE, STATUS, REASON, EVALUATED_ON, DECIDED_BY
+            FROM evaluationresults
+            WHERE REQ_ID = ? AND RUN_ID = (
+                SELECT TOP 1 RUN_ID FROM evaluationresults WHERE REQ_ID = ? ORDER BY EVALUATED_ON DESC
+            )
+            ORDER BY SCORE DESC
+        """, (int(req_id), int(req_id)))
+        rows = cursor.fetchall()
+
+    if not rows:
+        return None
+    return {
+        "req_id": int(req_id),
+        "run_id": rows[0][1],
+        "evaluated_on": max(row[5] for row in rows),
+        "vendors": [
+            {"vendor_id": row[0], "score": float(row[2]), "status": row[3], "reason": row[4], "decided_by": row[6]}
+            for row in rows
+        ],
+    }
+
+def fetch_quotation_hashes(req_id, run_id):
+    """
+    Read the content hashes of the quotations scored in an evaluation run.
+
+    Args:
+        req_id (int): Requirement ID.
+        run_id (str): Evaluation run, e.g. from `fetch_latest_evaluation`.
+
+    Returns:
+        dict[int, tuple]: (ITEM_ID, U_ID, CONTENT_HASH) by QUOT_ID. CONTENT_HASH is None for runs
+        saved before hashes were recorded.
+    """
+    ensure_results_tables()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT QUOT_ID, ITEM_ID, U_ID, CONTENT_HASH FROM evaluationitemscores WHERE REQ_ID = ? AND RUN_ID = ?",
+            (int(req_id), run_id),
+        )
+        return {row[0]: (row[1], row[2], row[3]) for row in cursor.fetchall()}
+
+# SQL Server accepts at most 2100 parameters per statement
+IN_LIST_BATCH = 2000
+
+def _in_list_batches(values):
+    """Yield (batch, "?, ?, ...") pairs that keep `IN (...)` lists under the parameter limit."""
+    for start in range(0, len(values), IN_LIST_BATCH):
+        batch = values[start:start + IN_LIST_BATCH]
+        yield batch, ", ".join("?" for _ in batch)
+
+def fetch_requirement_ids(where=None):
+    """
+    List requirement IDs, optionally filtered by a SQL condition on `requirementdetails`.
+
+    Args:
+        where (str, optional): Trusted SQL condition from the operator, e.g.
+            "DATE_CREATED >= '2025-01-01'". It is inserted verbatim.
+
+    Returns:
+        list[int]: Matching REQ_IDs in ascending order.
+    """
+    query = "SELECT REQ_ID FROM requirementdetails"
+    if where:
+        query += f" WHERE {where}"
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query + " ORDER BY REQ_ID")
+        return [row[0] for row in cursor.fetchall()]
+
+def fetch_procurement_data_bulk(req_ids):
+    """
+    Load requirement details, items and quotations for many requirements with set-based queries.
+
+    One `WHERE REQ_ID IN (...)` query per table (per 2000 IDs) replaces three round trips per
+    requirement. Columns match `get_requirement_details`, `get_items` and `get_quotations`.
+
+    Args:
+        req_ids (iterable[int]): Requirement IDs.
+
+    Returns:
+        dict[int, dict]: Per REQ_ID found, `{"requirement": row, "items": [rows], "quotations": [rows]}`.
+        Rows are plain dicts of column values; quotations are ordered by ITEM_ID, QUOT_ID.
+    """
+    req_ids = sorted({int(req_id) for req_id in req_ids})
+    data = {}
+    with metrics.span("db.fetch_procurement_data_bulk", requirements=len(req_ids)) as span, pooled_connection() as conn:
+        cursor = conn.cursor()
+        for batch, placeholders in _in_list_batches(req_ids):
+            cursor.execute(f"""
+                SELECT REQ_ID, REQ_TITLE, REQ_DESC, REQ_POSTED_ON, REQ_CATEGORY, REQ_URGENCY,
+                       REQ_BUDGET, QUOTATION_PRICE_LIMIT, REQ_DELIVERY_LOC, REQ_TAXES, REQ_PAYMENT_TERMS
+                FROM requirementdetails WHERE REQ_ID IN ({placeholders})
+            """, batch)
+            columns = [column[0] for column in cursor.description]
+            for row in cursor.fetchall():
+                requirement = dict(zip(columns, row))
+                data[requirement["REQ_ID"]] = {"requirement": requirement, "items": [], "quotations": []}
+
+            cursor.execute(f"""
+                SELECT ITEM_ID, REQ_ID, PROD_ID, DESCRIPTION, QUANTITY, BRAND,
+                       OTHER_BRAND, HSN_CODE, REQUIRED_DATE
+                FROM requirementitems WHERE REQ_ID IN ({placeholders})
+                ORDER BY REQ_ID, ITEM_ID
+            """, batch)
+            columns = [column[0] for column in cursor.description]
+            for row in cursor.fetchall():
+                item = dict(zip(columns, row))
+                if item["REQ_ID"] in data:
+                    data[item["REQ_ID"]]["items"].append(item)
+
+            cursor.execute(f"""
+                SELECT QUOT_ID, ITEM_ID, REQ_ID, U_ID, PRICE, UNIT_PRICE, BRAND,
+                       DELIVERY_DATE, TAX, C_GST, S_GST, I_GST, AMC, ITEM_WARRANTY
+                FROM quotations WHERE REQ_ID IN ({placeholders})
+                ORDER BY REQ_ID, ITEM_ID, QUOT_ID
+            """, batch)
+            columns = [column[0] for column in cursor.description]
+            while True:
+                rows = cursor.fetchmany(QUOTATION_FETCH_BATCH)
+                if not rows:
+                    break
+                for row in rows:
+                    quotation = dict(zip(columns, row))
+                    if quotation["REQ_ID"] in data:
+                        data[quotation["REQ_ID"]]["quotations"].append(quotation)
+
+        span.set(rows=sum(1 + len(entry["items"]) + len(entry["quotations"]) for entry in data.values()))
+    return data
+
+# Vendor history index: running totals per vendor (U_ID) and per vendor and product key, so
+# history is updated by adding one requirement at a time instead of rescanning old quotations.
+VENDOR_HISTORY_DDL = """
+IF OBJECT_ID('vendorhistory', 'U') IS NULL
+CREATE TABLE vendorhistory (
+    U_ID NVARCHAR(100) NOT NULL PRIMARY KEY,
+    REQUIREMENTS INT NOT NULL,
+    QUOTES INT NOT NULL,
+    DELIVERY_KNOWN INT NOT NULL,
+    ON_TIME INT NOT NULL,
+    WARRANTY_SUM FLOAT NOT NULL,
+    AMC_SUM FLOAT NOT NULL,
+    PRICE_RANKED INT NOT NULL,
+    PRICE_PCT_SUM FLOAT NOT NULL,
+    UPDATED_ON DATETIME2 NOT NULL DEFAULT SYSDATETIME()
+);
+
+IF OBJECT_ID('vendorpricehistory', 'U') IS NULL
+CREATE TABLE vendorpricehistory (
+    U_ID NVARCHAR(100) NOT NULL,
+    KEY_TYPE NVARCHAR(10) NOT NULL,
+    KEY_VALUE NVARCHAR(100) NOT NULL,
+    PRICE_RANKED INT NOT NULL,
+    PRICE_PCT_SUM FLOAT NOT NULL,
+    CONSTRAINT PK_vendorpricehistory PRIMARY KEY (U_ID, KEY_TYPE, KEY_VALUE)
+);
+
+IF OBJECT_ID('vendorhistoryrequirements', 'U') IS NULL
+CREATE TABLE vendorhistoryrequirements (
+    REQ_ID INT NOT NULL PRIMARY KEY,
+    FOLDED_ON DATETIME2 NOT NULL DEFAULT SYSDATETIME()
+);
+"""
+
+_vendor_history_tables_ready = False
+
+def ensure_vendor_history_tables():
+    """Create the vendor history tables if they do not exist yet (once per process)."""
+    global _vendor_history_tables_ready
+    if _vendor_history_tables_ready:
+        return
+    with pooled_connection() as conn:
+        conn.cursor().execute(VENDOR_HISTORY_DDL)
+        conn.commit()
+    _vendor_history_tables_ready = True
+
+def fold_vendor_history(req_id, vendor_rows, price_rows):
+    """
+    Add one requirement's contribution to the vendor history totals, at most once per requirement.
+
+    The requirement is recorded in `vendorhistoryrequirements` in the same transaction as the
+    totals, so folding it again (a re-evaluation, or a refresh racing an evaluation) is a no-op.
+    Requirements whose QUOTATION_FREEZ_TIME has not passed are skipped, as more quotations may
+    still arrive.
+
+    Args:
+        req_id (int): Requirement ID.
+        vendor_rows (list[tuple]): (U_ID, REQUIREMENTS, QUOTES, DELIVERY_KNOWN, ON_TIME,
+            WARRANTY_SUM, AMC_SUM, PRICE_RANKED, PRICE_PCT_SUM) deltas.
+        price_rows (list[tuple]): (U_ID, KEY_TYPE, KEY_VALUE, PRICE_RANKED, PRICE_PCT_SUM) deltas.
+
+    Returns:
+        bool: True if the requirement was folded now, False if it was folded before or is still open.
+    """
+    ensure_vendor_history_tables()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                INSERT INTO vendorhistoryrequirements (REQ_ID)
+                SELECT REQ_ID FROM requirementdetails r
+                WHERE r.REQ_ID = ? AND r.QUOTATION_FREEZ_TIME < ?
+                  AND NOT EXISTS (SELECT 1 FROM vendorhistoryrequirements f WHERE f.REQ_ID = r.REQ_ID)
+            """, (int(req_id), datetime.now()))
+            claimed = cursor.rowcount == 1
+        except pyodbc.IntegrityError:  # Folded concurrently by another process
+            claimed = False
+        if not claimed:
+            conn.rollback()
+            return False
+
+        cursor.fast_executemany = True
+        cursor.execute("""
+            IF OBJECT_ID('tempdb..#history_stage') IS NOT NULL DROP TABLE #history_stage;
+            IF OBJECT_ID('tempdb..#price_stage') IS NOT NULL DROP TABLE #price_stage;
+            SELECT TOP 0 U_ID, REQUIREMENTS, QUOTES, DELIVERY_KNOWN, ON_TIME, WARRANTY_SUM, AMC_SUM, PRICE_RANKED, PRICE_PCT_SUM
+                INTO #history_stage FROM vendorhistory;
+            SELECT TOP 0 U_ID, KEY_TYPE, KEY_VALUE, PRICE_RANKED, PRICE_PCT_SUM INTO #price_stage FROM vendorpricehistory;
+        """)
+        if vendor_rows:
+            cursor.executemany("INSERT INTO #history_stage VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", vendor_rows)
+        if price_rows:
+            cursor.executemany("INSERT INTO #price_stage VALUES (?, ?, ?, ?, ?)", price_rows)
+
+        cursor.execute("""
+            MERGE vendorhistory AS target
+            USING #history_stage AS source
+               ON target.U_ID = source.U_ID
+            WHEN MATCHED THEN
+                UPDATE SET REQUIREMENTS = target.REQUIREMENTS + source.REQUIREMENTS, QUOTES = target.QUOTES + source.QUOTES,
+                           DELIVERY_KNOWN = target.DELIVERY_KNOWN + source.DELIVERY_KNOWN, ON_TIME = target.ON_TIME + source.ON_TIME,
+                           WARRANTY_SUM = target.WARRANTY_SUM + source.WARRANTY_SUM, AMC_SUM = target.AMC_SUM + source.AMC_SUM,
+                           PRICE_RANKED = target.PRICE_RANKED + source.PRICE_RANKED,
+                           PRICE_PCT_SUM = target.PRICE_PCT_SUM + source.PRICE_PCT_SUM, UPDATED_ON = SYSDATETIME()
+            WHEN NOT MATCHED THEN
+                INSERT (U_ID, REQUIREMENTS, QUOTES, DELIVERY_KNOWN, ON_TIME, WARRANTY_SUM, AMC_SUM, PRICE_RANKED, PRICE_PCT_SUM)
+                VALUES (source.U_ID, source.REQUIREMENTS, source.QUOTES, source.DELIVERY_KNOWN, source.ON_TIME,
+                        source.WARRANTY_SUM, source.AMC_SUM, source.PRICE_RANKED, source.PRICE_PCT_SUM);
+
+            MERGE vendorpricehistory AS target
+            USING #price_stage AS source
+               ON target.U_ID = source.U_ID AND target.KEY_TYPE = source.KEY_TYPE AND target.KEY_VALUE = source.KEY_VALUE
+            WHEN MATCHED THEN
+                UPDATE SET PRICE_RANKED = target.PRICE_RANKED + source.PRICE_RANKED,
+                           PRICE_PCT_SUM = target.PRICE_PCT_SUM + source.PRICE_PCT_SUM
+            WHEN NOT MATCHED THEN
+                INSERT (U_ID, KEY_TYPE, KEY_VALUE, PRICE_RANKED, PRICE_PCT_SUM)
+                VALUES (source.U_ID, source.KEY_TYPE, source.KEY_VALUE, source.PRICE_RANKED, source.PRICE_PCT_SUM);
+
+            DROP TABLE #history_stage;
+            DROP TABLE #price_stage;
+        """)
+        conn.commit()
+    return True
+
+def fetch_vendor_history():
+    """
+    Read the whole vendor history index.
+
+    Returns:
+        tuple[list, list]: `vendorhistory` rows (U_ID, REQUIREMENTS, QUOTES, DELIVERY_KNOWN, ON_TIME,
+        WARRANTY_SUM, AMC_SUM, PRICE_RANKED, PRICE_PCT_SUM) and `vendorpricehistory` rows
+        (U_ID, KEY_TYPE, KEY_VALUE, PRICE_RANKED, PRICE_PCT_SUM).
+    """
+    ensure_vendor_history_tables()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT U_ID, REQUIREMENTS, QUOTES, DELIVERY_KNOWN, ON_TIME, WARRANTY_SUM, AMC_SUM, PRICE_RANKED, PRICE_PCT_SUM
+            FROM vendorhistory
+        """)
+        vendors = cursor.fetchall()
+        cursor.execute("SELECT U_ID, KEY_TYPE, KEY_VALUE, PRICE_RANKED, PRICE_PCT_SUM FROM vendorpricehistory")
+        prices = cursor.fetchall()
+    return vendors, prices
+
+def fetch_unfolded_requirement_ids(frozen_before):
+    """
+    List requirements whose quotation window closed before `frozen_before` and that are not in the vendor history yet.
+
+    Returns:
+        list[int]: REQ_IDs in ascending order.
+    """
+    ensure_vendor_history_tables()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT r.REQ_ID FROM requirementdetails r
+            WHERE r.QUOTATION_FREEZ_TIME < ?
+              AND NOT EXISTS (SELECT 1 FROM vendorhistoryrequirements f WHERE f.REQ_ID = r.REQ_ID)
+            ORDER BY r.REQ_ID
+        """, (frozen_before,))
+        return [row[0] for row in cursor.fetchall()]
+
+WATERMARK_TABLE_DDL = """
+IF OBJECT_ID('pollerwatermarks', 'U') IS NULL
+CREATE TABLE pollerwatermarks (
+    POLLER_NAME NVARCHAR(100) NOT NULL PRIMARY KEY,
+    LAST_DATE_CREATED DATETIME2 NOT NULL,
+    LAST_REQ_ID INT NOT NULL,
+    UPDATED_ON DATETIME2 NOT NULL DEFAULT SYSDATETIME()
+);
+
+-- Keeps the keyset-paginated poll (fetch_requirements_since) an index seek
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_requirementdetails_created' AND object_id = OBJECT_ID('requirementdetails'))
+CREATE INDEX IX_requirementdetails_created ON requirementdetails (DATE_CREATED, REQ_ID) INCLUDE (QUOTATION_FREEZ_TIME);
+"""
+
+_watermark_table_ready = False
+
+def _ensure_watermark_table():
+    global _watermark_table_ready
+    if _watermark_table_ready:
+        return
+    with pooled_connection() as conn:
+        conn.cursor().execute(WATERMARK_TABLE_DDL)
+        conn.commit()
+    _watermark_table_ready = True
+
+def load_watermark(name):
+    """
+    Read a persisted high-watermark.
+
+    Args:
+        name (str): Watermark name, e.g. "requirements".
+
+    Returns:
+        tuple[datetime, int] | None: (DATE_CREATED, REQ_ID) of the last processed row, or None if unset.
+    """
+    _ensure_watermark_table()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT LAST_DATE_CREATED, LAST_REQ_ID FROM pollerwatermarks WHERE POLLER_NAME = ?", (name,))
+        row = cursor.fetchone()
+    return (row[0], row[1]) if row else None
+
+def save_watermark(name, date_created, req_id):
+    """Persist a high-watermark (upsert). It only moves forward, so pollers sharing it cannot move it back."""
+    _ensure_watermark_table()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            MERGE pollerwatermarks WITH (HOLDLOCK) AS target
+            USING (SELECT ? AS POLLER_NAME, ? AS LAST_DATE_CREATED, ? AS LAST_REQ_ID) AS source
+               ON target.POLLER_NAME = source.POLLER_NAME
+            WHEN MATCHED AND (source.LAST_DATE_CREATED > target.LAST_DATE_CREATED
+                              OR (source.LAST_DATE_CREATED = target.LAST_DATE_CREATED AND source.LAST_REQ_ID > target.LAST_REQ_ID)) THEN
+                UPDATE SET LAST_DATE_CREATED = source.LAST_DATE_CREATED, LAST_REQ_ID = source.LAST_REQ_ID, UPDATED_ON = SYSDATETIME()
+            WHEN NOT MATCHED THEN
+                INSERT (POLLER_NAME, LAST_DATE_CREATED, LAST_REQ_ID)
+                VALUES (source.POLLER_NAME, source.LAST_DATE_CREATED, source.LAST_REQ_ID);
+        """, (name, date_created, req_id))
+        conn.commit()
+
+def fetch_requirements_since(date_created, req_id, limit):
+    """
+    Keyset-paginated read of requirements created after a (DATE_CREATED, REQ_ID) position.
+
+    Args:
+        date_created (datetime): DATE_CREATED of the last row already seen.
+        req_id (int): REQ_ID of the last row already seen (tie-breaker for equal timestamps).
+        limit (int): Maximum number of rows to return.
+
+    Returns:
+        list: Rows with REQ_ID, QUOTATION_FREEZ_TIME and DATE_CREATED, oldest first.
+    """
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT TOP (?) REQ_ID, QUOTATION_FREEZ_TIME, DATE_CREATED
+            FROM requirementdetails
+            WHERE DATE_CREATED > ? OR (DATE_CREATED = ? AND REQ_ID > ?)
+            ORDER BY DATE_CREATED, REQ_ID
+        """, (int(limit), date_created, date_created, req_id))
+        return cursor.fetchall()
+
+def fetch_pending_requirements(date_created, req_id, freeze_after):
+    """
+    List requirements up to a (DATE_CREATED, REQ_ID) position that may still have been waiting
+    for their freeze time: QUOTATION_FREEZ_TIME after `freeze_after` and no stored results.
+
+    Used on startup to re-schedule what an earlier poller had detected but not evaluated yet.
+
+    Returns:
+        list: Rows with REQ_ID, QUOTATION_FREEZ_TIME and DATE_CREATED, earliest freeze time first.
+    """
+    ensure_results_tables()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT r.REQ_ID, r.QUOTATION_FREEZ_TIME, r.DATE_CREATED
+            FROM requirementdetails r
+            WHERE r.QUOTATION_FREEZ_TIME > ?
+              AND (r.DATE_CREATED < ? OR (r.DATE_CREATED = ? AND r.REQ_ID <= ?))
+              AND NOT EXISTS (SELECT 1 FROM evaluationresults e WHERE e.REQ_ID = r.REQ_ID)
+            ORDER BY r.QUOTATION_FREEZ_TIME, r.REQ_ID
+        """, (freeze_after, date_created, date_created, req_id))
+        return cursor.fetchall()
+
+LEASE_TABLE_DDL = """
+IF OBJECT_ID('requirementleases', 'U') IS NULL
+BEGIN
+    CREATE TABLE requirementleases (
+        REQ_ID INT NOT NULL PRIMARY KEY,
+        WORKER_ID NVARCHAR(100) NOT NULL,
+        STATUS NVARCHAR(20) NOT NULL,
+        ATTEMPTS INT NOT NULL,
+        LEASE_EXPIRES DATETIME2 NOT NULL,
+        CLAIMED_ON DATETIME2 NOT NULL DEFAULT SYSDATETIME(),
+        COMPLETED_ON DATETIME2 NULL
+    );
+    CREATE INDEX IX_requirementleases_expiry ON requirementleases (STATUS, LEASE_EXPIRES);
+END
+"""
+
+_lease_table_ready = False
+
+def ensure_lease_table():
+    global _lease_table_ready
+    if _lease_table_ready:
+        return
+    with pooled_connection() as conn:
+        conn.cursor().execute(LEASE_TABLE_DDL)
+        conn.commit()
+    _lease_table_ready = True
+
+def claim_requirement(req_id, worker_id, lease_seconds, max_attempts, retry_delay):
+    """
+    Atomically claim a requirement for one worker, with a lease that expires after `lease_seconds`.
+
+    A requirement is claimed when no worker has claimed it yet, or, if it has been attempted
+    fewer than `max_attempts` times, when the lease of the worker running it has expired (the
+    worker died) or when it failed and was last claimed more than `retry_delay` seconds ago.
+    Lease times are taken from the database clock, so workers on different hosts agree.
+
+    Returns:
+        tuple[bool, str | None]: True if `worker_id` now holds the lease; otherwise False and
+        the lease's status ("running", "done" or "failed").
+    """
+    ensure_lease_table()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            MERGE requirementleases WITH (HOLDLOCK) AS target
+            USING (SELECT ? AS REQ_ID, ? AS WORKER_ID) AS source
+               ON target.REQ_ID = source.REQ_ID
+            WHEN MATCHED AND target.ATTEMPTS < ?
+                 AND ((target.STATUS = 'running' AND target.LEASE_EXPIRES < SYSDATETIME())
+                      OR (target.STATUS = 'failed' AND target.CLAIMED_ON < DATEADD(millisecond, -?, SYSDATETIME()))) THEN
+                UPDATE SET WORKER_ID = source.WORKER_ID, STATUS = 'running', ATTEMPTS = target.ATTEMPTS + 1,
+                           LEASE_EXPIRES = DATEADD(millisecond, ?, SYSDATETIME()), CLAIMED_ON = SYSDATETIME(),
+                           COMPLETED_ON = NULL
+            WHEN NOT MATCHED THEN
+                INSERT (REQ_ID, WORKER_ID, STATUS, ATTEMPTS, LEASE_EXPIRES)
+                VALUES (source.REQ_ID, source.WORKER_ID, 'running', 1, DATEADD(millisecond, ?, SYSDATETIME()))
+            OUTPUT inserted.REQ_ID;
+        """, (int(req_id), worker_id, max_attempts, int(retry_delay * 1000), int(lease_seconds * 1000), int(lease_seconds * 1000)))
+        claimed = cursor.fetchone() is not None
+        status = None
+        if not claimed:
+            cursor.execute("SELECT STATUS FROM requirementleases WHERE REQ_ID = ?", (int(req_id),))
+            row = cursor.fetchone()
+            status = row[0] if row else None
+        conn.commit()
+    return claimed, status
+
+def renew_leases(req_ids, worker_id, lease_seconds):
+    """
+    Extend the leases `worker_id` holds on running requirements.
+
+    Returns:
+        set[int]: The subset of req_ids whose lease was renewed; the others were taken over.
+    """
+    req_ids = [int(req_id) for req_id in req_ids]
+    if not req_ids:
+        return set()
+
+    ensure_lease_table()
+    renewed = set()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        for batch, placeholders in _in_list_batches(req_ids):
+            cursor.execute(f"""
+                UPDATE requirementleases SET LEASE_EXPIRES = DATEADD(millisecond, ?, SYSDATETIME())
+                OUTPUT inserted.REQ_ID
+                WHERE WORKER_ID = ? AND STATUS = 'running' AND REQ_ID IN ({placeholders})
+            """, [int(lease_seconds * 1000), worker_id] + batch)
+            renewed.update(row[0] for row in cursor.fetchall())
+        conn.commit()
+    return renewed
+
+def complete_claim(req_id, worker_id, status):
+    """
+    Record the outcome ("done" or "failed") of a claimed requirement.
+
+    Only the worker holding the lease can complete it.
+
+    Returns:
+        bool: False if the lease had been taken over by another worker.
+    """
+    ensure_lease_table()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE requirementleases SET STATUS = ?, COMPLETED_ON = SYSDATETIME()
+            WHERE REQ_ID = ? AND WORKER_ID = ? AND STATUS = 'running'
+        """, (status, int(req_id), worker_id))
+        completed = cursor.rowcount == 1
+        conn.commit()
+    return completed
+
+def fetch_expired_claims(max_attempts, retry_delay, limit):
+    """
+    List requirements that may be claimed again: running ones whose lease expired (their worker
+    died), and failed ones last claimed more than `retry_delay` seconds ago.
+
+    Rows locked by a concurrent claim are skipped rather than waited for.
+
+    Returns:
+        list[int]: REQ_IDs, longest expired first.
+    """
+    ensure_lease_table()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT TOP (?) REQ_ID FROM requirementleases WITH (READPAST)
+            WHERE ATTEMPTS < ?
+              AND ((STATUS = 'running' AND LEASE_EXPIRES < SYSDATETIME())
+                   OR (STATUS = 'failed' AND CLAIMED_ON < DATEADD(millisecond, -?, SYSDATETIME())))
+            ORDER BY LEASE_EXPIRES
+        """, (int(limit), max_attempts, int(retry_delay * 1000)))
+        return [row[0] for row in cursor.fetchall()]
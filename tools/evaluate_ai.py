@@ -1,75 +1,641 @@
+import asyncio
 import json
 import os
-import openai  # Ensure OpenAI is installed and configured
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # Import necessary functions
-from get_requirement_details import get_requirement_details
-from get_items import get_items
-from get_quotations import get_quotations
+from async_fetch import afetch_procurement_data, fetch_procurement_data, run_sync
+from prompt_builder import build_evaluation_prompt, build_repair_prompt, chunk_quotations, count_tokens
+from llm_cache import get_cache
+import metrics
+from schemas import VendorEvaluation, EvaluationReport, QuotationScore
+from database import save_evaluation_results, fetch_latest_evaluation, fetch_quotation_hashes
+from serialization import loads, content_hash
+from quotation_set import QuotationSet
+from vendor_history import get_vendor_history
+from pydantic import ValidationError
+from config import PROMPT_TOKEN_BUDGET, EVAL_MAX_CONCURRENCY, EVAL_MAX_REPAIRS
+from config import PRESCORE_ACCEPT_SCORE, PRESCORE_REJECT_SCORE
+from config import LLM_PRICE_PROMPT_PER_1K, LLM_PRICE_COMPLETION_PER_1K
 
-# Initialize OpenAI client
-client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# OpenAI client, created on first use so importing this module stays cheap and needs no API key
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Return the process-wide OpenAI client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import openai  # Ensure OpenAI is installed and configured
+                from llm_gateway import get_http_client
+                # Rate limiting, retries and fallback are handled by the gateway
+                _client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=get_http_client(), max_retries=0)
+    return _client
+
+MODEL = "gpt-4-turbo"
+SYSTEM_PROMPT = "You are an expert in procurement analysis."
+
+# Running totals of LLM calls made by this process (cache hits are not counted)
+llm_usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+_usage_lock = threading.Lock()
+
+def _record_usage(usage):
+    with _usage_lock:
+        llm_usage["calls"] += 1
+        if usage is not None:
+            llm_usage["prompt_tokens"] += usage.prompt_tokens or 0
+            llm_usage["completion_tokens"] += usage.completion_tokens or 0
+
+def _validate_vendors(text, expected_ids):
+    """
+    Parse an LLM answer and validate each vendor entry against the VendorEvaluation schema.
+
+    Args:
+        text (str): Raw LLM answer, expected to be `{"vendors": [...]}` (a bare list is accepted too).
+        expected_ids (set[str]): Vendor IDs the answer should cover.
+
+    Returns:
+        tuple[dict, dict]: Valid evaluations by vendor_id, and an error message for every
+        expected vendor that is missing or invalid.
+    """
+    try:
+        start = min(i for i in (text.find("{"), text.find("[")) if i != -1)
+        data = json.loads(text[start:max(text.rfind("}"), text.rfind("]")) + 1])
+    except ValueError as e:
+        return {}, {vendor_id: f"answer was not valid JSON ({str(e)})" for vendor_id in expected_ids}
+
+    entries = data.get("vendors", []) if isinstance(data, dict) else data
+    valid, errors = {}, {}
+    for entry in entries if isinstance(entries, list) else []:
+        try:
+            evaluation = VendorEvaluation.model_validate(entry)
+        except ValidationError as e:
+            vendor_id = str(entry.get("vendor_id")) if isinstance(entry, dict) else None
+            if vendor_id in expected_ids:
+                errors[vendor_id] = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            continue
+        if evaluation.vendor_id in expected_ids:
+            valid[evaluation.vendor_id] = evaluation.model_copy(update={"decided_by": "llm"})
+
+    for vendor_id in expected_ids - valid.keys():
+        errors.setdefault(vendor_id, "missing")
+    return valid, errors
 
 def evaluate_vendors(req_id):
     """
-    Use an LLM to evaluate vendor quotations based on contextual semantic similarity.
-    The model determines which vendors should be accepted or rejected.
+    Evaluate vendor quotations for a requirement and decide which vendors are accepted or rejected.
+
+    Price limit, budget, landed price (with GST), delivery date and warranty/AMC checks are scored
+    locally by the rule-based pre-scoring engine. Vendors that are clearly accepted or rejected
+    never reach the LLM; only borderline vendors are sent for a contextual semantic evaluation.
+
+    Args:
+        req_id (int): Requirement ID.
+
+    Returns:
+        str: JSON list of `{vendor_id, score, status, reason}` entries, or an error message.
     """
 
+    return run_sync(aevaluate_vendors(req_id))
+
+async def aevaluate_vendors(req_id):
+    """
+    Async `evaluate_vendors`: requirement details, items and quotations are fetched concurrently.
+
+    Args:
+        req_id (int): Requirement ID.
+
+    Returns:
+        str: JSON list of `{vendor_id, score, status, reason}` entries, or an error message.
+    """
     # 🔹 Fetch procurement details
-    requirement_details = get_requirement_details(req_id)
-    items = get_items(req_id)
-    quotations = get_quotations(req_id)
+    try:
+        requirement_details, items, quotations = await afetch_procurement_data(req_id)
+    except TimeoutError as e:
+        return f"❌ {str(e)}"
+
+    return await asyncio.to_thread(evaluate_quotations, requirement_details, items, quotations)
+
+def evaluate_quotations(requirement_details, items, quotations):
+    """
+    Evaluate already-fetched procurement data (see `evaluate_vendors`).
 
-    # 🔹 Ensure JSON is properly parsed
+    Args:
+        requirement_details (dict | str): Output of `load_requirement_details` (or `get_requirement_details`).
+        items (dict | str): Output of `load_items` (or `get_items`).
+        quotations (dict | str): Output of `load_quotations` (or `get_quotations`).
+
+    Returns:
+        str: JSON list of `{vendor_id, score, status, reason}` entries, or an error message.
+    """
     try:
-        requirement_details = json.loads(requirement_details) if isinstance(requirement_details, str) else requirement_details
-        items_dict = json.loads(items).get("data", []) if isinstance(items, str) else items.get("data", [])
-        quotations_dict = json.loads(quotations) if isinstance(quotations, str) else quotations
-    except json.JSONDecodeError as e:
-        return f"❌ Error decoding JSON data: {str(e)}"
+        report = evaluate_and_save(requirement_details, items, quotations)
+    except ValueError as e:
+        return f"❌ {str(e)}"
+    except Exception as e:
+        return f"❌ Error in LLM processing: {str(e)}"
 
-    # 🔹 Prepare LLM prompt
-    prompt = f"""
-    You are a procurement evaluation assistant. Given a set of buyer requirements, item details, and vendor quotations,
-    determine which vendors should be accepted or rejected. Provide a contextual semantic similarity score for each vendor.
+    return json.dumps([vendor.model_dump() for vendor in report.vendors], indent=2)
 
-    ## Buyer Requirements:
-    {json.dumps(requirement_details, indent=2)}
+def evaluate_requirement(req_id, incremental=True, on_vendor=None):
+    """
+    Fetch, evaluate and save one requirement.
 
-    ## Items:
-    {json.dumps(items_dict, indent=2)}
+    Args:
+        req_id (int): Requirement ID.
+        incremental (bool): Reuse the stored decisions of vendors whose quotations did not change
+            (see `evaluate_and_save`).
+        on_vendor (callable): Called with each vendor's evaluation as soon as it is known (see `rank_vendors`).
 
-    ## Vendor Quotations:
-    {json.dumps(quotations_dict, indent=2)}
+    Returns:
+        EvaluationReport: See `rank_vendors`.
 
-    Evaluate vendors based on overall suitability, price, delivery time, brand relevance, warranty, and other contextual factors.
-    Provide a list of vendors with:
-    - Vendor ID
-    - Acceptance Status ("ACCEPT" or "REJECT")
-    - Contextual Similarity Score (0-100)
-    - Justification for the decision
-    All the above mentioned details must be displayed. The ID, Score, Status and Reason.
+    Raises:
+        ValueError: If the requirement cannot be fetched or its data is malformed.
+        TimeoutError: If fetching takes longer than DB_FETCH_TIMEOUT.
     """
+    return evaluate_and_save(*fetch_procurement_data(req_id), incremental=incremental, on_vendor=on_vendor)
 
-    # 🔹 Call LLM to process evaluation
+def evaluate_and_save(requirement_details, items, quotations, incremental=True, on_vendor=None):
+    """
+    Rank the vendors of already-fetched procurement data (see `rank_vendors`) and save the run.
+
+    When the requirement has been evaluated before and `incremental` is set, only vendors
+    affected by new, revised or withdrawn quotations are re-evaluated; the others keep their
+    stored decision. The requirement's quotations are also added to the vendor history index.
+    A failure to read the previous run or to save either is reported but does not fail the
+    evaluation.
+
+    Returns:
+        EvaluationReport: See `rank_vendors`.
+    """
+    requirement_details, items, quotations = _parse_inputs(requirement_details, items, quotations)
+    previous = _previous_run(requirement_details.get("REQ_ID")) if incremental else None
+    report = rank_vendors(requirement_details, items, quotations, previous=previous, on_vendor=on_vendor)
+
+    # 🔹 Persist the run so the decision can be read back without another LLM call
+    try:
+        with metrics.span("db.save_evaluation_results", req_id=report.req_id):
+            save_evaluation_results(report)
+    except Exception as e:
+        print(f"⚠️ Could not save evaluation results for REQ_ID {report.req_id}: {str(e)}")
+
+    # 🔹 Keep the vendor history current (once per requirement, after its freeze time)
+    try:
+        get_vendor_history().fold(report.req_id, items.get("data", []),
+                                  quotations.rows(("QUOT_ID", "ITEM_WARRANTY", "AMC")), report.item_scores)
+    except Exception as e:
+        print(f"⚠️ Could not update vendor history for REQ_ID {report.req_id}: {str(e)}")
+
+    return report
+
+def _previous_run(req_id):
+    # 🔹 The stored decisions and quotation hashes of the latest run, if there is one
+    try:
+        with metrics.span("db.fetch_previous_run", req_id=req_id) as span:
+            previous = fetch_latest_evaluation(req_id)
+            if previous is not None:
+                previous["hashes"] = fetch_quotation_hashes(req_id, previous["run_id"])
+                span.set(quotations=len(previous["hashes"]))
+        return previous
+    except Exception as e:
+        print(f"⚠️ Could not read the previous evaluation of REQ_ID {req_id}, evaluating in full: {str(e)}")
+        return None
+
+def _quotation_hashes(requirement, items, quotations):
+    """
+    Hash every quotation together with the requirement and item it was scored against.
+
+    A revised requirement or item therefore changes the hash of all its quotations.
+
+    Returns:
+        dict: CONTENT_HASH by QUOT_ID.
+    """
+    requirement_hash = content_hash(requirement)
+    item_hashes = {item.get("ITEM_ID"): content_hash(item, seed=requirement_hash) for item in items}
+    return {
+        row.get("QUOT_ID"): content_hash(row, seed=item_hashes.get(row.get("ITEM_ID"), requirement_hash))
+        for row in quotations
+    }
+
+def _affected_vendors(previous_hashes, quotations, hashes):
+    """
+    Find the vendors whose decision may change since a stored run.
+
+    Rule-based scores are relative to the other quotations for the same item, so every vendor
+    quoting on an item with a new, revised or withdrawn quotation is affected, as is every
+    vendor that withdrew a quotation.
+
+    Args:
+        previous_hashes (dict): (ITEM_ID, U_ID, CONTENT_HASH) by QUOT_ID, from `database.fetch_quotation_hashes`.
+        quotations (list[dict]): Current quotation rows.
+        hashes (dict): Current CONTENT_HASH by QUOT_ID, from `_quotation_hashes`.
+
+    Returns:
+        set[str] | None: U_IDs of the affected vendors, or None if the stored run has no hashes to compare.
+    """
+    if not previous_hashes or any(entry[2] is None for entry in previous_hashes.values()):
+        return None
+
+    affected_items, affected_vendors = set(), set()
+    for row in quotations:
+        previous = previous_hashes.get(row.get("QUOT_ID"))
+        if previous is None or previous[2] != hashes[row.get("QUOT_ID")]:
+            affected_items.add(str(row.get("ITEM_ID")))
+    for quot_id, (item_id, u_id, _) in previous_hashes.items():
+        if quot_id not in hashes:
+            affected_items.add(str(item_id))
+            affected_vendors.add(str(u_id))
+
+    affected_vendors.update(str(row.get("U_ID")) for row in quotations if str(row.get("ITEM_ID")) in affected_items)
+    return affected_vendors
+
+def _parse_inputs(requirement_details, items, quotations):
+    # 🔹 Typed rows are used as they are; JSON tool output is parsed once. Quotations are
+    # held column-wise (a set from `load_quotations` is used as it is).
     try:
-        response = client.chat.completions.create(
-            model="gpt-4-turbo",
-            messages=[{"role": "system", "content": "You are an expert in procurement analysis."},
+        requirement_details = loads(requirement_details) if isinstance(requirement_details, str) else requirement_details
+        items = loads(items) if isinstance(items, str) else items
+        quotations = loads(quotations) if isinstance(quotations, str) else quotations
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Error decoding JSON data: {str(e)}")
+
+    if "error" in requirement_details:
+        raise ValueError(f"Error fetching requirement: {requirement_details['error']}")
+    if "error" in quotations:
+        raise ValueError(f"Error fetching quotations: {quotations['error']}")
+    return requirement_details, items, QuotationSet.from_grouped(quotations)
+
+def rank_vendors(requirement_details, items, quotations, previous=None, on_vendor=None):
+    """
+    Score, validate and rank every vendor of a requirement.
+
+    Borderline vendors are judged by the LLM together with their history across earlier
+    requirements, read from the in-memory vendor history index.
+
+    Every quotation is scored locally on every run (rule-based scores are cheap and relative to
+    the other quotations for the item). Given a previous run, borderline vendors that are not
+    affected by a change (see `_affected_vendors`) keep their stored decision instead of going
+    to the LLM again, and vendors without quotations left drop out of the ranking.
+
+    Args:
+        requirement_details (dict | str): Output of `load_requirement_details` (or `get_requirement_details`).
+        items (dict | str): Output of `load_items` (or `get_items`).
+        quotations (dict | str): Output of `load_quotations` (or `get_quotations`).
+        previous (dict | None): Latest stored run, from `database.fetch_latest_evaluation` with
+            the run's quotation hashes under "hashes".
+        on_vendor (callable): Called with each VendorEvaluation as soon as it is decided: the
+            local and reused decisions first, then the LLM's as its answer streams in.
+
+    Returns:
+        EvaluationReport: Typed vendor evaluations, highest score first, with the rule-based
+        score of every quotation, ready for `database.save_evaluation_results`.
+
+    Raises:
+        ValueError: If the fetched data is malformed or reports an error.
+    """
+    requirement_details, items, quotations = _parse_inputs(requirement_details, items, quotations)
+    items_dict = items.get("data", [])
+
+    # 🔹 Score every quotation locally and settle the clear-cut vendors. Rows are put in a stable
+    # order so identical inputs always produce identical prompts (and LLM cache hits).
+    items_dict = sorted(items_dict, key=lambda item: str(item.get("ITEM_ID")))
+    quotation_set = quotations.sorted("ITEM_ID", "U_ID", "QUOT_ID")
+    from prescore import prescore_vendors  # Imported here: NumPy is only needed once there is something to score
+    with metrics.span("evaluate.prescore", quotations=quotation_set.row_count) as span:
+        vendors, quotation_scores = prescore_vendors(requirement_details, items_dict, quotation_set)
+        span.set(vendors=len(vendors))
+    hashes = _quotation_hashes(requirement_details, items_dict, quotation_set.rows())
+
+    # 🔹 Reuse the stored decisions of borderline vendors whose quotations are unchanged
+    reused = []
+    affected = _affected_vendors(previous["hashes"], list(quotation_set.rows(("QUOT_ID", "ITEM_ID", "U_ID"))), hashes) if previous else None
+    if affected is not None:
+        stored = {str(vendor["vendor_id"]): vendor for vendor in previous["vendors"]}
+        # Decisions of the rule-based fallback are not kept: the LLM is asked again
+        reused = [
+            VendorEvaluation.model_validate(stored[vendor["vendor_id"]]) for vendor in vendors
+            if vendor["status"] == "borderline" and vendor["vendor_id"] not in affected and vendor["vendor_id"] in stored
+            and stored[vendor["vendor_id"]].get("decided_by") != "fallback"
+        ]
+        if reused:
+            print(f"♻️ Reused {len(reused)} stored decision(s); {len(affected)} vendor(s) affected by changed quotations.")
+            metrics.inc("procurement_vendors_reused_total", len(reused), help="Stored vendor decisions reused by incremental re-evaluation.")
+    reused_ids = {vendor.vendor_id for vendor in reused}
+
+    decided = [
+        VendorEvaluation.model_validate(dict({key: vendor[key] for key in ("vendor_id", "score", "status", "reason")}, decided_by="rules"))
+        for vendor in vendors if vendor["status"] != "borderline"
+    ]
+    borderline = [vendor for vendor in vendors if vendor["status"] == "borderline" and vendor["vendor_id"] not in reused_ids]
+    for evaluation in decided + reused if on_vendor else ():
+        on_vendor(evaluation)
+
+    # 🔹 Only the borderline vendors' quotations (with their rule-based scores) go to the LLM
+    llm_vendors = []
+    if borderline:
+        borderline_ids = {vendor["vendor_id"] for vendor in borderline}
+        history = get_vendor_history().lookup(borderline_ids, items_dict)
+        for vendor in borderline:
+            vendor["history"] = history.get(vendor["vendor_id"])
+        # Scores are in set order, so only the borderline vendors' rows are built as dicts
+        indexes = [index for index, score in enumerate(quotation_scores) if str(score["U_ID"]) in borderline_ids]
+        borderline_quotations = [
+            dict(row, RULE_SCORE=quotation_scores[index]["SCORE"], RULE_FLAGS=quotation_scores[index]["FLAGS"])
+            for index, row in zip(indexes, quotation_set.take(indexes).rows())
+        ]
+
+        # 🔹 Call LLM to process evaluation
+        with metrics.span("evaluate.llm", vendors=len(borderline)):
+            llm_vendors = _evaluate_borderline(requirement_details, items_dict, borderline, borderline_quotations, on_vendor)
+
+    # 🔹 One ranking across rule-based and LLM decisions
+    ranking = sorted(decided + reused + llm_vendors, key=lambda vendor: vendor.score, reverse=True)
+    return EvaluationReport(
+        req_id=int(requirement_details.get("REQ_ID")),
+        vendors=ranking,
+        item_scores=[QuotationScore.model_validate(dict(score, CONTENT_HASH=hashes[score["QUOT_ID"]])) for score in quotation_scores],
+    )
+
+def _temperature():
+    # Cached answers are only reusable if the evaluation is deterministic
+    return 0 if get_cache().enabled else 0.7
+
+def _call_llm(prompt, on_delta=None):
+    """
+    Send one evaluation prompt through the LLM gateway (see `llm_gateway.py`).
+
+    Args:
+        prompt (str): Evaluation prompt.
+        on_delta (callable): If given, the answer is streamed and each text fragment is passed
+            to it as it arrives.
+
+    Returns:
+        tuple[str, str | None]: The answer, and the fallback model that gave it (None for MODEL).
+    """
+    from llm_gateway import FALLBACK_HEADER
+
+    with metrics.span("llm.call", model=MODEL, stream=on_delta is not None) as span:
+        request = dict(
+            model=MODEL,
+            messages=[{"role": "system", "content": SYSTEM_PROMPT},
                       {"role": "user", "content": prompt}],
-            temperature=0.7
+            temperature=_temperature(),
+            response_format={"type": "json_object"}
         )
-        evaluation_results = response.choices[0].message.content.strip()
-        return evaluation_results
-    except Exception as e:
-        return f"❌ Error in LLM processing: {str(e)}"
+        if on_delta is None:
+            raw = get_client().chat.completions.with_raw_response.create(**request)
+            response = raw.parse()
+            content, usage = response.choices[0].message.content, response.usage
+        else:
+            raw = get_client().chat.completions.with_raw_response.create(**request, stream=True, stream_options={"include_usage": True})
+            parts, usage = [], None
+            for chunk in raw.parse():
+                usage = chunk.usage or usage
+                for choice in chunk.choices:
+                    if choice.delta.content:
+                        parts.append(choice.delta.content)
+                        on_delta(choice.delta.content)
+            content = "".join(parts)
+
+        _record_usage(usage)
+        if usage is not None:
+            _record_token_metrics(span, "evaluator", usage.prompt_tokens or 0, usage.completion_tokens or 0)
+        fallback = raw.headers.get(FALLBACK_HEADER)
+        if fallback:
+            span.set(fallback_model=fallback)
+        return (content or "").strip(), fallback
+
+def _record_token_metrics(span, source, prompt_tokens, completion_tokens):
+    cost = (prompt_tokens * LLM_PRICE_PROMPT_PER_1K + completion_tokens * LLM_PRICE_COMPLETION_PER_1K) / 1000
+    span.set(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, cost_usd=round(cost, 6))
+    metrics.inc("procurement_llm_tokens_total", prompt_tokens, help="LLM tokens used.", source=source, kind="prompt")
+    metrics.inc("procurement_llm_tokens_total", completion_tokens, help="LLM tokens used.", source=source, kind="completion")
+    metrics.inc("procurement_llm_cost_usd_total", cost, help="Estimated LLM cost in USD.", source=source)
+
+class _VendorStream:
+    """
+    Pick complete vendor entries out of a streamed `{"vendors": [...]}` answer.
+
+    Each entry is validated and handed to `on_vendor` as soon as its closing brace arrives,
+    so the first decisions are available long before a large answer is complete.
+    """
+
+    def __init__(self, expected_ids, on_vendor):
+        self.expected_ids = expected_ids
+        self.on_vendor = on_vendor
+        self.emitted = set()
+        self.evaluations = {}  # Emitted evaluations by vendor_id
+        self._text = ""
+        self._pos = None
+        self._decoder = json.JSONDecoder()
+
+    def feed(self, delta):
+        self._text += delta
+        if self._pos is None:
+            start = self._text.find("[")
+            if start == -1:
+                return
+            self._pos = start + 1
+        while True:
+            while self._pos < len(self._text) and self._text[self._pos] in " \t\r\n,":
+                self._pos += 1
+            if self._pos >= len(self._text) or self._text[self._pos] != "{":
+                return
+            try:
+                entry, self._pos = self._decoder.raw_decode(self._text, self._pos)
+            except ValueError:
+                return  # Incomplete entry; wait for more text
+            try:
+                evaluation = VendorEvaluation.model_validate(entry)
+            except ValidationError:
+                continue  # Re-asked for once the answer is complete
+            if evaluation.vendor_id in self.expected_ids and evaluation.vendor_id not in self.emitted:
+                self.emitted.add(evaluation.vendor_id)
+                self.evaluations[evaluation.vendor_id] = evaluation.model_copy(update={"decided_by": "llm"})
+                self.on_vendor(evaluation)
+
+def _evaluate_chunk(requirement, items, vendors, quotations, on_vendor=None):
+    """
+    Evaluate one set of borderline vendors and return a validated VendorEvaluation for each.
+
+    Entries that are missing or fail validation are re-asked for with a prompt restricted to
+    just those vendors, up to EVAL_MAX_REPAIRS times. Vendors still without a valid answer, or
+    left without one because the LLM is unavailable (an API or transport error after the
+    gateway's retries), fall back to their rule-based score. Complete answers are cached under
+    the original prompt, unless they came from the fallback model.
+
+    If `on_vendor` is given, the answer is streamed and it is called once for every vendor,
+    as soon as its evaluation is known.
+    """
+    def restrict(vendor_ids):
+        vendor_quotations = [row for row in quotations if str(row.get("U_ID")) in vendor_ids]
+        item_ids = {row.get("ITEM_ID") for row in vendor_quotations}
+        return build_evaluation_prompt(
+            requirement,
+            [item for item in items if item.get("ITEM_ID") in item_ids],
+            _vendor_summaries(vendor for vendor in vendors if vendor["vendor_id"] in vendor_ids),
+            vendor_quotations,
+        )
+
+    expected_ids = {vendor["vendor_id"] for vendor in vendors}
+    prompt = restrict(expected_ids)
+
+    cache = get_cache()
+    key = cache.make_key(MODEL, _temperature(), SYSTEM_PROMPT, prompt)
+    cached = cache.get(key)
+    metrics.inc("procurement_llm_cache_lookups_total", help="LLM cache lookups.", result="miss" if cached is None else "hit")
+    if cached is not None:
+        valid, errors = _validate_vendors(cached, expected_ids)
+        if not errors:
+            for evaluation in valid.values() if on_vendor else ():
+                on_vendor(evaluation)
+            return list(valid.values())
+
+    from openai import APIError
+    from httpx import TransportError
+
+    stream = _VendorStream(expected_ids, on_vendor) if on_vendor else None
+    unavailable = False
+    try:
+        answer, fallback = _call_llm(prompt, stream.feed if stream else None)
+        valid, errors = _validate_vendors(answer, expected_ids)
+    except (APIError, TransportError) as e:
+        # Still failing after the gateway's retries, or the circuit is open with no fallback model
+        print(f"⚠️ LLM unavailable for {len(expected_ids)} vendor(s): {e}")
+        unavailable, fallback = True, None
+        valid = dict(stream.evaluations) if stream else {}  # Entries streamed before the failure stand
+        errors = {vendor_id: f"unavailable ({e})" for vendor_id in expected_ids - valid.keys()}
+    for _ in range(EVAL_MAX_REPAIRS):
+        if not errors or unavailable:
+            break
+        print(f"Re-asking for {len(errors)} vendor(s) with missing or invalid evaluations.")
+        metrics.inc("procurement_llm_retries_total", help="LLM calls repeated.", reason="invalid_answer")
+        try:
+            answer, repair_fallback = _call_llm(build_repair_prompt(restrict(set(errors)), errors))
+        except (APIError, TransportError) as e:
+            print(f"⚠️ LLM unavailable while re-asking for {len(errors)} vendor(s): {e}")
+            unavailable = True
+            break
+        fallback = fallback or repair_fallback
+        repaired, errors = _validate_vendors(answer, set(errors))
+        valid.update(repaired)
+
+    if not errors and not fallback and not unavailable:
+        # Only complete, validated answers of the configured model are worth replaying
+        cache.set(key, json.dumps({"vendors": [vendor.model_dump() for vendor in valid.values()]}))
+
+    for vendor in vendors:
+        if vendor["vendor_id"] in errors:
+            valid[vendor["vendor_id"]] = _rule_based_fallback(vendor, errors[vendor["vendor_id"]])
+    if errors:
+        metrics.inc("procurement_llm_fallbacks_total", len(errors), help="Vendors decided by the rule-based fallback.")
+    if stream:
+        for vendor_id, evaluation in valid.items():
+            if vendor_id not in stream.emitted:
+                on_vendor(evaluation)
+    return list(valid.values())
+
+# Vendor history columns of the borderline vendor table (empty for vendors without history)
+HISTORY_COLUMNS = ("requirements", "quotes", "on_time_ratio", "price_percentile", "avg_warranty", "avg_amc")
+
+def _vendor_summaries(vendors):
+    return [
+        {"vendor_id": vendor["vendor_id"], "rule_score": vendor["score"], "flags": vendor["flags"],
+         **{f"history_{column}": (vendor.get("history") or {}).get(column) for column in HISTORY_COLUMNS}}
+        for vendor in vendors
+    ]
+
+def _rule_based_fallback(vendor, error):
+    # Borderline scores lie between the reject and accept thresholds; split the range in half
+    threshold = (PRESCORE_ACCEPT_SCORE + PRESCORE_REJECT_SCORE) / 2
+    return VendorEvaluation(
+        vendor_id=vendor["vendor_id"],
+        score=vendor["score"],
+        status="accepted" if vendor["score"] >= threshold else "rejected",
+        reason=f"{vendor['reason']} (rule-based fallback: LLM evaluation {error})",
+        decided_by="fallback",
+    )
+
+def _evaluate_borderline(requirement, items, borderline, quotations, on_vendor=None):
+    """
+    Ask the LLM to judge the borderline vendors, splitting the work when the prompt is too large.
+
+    The prompt is measured with the local tokenizer. If it exceeds PROMPT_TOKEN_BUDGET, the
+    quotations are split by item (or by vendor within an oversized item) into chunks that are
+    evaluated concurrently and merged into one result per vendor.
+
+    `on_vendor` is called once per vendor as its evaluation becomes known: while the answer
+    streams in for a single prompt, after the merge for chunked evaluations.
+    """
+    prompt = build_evaluation_prompt(requirement, items, _vendor_summaries(borderline), quotations)
+    if count_tokens(prompt, MODEL) <= PROMPT_TOKEN_BUDGET:
+        return _evaluate_chunk(requirement, items, borderline, quotations, on_vendor)
+
+    # Map: each chunk only carries the items and vendors its quotations refer to. A quarter of the
+    # budget left after the fixed text is kept for those item and vendor tables.
+    fixed_tokens = count_tokens(build_evaluation_prompt(requirement, [], [], []), MODEL)
+    chunks = chunk_quotations(quotations, max((PROMPT_TOKEN_BUDGET - fixed_tokens) * 3 // 4, 1), MODEL)
+
+    print(f"Prompt exceeds {PROMPT_TOKEN_BUDGET} tokens; evaluating {len(chunks)} chunks.")
+    with ThreadPoolExecutor(max_workers=EVAL_MAX_CONCURRENCY) as executor:
+        futures = []
+        for chunk in chunks:
+            vendor_ids = {str(row.get("U_ID")) for row in chunk}
+            chunk_vendors = [vendor for vendor in borderline if vendor["vendor_id"] in vendor_ids]
+            futures.append(executor.submit(metrics.bind_context(_evaluate_chunk), requirement, items, chunk_vendors, chunk))
+        chunk_results = [future.result() for future in futures]
+
+    # Reduce
+    results = _merge_vendor_results(chunk_results)
+    for evaluation in results if on_vendor else ():
+        on_vendor(evaluation)
+    return results
+
+def _merge_vendor_results(chunk_results):
+    """
+    Merge per-chunk vendor evaluations into one entry per vendor.
+
+    A vendor's score is the mean of its chunk scores, and it is rejected if any chunk rejected it.
+    It counts as decided by the fallback if any of its chunks was.
+    """
+    merged = {}
+    for vendors in chunk_results:
+        for vendor in vendors:
+            merged.setdefault(vendor.vendor_id, []).append(vendor)
+
+    results = []
+    for vendor_id, entries in merged.items():
+        results.append(VendorEvaluation(
+            vendor_id=vendor_id,
+            score=round(sum(entry.score for entry in entries) / len(entries), 1),
+            status="rejected" if any(entry.status == "rejected" for entry in entries) else "accepted",
+            reason=" ".join(dict.fromkeys(entry.reason for entry in entries)).strip(),
+            decided_by="fallback" if any(entry.decided_by == "fallback" for entry in entries) else "llm",
+        ))
+    return results
 
 if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser(description="Evaluate vendors for a given requirement ID.")
     parser.add_argument("req_id", type=int, help="Requirement ID (REQ_ID) to evaluate vendors for.")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the LLM instead of reusing cached evaluations.")
+    parser.add_argument("--full", action="store_true", help="Re-evaluate every vendor instead of only those affected by changed quotations.")
+    parser.add_argument("--stream", action="store_true", help="Print each vendor's evaluation (one JSON line) as soon as it is decided.")
     args = parser.parse_args()
 
-    print(evaluate_vendors(args.req_id))
\ No newline at end of file
+    if args.no_cache:
+        get_cache().enabled = False
+
+    if args.stream:
+        evaluate_requirement(args.req_id, incremental=not args.full,
+                             on_vendor=lambda vendor: print(json.dumps(vendor.model_dump()), flush=True))
+    elif args.full:
+        report = evaluate_requirement(args.req_id, incremental=False)
+        print(json.dumps([vendor.model_dump() for vendor in report.vendors], indent=2))
+    else:
+        print(evaluate_vendors(args.req_id))
\ No newline at end of file
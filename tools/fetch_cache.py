@@ -0,0 +1,142 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from contextlib import contextmanager
+import metrics
+from config import FETCH_CACHE_ENABLED, FETCH_CACHE_TTL, FETCH_CACHE_MAX_ENTRIES
+
+class FetchCache:
+    """
+    In-process read-through cache of fetcher results, scoped to the requirements being evaluated.
+
+    Results are only cached for a requirement while a `scope` for it is open (e.g. one team run),
+    so every agent and the evaluator in that run share one snapshot of the requirement, and
+    nothing is served from the cache outside a run. Entries expire after `ttl` seconds, the
+    least recently used are evicted beyond `max_entries`, and a requirement's entries are
+    dropped when its last scope closes or it is invalidated. Concurrent misses for the same
+    entry are coalesced into one query. Error results are never cached.
+
+    Cached results are shared: callers must treat them as read-only.
+    """
+
+    def __init__(self, ttl=FETCH_CACHE_TTL, max_entries=FETCH_CACHE_MAX_ENTRIES, enabled=FETCH_CACHE_ENABLED):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._entries = OrderedDict()  # (fetcher, req_id) -> (stored_at, result), least recently used first
+        self._scopes = {}  # req_id -> number of open scopes
+        self._loading = {}  # (fetcher, req_id) -> lock held while the entry is being fetched
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _req_key(req_id):
+        # Agents pass REQ_IDs as ints or strings
+        return str(req_id).strip()
+
+    @contextmanager
+    def scope(self, req_id):
+        """Cache fetches of `req_id` until the block exits (scopes for the same requirement nest)."""
+        key = self._req_key(req_id)
+        with self._lock:
+            self._scopes[key] = self._scopes.get(key, 0) + 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._scopes[key] -= 1
+                if not self._scopes[key]:
+                    del self._scopes[key]
+                    self._drop(key)
+
+    def invalidate(self, req_id, fetcher=None):
+        """Drop the cached results of `req_id` (only those of `fetcher` if given), e.g. when a quotation arrives."""
+        with self._lock:
+            self._drop(self._req_key(req_id), fetcher)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _drop(self, req_key, fetcher=None):
+        # Called with the lock held
+        for entry_key in [key for key in self._entries if key[1] == req_key and fetcher in (None, key[0])]:
+            del self._entries[entry_key]
+
+    def get_or_load(self, fetcher, req_id, load):
+        """
+        Return the cached result of `fetcher` for `req_id`, calling `load()` on a miss.
+
+        Outside a scope for `req_id` (or when disabled), `load()` is always called.
+        """
+        req_key = self._req_key(req_id)
+        key = (fetcher, req_key)
+        if not self.enabled or req_key not in self._scopes:
+            return load()
+
+        with self._lock:
+            result = self._lookup(key)
+            loading = self._loading.setdefault(key, threading.Lock()) if result is None else None
+        if result is not None:
+            metrics.inc("procurement_fetch_cache_lookups_total", help="Fetcher cache lookups.", fetcher=fetcher, result="hit")
+            return result
+
+        with loading:
+            # Another thread may have fetched the entry while this one waited
+            with self._lock:
+                result = self._lookup(key)
+            metrics.inc("procurement_fetch_cache_lookups_total", help="Fetcher cache lookups.", fetcher=fetcher,
+                        result="miss" if result is None else "hit")
+            if result is None:
+                result = load()
+                if _cacheable(result):
+                    with self._lock:
+                        if req_key in self._scopes:
+                            self._entries[key] = (time.monotonic(), result)
+                            while len(self._entries) > self.max_entries:
+                                self._entries.popitem(last=False)
+        with self._lock:
+            if self._loading.get(key) is loading and not loading.locked():
+                del self._loading[key]
+        return result
+
+    def _lookup(self, key):
+        # Called with the lock held
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+def _cacheable(result):
+    # Fetchers report errors in-band ({"error": ...} or {"status": "error", ...})
+    return isinstance(result, Mapping) and "error" not in result and result.get("status") != "error"
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_fetch_cache():
+    """Return the process-wide fetch cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = FetchCache()
+    return _cache
+
+def read_through(fetcher):
+    """Decorate a `load_*(req_id)` fetcher so it is served from the fetch cache inside a scope."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(req_id):
+            return get_fetch_cache().get_or_load(fetcher, req_id, lambda: func(req_id))
+        return wrapper
+    return decorator
+
+def requirement_scope(req_id):
+    """Share one fetched snapshot of `req_id` between all fetches in the block (see `FetchCache`)."""
+    return get_fetch_cache().scope(req_id)
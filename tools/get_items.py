@@ -1,65 +1,66 @@
-from database import get_db_connection
-import json
-from datetime import datetime
-from decimal import Decimal
+from database import pooled_connection
+from serialization import dumps
+from fetch_cache import read_through
+import metrics
 import argparse
 
-def serialize_value(value):
-    """Convert non-serializable values to a JSON-friendly format."""
-    if isinstance(value, datetime):
-        return value.strftime('%Y-%m-%d %H:%M:%S')  # Convert datetime to string
-    if isinstance(value, Decimal):
-        return float(value)  # Convert decimal to float
-    return value
-
-def get_items(req_id):
+@read_through("items")
+def load_items(req_id):
     """
-    Fetch product specifications based on req_id.
+    Load product specifications based on req_id, with values as the database returns them.
 
     Args:
         req_id (int): Requirement ID.
 
     Returns:
-        str: JSON string of product specifications or error message.
+        dict: `{"status": "success", "data": [rows]}` (datetime and Decimal values unconverted),
+        or `{"status": "error", "message": ...}`.
     """
     try:
         #print(f"🔍 Fetching items for REQ_ID: {req_id}")
 
         # Ensure req_id is an integer before querying
         if not str(req_id).isdigit():
-            return json.dumps({"status": "error", "message": f"Invalid req_id: {req_id}. Expected an integer."}, indent=2)
-
-        conn = get_db_connection()
-        cursor = conn.cursor()
+            return {"status": "error", "message": f"Invalid req_id: {req_id}. Expected an integer."}
 
         query = """
         SELECT ITEM_ID, REQ_ID, PROD_ID, DESCRIPTION, QUANTITY, BRAND, 
                OTHER_BRAND, HSN_CODE, REQUIRED_DATE
         FROM requirementitems WHERE REQ_ID = ?
         """
-        
-        cursor.execute(query, (int(req_id),))  # Convert req_id to int before executing
-        data = cursor.fetchall()
+
+        with metrics.span("db.get_items", req_id=req_id) as span, pooled_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, (int(req_id),))  # Convert req_id to int before executing
+            data = cursor.fetchall()
+            columns = [column[0] for column in cursor.description]
+            span.set(rows=len(data))
 
         #print(f"✅ Query executed successfully. Fetched {len(data)} rows.")
 
         if data:
-            # Convert to list of dictionaries with proper serialization
-            result_list = [
-                {column[0]: serialize_value(value) for column, value in zip(cursor.description, row)}
-                for row in data
-            ]
-
-            return json.dumps({"status": "success", "data": result_list}, indent=2)
+            # Convert to list of dictionaries
+            return {"status": "success", "data": [dict(zip(columns, row)) for row in data]}
         else:
-            return json.dumps({"status": "error", "message": f"No items found for Requirement ID {req_id}."}, indent=2)
+            return {"status": "error", "message": f"No items found for Requirement ID {req_id}."}
 
     except ValueError as ve:
-        return json.dumps({"status": "error", "message": f"Value Error: {str(ve)}"}, indent=2)
+        return {"status": "error", "message": f"Value Error: {str(ve)}"}
     except Exception as e:
-        return json.dumps({"status": "error", "message": f"Database Error: {str(e)}"}, indent=2)
-    finally:
-        conn.close()
+        return {"status": "error", "message": f"Database Error: {str(e)}"}
+
+def get_items(req_id):
+    """
+    Fetch product specifications based on req_id.
+
+    Args:
+        req_id (int): Requirement ID.
+
+    Returns:
+        str: JSON string of product specifications or error message.
+    """
+    # Datetimes and Decimals are converted by the encoder
+    return dumps(load_items(req_id), indent=True)
 
 if __name__ == "__main__":
     # Set up argument parser to accept req_id as a command line argument
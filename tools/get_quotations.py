@@ -1,119 +1,133 @@
-from database import get_db_connection
-import json
+from database import pooled_connection
+from serialization import dumps
+from fetch_cache import read_through
+from quotation_set import QuotationSet
+import metrics
+from config import QUOTATION_FETCH_BATCH
 from datetime import datetime
-from decimal import Decimal
+from itertools import chain
 import argparse
 
-def serialize_value(value):
-    """Convert non-serializable values to a JSON-friendly format."""
-    if isinstance(value, datetime):
-        return value.strftime('%Y-%m-%d %H:%M:%S')  # Convert datetime to string
-    if isinstance(value, Decimal):
-        return float(value)  # Convert decimal to float
-    return value
-
-def get_quotations(req_id):
+def iter_quotations(req_id, batch_size=QUOTATION_FETCH_BATCH):
     """
-    Fetch all vendor quotations submitted within the valid timeframe for a given requirement ID (REQ_ID).
+    Stream all vendor quotations for a given requirement ID (REQ_ID), ordered by ITEM_ID.
+
+    Uses a single query and `cursor.fetchmany`, so at most `batch_size` rows are held
+    in memory at a time regardless of how many quotations the requirement has.
 
     Args:
         req_id (int): Requirement ID.
+        batch_size (int): Number of rows fetched per round trip.
+
+    Yields:
+        list[dict]: Batches of quotation rows, with values as the database returns them.
+
+    Raises:
+        ValueError: If req_id is not an integer or the requirement dates are malformed.
+        LookupError: If the requirement does not exist or has no quotations.
+    """
+    for columns, rows in _iter_quotation_batches(req_id, batch_size):
+        yield [dict(zip(columns, row)) for row in rows]
+
+def _iter_quotation_batches(req_id, batch_size=QUOTATION_FETCH_BATCH):
+    # Yields (column names, batch of row tuples); see `iter_quotations`
+    # Ensure req_id is an integer before querying
+    if not str(req_id).isdigit():
+        raise ValueError(f"Invalid req_id: {req_id}. Expected an integer.")
+
+    # One round trip: the requirement row is LEFT JOINed so a missing requirement and a
+    # requirement without quotations can still be told apart.
+    query = """
+    SELECT r.REQ_POSTED_ON, r.QUOTATION_FREEZ_TIME,
+           q.QUOT_ID, q.ITEM_ID, q.REQ_ID, q.U_ID, q.PRICE, q.UNIT_PRICE, q.BRAND, 
+           q.DELIVERY_DATE, q.TAX, q.C_GST, q.S_GST, q.I_GST, q.AMC, q.ITEM_WARRANTY
+    FROM requirementdetails r
+    LEFT JOIN quotations q ON q.REQ_ID = r.REQ_ID
+    WHERE r.REQ_ID = ?
+    ORDER BY q.ITEM_ID, q.QUOT_ID
+    """
+    #AND q.DATE_CREATED BETWEEN r.REQ_POSTED_ON AND r.QUOTATION_FREEZ_TIME
+
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, (int(req_id),))
+        columns = [column[0] for column in cursor.description][2:]
+
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            raise LookupError(f"Requirement ID {req_id} not found.")
+
+        req_posted_on, quotation_freez_time = rows[0][0], rows[0][1]
+        if not isinstance(req_posted_on, datetime):
+            raise ValueError("Invalid format for REQ_POSTED_ON.")
+        if not isinstance(quotation_freez_time, datetime):
+            raise ValueError("Invalid format for QUOTATION_FREEZ_TIME.")
+
+        # The LEFT JOIN yields a single row of NULL quotation columns when there are none
+        if rows[0][2] is None:
+            raise LookupError(f"No items found for Requirement ID {req_id}.")
+
+        while rows:
+            yield columns, [row[2:] for row in rows]
+            rows = cursor.fetchmany(batch_size)
+
+@read_through("quotations")
+def load_quotations(req_id):
+    """
+    Load all vendor quotations for a given requirement ID (REQ_ID), grouped by ITEM_ID.
+
+    The rows are stored column by column, straight from the fetched batches, in a
+    `QuotationSet`. It reads like the `{ITEM_ID: [rows]}` dict (row dicts are built on access),
+    and the evaluator uses its columns directly.
 
     Returns:
-        str: JSON string of filtered quotations, or an error message if something goes wrong.
+        QuotationSet | dict: `{ITEM_ID: [rows]}` (datetime values unconverted), or `{"error": ...}`.
     """
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with metrics.span("db.get_quotations", req_id=req_id) as span:
+            batches = _iter_quotation_batches(req_id)
+            columns, first = next(batches)
+            result = QuotationSet.from_batches(columns, chain([first], (rows for _, rows in batches)))
+            span.set(rows=result.row_count)
 
-        # Ensure req_id is an integer before querying
-        if not str(req_id).isdigit():
-            return json.dumps({"error": f"Invalid req_id: {req_id}. Expected an integer."})
-
-        # Fetch REQ_POSTED_ON and QUOTATION_FREEZ_TIME for the given REQ_ID
-        cursor.execute("""
-            SELECT REQ_POSTED_ON, QUOTATION_FREEZ_TIME
-            FROM requirementdetails
-            WHERE REQ_ID = ?
-        """, (int(req_id),))
-        req_details = cursor.fetchone()
-
-        if not req_details:
-            return json.dumps({"error": f"Requirement ID {req_id} not found."})
-
-        req_posted_on, quotation_freez_time = req_details
-
-        # Convert datetime values to strings
-        if isinstance(req_posted_on, datetime):
-            req_posted_on_str = req_posted_on.strftime('%Y-%m-%d %H:%M:%S')
-        else:
-            return json.dumps({"error": "Invalid format for REQ_POSTED_ON."})
-
-        if isinstance(quotation_freez_time, datetime):
-            quotation_freez_time_str = quotation_freez_time.strftime('%Y-%m-%d %H:%M:%S')
-        else:
-            return json.dumps({"error": "Invalid format for QUOTATION_FREEZ_TIME."})
-
-        # Fetch all item IDs associated with the given REQ_ID
-        cursor.execute("""
-            SELECT DISTINCT ITEM_ID
-            FROM quotations 
-            WHERE REQ_ID = ?
-        """, (int(req_id),))
-        items = cursor.fetchall()
-
-        if not items:
-            return json.dumps({"error": f"No items found for Requirement ID {req_id}."})
-
-        # Prepare the result to hold quotations per item
-        result = {}
-
-        for item in items:
-            item_id = item[0]
-
-            # Fetch quotations submitted within the valid timeframe
-            query = """
-            SELECT QUOT_ID, ITEM_ID, REQ_ID, U_ID, PRICE, UNIT_PRICE, BRAND, 
-                   DELIVERY_DATE, TAX, C_GST, S_GST, I_GST, AMC, ITEM_WARRANTY
-            FROM quotations 
-            WHERE REQ_ID = ? AND ITEM_ID = ?
-            """
-            #AND DATE_CREATED BETWEEN ? AND ?
-            cursor.execute(query, (int(req_id), item_id))
-                                                        #, req_posted_on_str, quotation_freez_time_str
-            data = cursor.fetchall()
-
-            if data:
-                item_quotations = []
-                columns = [column[0] for column in cursor.description]
-
-                for row in data:
-                    row_dict = dict(zip(columns, row))
-
-                    # Use serialize_value to handle datetime and Decimal conversion
-                    for key, value in row_dict.items():
-                        row_dict[key] = serialize_value(value)
-
-                    item_quotations.append(row_dict)
-
-                result[item_id] = item_quotations
-            else:
-                result[item_id] = []  # No quotations found for this item within the valid timeframe
-
-        return json.dumps(result, indent=2)  # Return the data as a formatted JSON string
+        return result
 
+    except (ValueError, LookupError) as e:
+        return {"error": str(e)}
     except Exception as e:
-        return json.dumps({"error": f"Error: {str(e)}"})  # Return error as JSON string
-    finally:
-        conn.close()
+        return {"error": f"Error: {str(e)}"}
+
+def get_quotations(req_id):
+    """
+    Fetch all vendor quotations submitted within the valid timeframe for a given requirement ID (REQ_ID).
+
+    Args:
+        req_id (int): Requirement ID.
+
+    Returns:
+        str: JSON string of quotations grouped by ITEM_ID, or an error message if something goes wrong.
+    """
+    result = load_quotations(req_id)
+    # Datetimes and Decimals are converted by the encoder
+    return dumps(result, indent="error" not in result)
 
 if __name__ == "__main__":
     # Set up argument parser to accept req_id as a command line argument
     parser = argparse.ArgumentParser(description="Fetch vendor quotations within the valid timeframe for a given requirement ID.")
     parser.add_argument("req_id", type=int, help="Requirement ID (REQ_ID) to fetch quotations for.")
+    parser.add_argument("--stream", action="store_true", help="Print one JSON line per quotation instead of a grouped document.")
 
     # Parse the arguments
     args = parser.parse_args()
 
-    # Call the function with the provided req_id
-    print(get_quotations(args.req_id))
+    if args.stream:
+        # Stream quotations in bounded batches for very large requirements
+        try:
+            for batch in iter_quotations(args.req_id):
+                for row in batch:
+                    print(dumps(row))
+        except (ValueError, LookupError) as e:
+            print(dumps({"error": str(e)}))
+    else:
+        # Call the function with the provided req_id
+        print(get_quotations(args.req_id))
@@ -1,25 +1,24 @@
-from database import get_db_connection
-import json
-from datetime import datetime
+from database import pooled_connection
+from serialization import dumps
+from fetch_cache import read_through
+import metrics
 import argparse
 
-def get_requirement_details(req_id):
+@read_through("requirement_details")
+def load_requirement_details(req_id):
     """
-    Fetch requirement details based on req_id.
+    Load requirement details based on req_id, with values as the database returns them.
 
     Args:
         req_id (int): Requirement ID.
 
     Returns:
-        str: JSON string of requirement details or error message.
+        dict: The requirement row (datetime and Decimal values unconverted), or `{"error": ...}`.
     """
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
         # Ensure req_id is an integer before passing it to the SQL query
         if not str(req_id).isdigit():
-            return json.dumps({"error": f"Invalid req_id: {req_id}. Expected an integer."})
+            return {"error": f"Invalid req_id: {req_id}. Expected an integer."}
 
         query = """
         SELECT REQ_ID, REQ_TITLE, REQ_DESC, REQ_POSTED_ON, REQ_CATEGORY, REQ_URGENCY, 
@@ -27,32 +26,38 @@ def get_requirement_details(req_id):
         FROM requirementdetails
         WHERE REQ_ID = ?
         """
-        
-        cursor.execute(query, (int(req_id),))  # Convert req_id to int before executing
-        result = cursor.fetchone()
-        
-        if result:
-            # Convert result to dictionary
-            result_dict = dict(zip([column[0] for column in cursor.description], result))
-
-            # Convert datetime fields to string
-            if isinstance(result_dict.get("REQ_POSTED_ON"), datetime):
-                result_dict["REQ_POSTED_ON"] = result_dict["REQ_POSTED_ON"].strftime('%Y-%m-%d %H:%M:%S')
 
-            # Convert QUOTATION_PRICE_LIMIT (decimal) to float
-            if "QUOTATION_PRICE_LIMIT" in result_dict and result_dict["QUOTATION_PRICE_LIMIT"] is not None:
-                result_dict["QUOTATION_PRICE_LIMIT"] = float(result_dict["QUOTATION_PRICE_LIMIT"])
+        with metrics.span("db.get_requirement_details", req_id=req_id) as span, pooled_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, (int(req_id),))  # Convert req_id to int before executing
+            result = cursor.fetchone()
+            columns = [column[0] for column in cursor.description]
+            span.set(rows=1 if result else 0)
 
-            return json.dumps(result_dict, indent=2)
+        if result:
+            # Convert result to dictionary
+            return dict(zip(columns, result))
         else:
-            return json.dumps({"error": f"Requirement ID {req_id} not found."})
+            return {"error": f"Requirement ID {req_id} not found."}
 
     except ValueError as ve:
-        return json.dumps({"error": str(ve)})
+        return {"error": str(ve)}
     except Exception as e:
-        return json.dumps({"error": str(e)})
-    finally:
-        conn.close()
+        return {"error": str(e)}
+
+def get_requirement_details(req_id):
+    """
+    Fetch requirement details based on req_id.
+
+    Args:
+        req_id (int): Requirement ID.
+
+    Returns:
+        str: JSON string of requirement details or error message.
+    """
+    result = load_requirement_details(req_id)
+    # Datetimes and Decimals are converted by the encoder
+    return dumps(result, indent="error" not in result)
 
 if __name__ == "__main__":
     # Set up argument parser to accept req_id as a command line argument
@@ -63,4 +68,4 @@ if __name__ == "__main__":
     args = parser.parse_args()
 
     # Call the function with the provided req_id
-    print(get_requirement_details(args.req_id))
\ No newline at end of file
+    print(get_requirement_details(args.req_id))
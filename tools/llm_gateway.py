@@ -0,0 +1,289 @@
+import json
+import random
+import threading
+import time
+import httpx
+import metrics
+from rate_limit import get_rate_limiter
+from config import LLM_TIMEOUT, LLM_CONNECT_TIMEOUT, LLM_MAX_RETRIES, LLM_BACKOFF_BASE, LLM_BACKOFF_MAX
+from config import LLM_BREAKER_THRESHOLD, LLM_BREAKER_RESET, LLM_FALLBACK_MODEL
+
+# Response header naming the model that answered when the fallback model was used
+FALLBACK_HEADER = "x-llm-fallback-model"
+
+# Statuses worth another attempt; other errors (bad request, auth) would fail again
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one model.
+
+    After `threshold` failed requests in a row the circuit opens and requests are refused
+    without calling the API. After `reset_timeout` seconds one trial request is let through
+    (half-open): its success closes the circuit, its failure opens it again. A threshold of 0
+    disables the breaker.
+    """
+
+    def __init__(self, threshold=LLM_BREAKER_THRESHOLD, reset_timeout=LLM_BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half_open" if time.monotonic() - self._opened_at >= self.reset_timeout else "open"
+
+    def allow(self):
+        """Return True if a request may be sent now."""
+        if not self.threshold:
+            return True
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or (self.threshold and self._failures >= self.threshold):
+                if self._opened_at is None or self._trial:
+                    metrics.inc("procurement_llm_circuit_opened_total", help="LLM circuit breaker trips.")
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+class GatewayTransport(httpx.BaseTransport):
+    """
+    httpx transport in front of the OpenAI API, shared by the evaluator and the agents.
+
+    Every chat completion request goes through, in order:
+    - the process-wide token-bucket rate limiter (`rate_limit.py`), charged with the estimated
+      prompt tokens up front and the completion tokens once the response reports them
+    - the circuit breaker of the requested model
+    - retries of rate-limited (429), server (5xx) and connection errors with jittered
+      exponential backoff, honouring the API's Retry-After hint
+    - a fallback model (`fallback_model`), tried once the primary model's circuit is open or its
+      retries are exhausted; such responses carry the FALLBACK_HEADER
+
+    Streamed responses are passed through as they arrive; only their final usage chunk is read.
+    Requests other than chat completions are forwarded unchanged.
+    """
+
+    def __init__(self, transport=None, fallback_model=LLM_FALLBACK_MODEL, max_retries=LLM_MAX_RETRIES,
+                 backoff_base=LLM_BACKOFF_BASE, backoff_max=LLM_BACKOFF_MAX, limiter=None):
+        """
+        Args:
+            transport (httpx.BaseTransport): Transport that sends the requests (default: HTTP).
+            fallback_model (str): Model used when the requested one is unavailable (empty = none).
+            max_retries (int): Retries per model after the first attempt.
+            backoff_base (float): Seconds before the first retry; doubles with every retry.
+            backoff_max (float): Upper bound of a single backoff.
+            limiter (RateLimiter): Defaults to the process-wide limiter.
+        """
+        self.transport = transport or httpx.HTTPTransport()
+        self.fallback_model = fallback_model
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limiter = limiter
+        self._breakers = {}
+        self._breakers_lock = threading.Lock()
+
+    def breaker(self, model):
+        """Return the circuit breaker of `model`."""
+        with self._breakers_lock:
+            if model not in self._breakers:
+                self._breakers[model] = CircuitBreaker()
+            return self._breakers[model]
+
+    def handle_request(self, request):
+        if request.method != "POST" or not request.url.path.endswith("/chat/completions"):
+            return self.transport.handle_request(request)
+
+        body = json.loads(request.read())
+        model = body.get("model")
+        models = [model] + ([self.fallback_model] if self.fallback_model and self.fallback_model != model else [])
+        limiter = self.limiter or get_rate_limiter()
+
+        with metrics.span("llm.request", model=model, stream=bool(body.get("stream"))) as span:
+            for index, current in enumerate(models):
+                if index:
+                    print(f"⚠️ Falling back from {model} to {current}.")
+                    metrics.inc("procurement_llm_model_fallbacks_total", help="LLM requests sent to the fallback model.",
+                                model=model, fallback=current)
+                    body["model"] = current
+                last = index == len(models) - 1
+                try:
+                    response = self._send_with_retries(request, body, current, limiter, span)
+                except httpx.TransportError:
+                    if last:
+                        raise
+                    continue
+                if response.status_code < 400:
+                    if index:
+                        response.headers[FALLBACK_HEADER] = current
+                    span.set(answered_by=current)
+                    return response
+                # Only unavailability is worth another model; a bad request would fail there too
+                if last or response.status_code not in RETRYABLE_STATUSES:
+                    return response
+                response.close()
+
+    def _send_with_retries(self, request, body, model, limiter, span):
+        breaker = self.breaker(model)
+        tokens = _estimate_tokens(body)
+        for attempt in range(self.max_retries + 1):
+            if not breaker.allow():
+                metrics.inc("procurement_llm_rejected_total", help="LLM requests refused by an open circuit.", model=model)
+                return _error_response(503, f"Circuit open for model {model}: too many consecutive failures.")
+
+            wait = limiter.acquire(tokens)
+            span.set(rate_limit_wait_ms=round(wait * 1000, 3), attempts=attempt + 1)
+            started = time.perf_counter()
+            try:
+                response = self.transport.handle_request(_rebuild(request, body))
+            except httpx.TransportError as e:
+                # Timeouts and connection errors
+                breaker.record_failure()
+                response, retry_after, reason = None, None, type(e).__name__
+                error = e
+            else:
+                retryable = response.status_code in RETRYABLE_STATUSES
+                if retryable and response.status_code == 429:
+                    response.read()
+                    retryable = b"insufficient_quota" not in response.content
+                # The breaker tracks availability: any answer other than a server error or timeout counts as up
+                if response.status_code >= 500 or response.status_code == 408:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                if response.status_code < 400:
+                    metrics.observe("procurement_llm_first_byte_seconds", time.perf_counter() - started,
+                                    help="Time until the LLM API started answering.", model=model)
+                    return _charge_completion(response, limiter, bool(body.get("stream")))
+                if not retryable:
+                    return response
+                retry_after, reason = _retry_after(response), str(response.status_code)
+
+            if attempt == self.max_retries:
+                if response is None:
+                    raise error
+                return response
+            if response is not None:
+                response.close()
+            delay = self._backoff(attempt, retry_after)
+            print(f"Retrying LLM request to {model} in {delay:.1f}s ({reason}).")
+            metrics.inc("procurement_llm_retries_total", help="LLM calls repeated.", reason=reason)
+            time.sleep(delay)
+
+    def _backoff(self, attempt, retry_after=None):
+        # Full jitter: a random delay up to the exponential bound, so parallel callers spread out
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+    def close(self):
+        self.transport.close()
+
+def _estimate_tokens(body):
+    from prompt_builder import count_tokens
+    text = "".join(
+        message.get("content") if isinstance(message.get("content"), str) else json.dumps(message.get("content") or "")
+        for message in body.get("messages", [])
+    )
+    return count_tokens(text, body.get("model"))
+
+def _rebuild(request, body):
+    # A fresh request (the body of the original was consumed); the model may have been swapped
+    content = json.dumps(body).encode("utf-8")
+    headers = [(key, value) for key, value in request.headers.raw if key.lower() != b"content-length"]
+    return httpx.Request(request.method, request.url, headers=headers, content=content, extensions=request.extensions)
+
+def _retry_after(response):
+    # OpenAI sends retry-after-ms (and the standard retry-after, in seconds)
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        try:
+            return float(response.headers[header]) * scale
+        except (KeyError, ValueError):
+            continue
+    return None
+
+def _error_response(status_code, message):
+    return httpx.Response(status_code, json={"error": {"message": message, "type": "gateway_error", "code": None}})
+
+def _charge_completion(response, limiter, stream):
+    """Charge the completion tokens reported by the response to the rate limiter."""
+    if not stream:
+        response.read()
+        try:
+            limiter.consume((json.loads(response.content).get("usage") or {}).get("completion_tokens") or 0)
+        except ValueError:
+            pass
+        return response
+    response.stream = _UsageStream(response.stream, limiter)
+    return response
+
+class _UsageStream(httpx.SyncByteStream):
+    """Pass a streamed (server-sent events) response through, charging the usage chunk at the end."""
+
+    def __init__(self, stream, limiter):
+        self.stream = stream
+        self.limiter = limiter
+
+    def __iter__(self):
+        tail = b""
+        for chunk in self.stream:
+            tail = (tail + chunk)[-4096:]
+            yield chunk
+        for line in reversed(tail.splitlines()):
+            if line.startswith(b"data: {") and b'"usage"' in line:
+                try:
+                    usage = json.loads(line[6:]).get("usage") or {}
+                except ValueError:
+                    break
+                self.limiter.consume(usage.get("completion_tokens") or 0)
+                break
+
+    def close(self):
+        self.stream.close()
+
+_http_client = None
+_http_client_lock = threading.Lock()
+
+def get_http_client():
+    """Return the process-wide httpx client routed through the gateway, creating it on first use."""
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = make_http_client()
+    return _http_client
+
+def make_http_client(transport=None, **options):
+    """
+    Build an httpx client for OpenAI SDK clients, routed through a `GatewayTransport`.
+
+    Args:
+        transport (httpx.BaseTransport): Transport the gateway sends requests with (default: HTTP).
+        options: Further `GatewayTransport` arguments.
+
+    Returns:
+        httpx.Client: Pass as `http_client` (with `max_retries=0`, the gateway retries).
+    """
+    timeout = httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+    return httpx.Client(transport=GatewayTransport(transport, **options), timeout=timeout)
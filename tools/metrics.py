@@ -0,0 +1,242 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from config import METRICS_ENABLED, TRACE_LOG_PATH
+
+# Histogram buckets in seconds (Prometheus client defaults, extended for LLM calls)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_lock = threading.Lock()
+_counters = {}  # (name, labels) -> value
+_histograms = {}  # (name, labels) -> [count per bucket..., sum, count]
+_gauges = {}  # name -> (help, callback returning {labels: value})
+_help = {}  # name -> (type, help)
+
+def _labels(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def inc(name, value=1, help="", **labels):
+    """Add `value` to a counter."""
+    if not METRICS_ENABLED:
+        return
+    key = (name, _labels(labels))
+    with _lock:
+        _help.setdefault(name, ("counter", help))
+        _counters[key] = _counters.get(key, 0) + value
+
+def observe(name, value, help="", **labels):
+    """Record one observation (in seconds) in a latency histogram."""
+    if not METRICS_ENABLED:
+        return
+    key = (name, _labels(labels))
+    with _lock:
+        _help.setdefault(name, ("histogram", help))
+        series = _histograms.get(key)
+        if series is None:
+            series = _histograms[key] = [0] * (len(LATENCY_BUCKETS) + 2)
+        index = bisect_left(LATENCY_BUCKETS, value)
+        if index < len(LATENCY_BUCKETS):
+            series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+def register_gauge(name, callback, help=""):
+    """
+    Register a gauge whose values are read when metrics are rendered.
+
+    Args:
+        name (str): Metric name.
+        callback (callable): Returns a number, or a dict of {labels dict as tuple: number}.
+        help (str): Metric description.
+    """
+    with _lock:
+        _gauges[name] = (help, callback)
+
+def render():
+    """Return all metrics in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: list(series) for key, series in _histograms.items()}
+        gauges = dict(_gauges)
+        kinds = dict(_help)
+
+    def header(name, kind, help):
+        if help:
+            lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    def fmt(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+    for name in sorted({name for name, _ in counters}):
+        header(name, "counter", kinds[name][1])
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f"{name}{fmt(labels)} {value:g}")
+
+    for name in sorted({name for name, _ in histograms}):
+        header(name, "histogram", kinds[name][1])
+        for (metric, labels), series in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, series):
+                cumulative += count
+                lines.append(f"{name}_bucket{fmt(labels, [('le', f'{bound:g}')])} {cumulative}")
+            lines.append(f"{name}_bucket{fmt(labels, [('le', '+Inf')])} {series[-1]}")
+            lines.append(f"{name}_sum{fmt(labels)} {series[-2]:g}")
+            lines.append(f"{name}_count{fmt(labels)} {series[-1]}")
+
+    for name, (help, callback) in sorted(gauges.items()):
+        try:
+            values = callback()
+        except Exception:
+            continue  # A failing collector must not break the whole scrape
+        header(name, "gauge", help)
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labels, value in sorted(values.items()):
+            lines.append(f"{name}{fmt(labels)} {value:g}")
+
+    return "\n".join(lines) + "\n"
+
+def write_textfile(path):
+    """Write the metrics to `path` atomically, for node_exporter's textfile collector."""
+    if not METRICS_ENABLED:
+        return
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render())
+    os.replace(tmp_path, path)
+
+# --- Spans -----------------------------------------------------------------
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_trace_log = None
+_trace_log_lock = threading.Lock()
+
+class Span:
+    """
+    One timed stage of a procurement run.
+
+    Spans nest through a context variable, so every span knows its trace and parent.
+    Attributes set on a span (rows, tokens, ...) are written with it to the trace log.
+    """
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attrs", "start", "duration")
+
+    def __init__(self, name, attrs):
+        parent = _current_span.get()
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attrs = attrs
+        self.start = time.time()
+        self.duration = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+class _NullSpan:
+    """Stand-in returned while metrics are disabled, so instrumented code pays almost nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+def span(name, **attrs):
+    """
+    Time a block as a span named `name`.
+
+    The duration is recorded in the `procurement_span_seconds` histogram, failures in
+    `procurement_span_errors_total`, and the span is appended to TRACE_LOG_PATH if set.
+
+    Returns:
+        Context manager yielding the Span. Call `.set(key=value)` on it to attach attributes
+        such as row or token counts.
+    """
+    if not METRICS_ENABLED:
+        return _NULL_SPAN
+    return _span(name, attrs)
+
+@contextmanager
+def _span(name, attrs):
+    current = Span(name, attrs)
+    token = _current_span.set(current)
+    started = time.perf_counter()
+    error = None
+    try:
+        yield current
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.duration = time.perf_counter() - started
+        _current_span.reset(token)
+        observe("procurement_span_seconds", current.duration, help="Duration of each procurement stage.", span=name)
+        if error:
+            inc("procurement_span_errors_total", help="Stages that raised an exception.", span=name)
+        if TRACE_LOG_PATH:
+            _log_span(current, error)
+
+def annotate(**attrs):
+    """Attach attributes to the innermost open span, if any."""
+    if not METRICS_ENABLED:
+        return
+    current = _current_span.get()
+    if current is not None:
+        current.attrs.update(attrs)
+
+def bind_context(func):
+    """
+    Wrap `func` to run in a copy of the caller's context, so spans opened by work submitted to
+    a thread pool keep their parent trace.
+    """
+    if not METRICS_ENABLED:
+        return func
+    context = contextvars.copy_context()
+
+    def wrapper(*args, **kwargs):
+        return context.run(func, *args, **kwargs)
+
+    wrapper.__name__ = getattr(func, "__name__", "wrapper")
+    return wrapper
+
+def _log_span(current, error):
+    global _trace_log
+    record = {
+        "trace_id": current.trace_id,
+        "span_id": current.span_id,
+        "parent_id": current.parent_id,
+        "name": current.name,
+        "start": current.start,
+        "duration_ms": round(current.duration * 1000, 3),
+        "thread": threading.current_thread().name,
+        "attrs": current.attrs,
+    }
+    if error:
+        record["error"] = error
+    line = json.dumps(record, default=str) + "\n"
+    with _trace_log_lock:
+        if _trace_log is None:
+            _trace_log = open(TRACE_LOG_PATH, "a", encoding="utf-8", buffering=1)
+        _trace_log.write(line)
@@ -0,0 +1,260 @@
+import re
+from datetime import datetime
+from decimal import Decimal
+import numpy as np
+from quotation_set import QuotationSet
+from config import PRESCORE_ACCEPT_SCORE, PRESCORE_REJECT_SCORE, PRESCORE_LATE_GRACE_DAYS
+
+# Relative weight of each criterion in a quotation's score (sums to 1)
+SCORE_WEIGHTS = {
+    "price": 0.5,
+    "delivery": 0.25,
+    "warranty": 0.15,
+    "amc": 0.10,
+}
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+def _to_float(value):
+    """Convert DB/JSON values (Decimal, numeric strings like '12 months') to float, NaN if missing."""
+    if value is None:
+        return np.nan
+    if isinstance(value, (int, float, Decimal)):
+        return float(value)
+    match = _NUMBER.search(str(value))
+    return float(match.group()) if match else np.nan
+
+def _to_datetime64(value):
+    """Convert datetime objects or '%Y-%m-%d %H:%M:%S' strings to numpy datetime64, NaT if missing."""
+    if value is None or value == "":
+        return np.datetime64("NaT")
+    if isinstance(value, datetime):
+        return np.datetime64(value.replace(tzinfo=None), "s")
+    try:
+        return np.datetime64(str(value).replace(" ", "T"), "s")
+    except ValueError:
+        return np.datetime64("NaT")
+
+def _normalise(value):
+    return str(value).strip().lower() if value is not None else ""
+
+def _brand_matches(quoted_brand, item):
+    requested = {_normalise(item.get("BRAND")), _normalise(item.get("OTHER_BRAND"))} - {""}
+    return not requested or _normalise(quoted_brand) in requested
+
+def _float_column(quotations, name):
+    # Numeric columns are read straight from the set; text columns are parsed once per distinct value
+    values = quotations.floats(name)
+    if values is not None:
+        return values
+    parsed = {}
+    return np.array([
+        parsed[value] if value in parsed else parsed.setdefault(value, _to_float(value))
+        for value in quotations.column(name)
+    ], dtype=float)
+
+def _group_max(values, groups, n_groups):
+    out = np.full(n_groups, -np.inf)
+    np.maximum.at(out, groups, values)
+    return out
+
+def _group_min(values, groups, n_groups):
+    out = np.full(n_groups, np.inf)
+    np.minimum.at(out, groups, values)
+    return out
+
+def score_quotations(requirement, items, quotations):
+    """
+    Compute deterministic pass/fail filters and weighted scores for every quotation.
+
+    GST columns (C_GST, S_GST, I_GST) are treated as percentage rates on PRICE, which is the
+    line total (UNIT_PRICE x QUANTITY is used when PRICE is missing). AMC and ITEM_WARRANTY
+    are compared as numbers; text values use their leading number.
+
+    Args:
+        requirement (dict): Requirement details row (QUOTATION_PRICE_LIMIT, REQ_BUDGET).
+        items (list[dict]): Requirement item rows (ITEM_ID, BRAND, OTHER_BRAND, QUANTITY, REQUIRED_DATE).
+        quotations (QuotationSet | list[dict]): Quotations, as a `QuotationSet` or a flat list of rows.
+
+    Returns:
+        list[dict]: One entry per quotation, in the order given, with QUOT_ID, ITEM_ID, U_ID,
+        LANDED_PRICE, LATE_DAYS, BRAND_MATCH, SCORE (0-100), HARD_FAIL, NEEDS_REVIEW and the
+        list of FLAGS that explain them.
+    """
+    if not isinstance(quotations, QuotationSet):
+        quotations = QuotationSet.from_rows(quotations)
+    if not quotations.row_count:
+        return []
+
+    items_by_id = {item.get("ITEM_ID"): item for item in items}
+    item_ids = quotations.column("ITEM_ID")
+
+    # Per-item values, looked up once per item instead of once per quotation
+    item_quantity = {item_id: _to_float(item.get("QUANTITY")) for item_id, item in items_by_id.items()}
+    item_required = {item_id: _to_datetime64(item.get("REQUIRED_DATE")) for item_id, item in items_by_id.items()}
+
+    # Column arrays for the vectorised checks
+    price = _float_column(quotations, "PRICE")
+    unit_price = _float_column(quotations, "UNIT_PRICE")
+    quantity = np.array([item_quantity.get(i, np.nan) for i in item_ids], dtype=float)
+    gst = np.nansum(np.vstack([_float_column(quotations, name) for name in ("C_GST", "S_GST", "I_GST")]), axis=0)
+    delivery = np.array([_to_datetime64(value) for value in quotations.column("DELIVERY_DATE")], dtype="datetime64[s]")
+    required = np.array([item_required.get(i, np.datetime64("NaT")) for i in item_ids], dtype="datetime64[s]")
+    warranty = np.nan_to_num(_float_column(quotations, "ITEM_WARRANTY"))
+    amc = np.nan_to_num(_float_column(quotations, "AMC"))
+
+    # Brand matches if the item asks for no brand or the quoted brand is BRAND / OTHER_BRAND;
+    # checked once per distinct (item, brand) pair
+    brands = quotations.column("BRAND")
+    matches = {}
+    brand_match = np.array([
+        matches[key] if key in matches else matches.setdefault(key, _brand_matches(key[1], items_by_id.get(key[0], {})))
+        for key in zip(item_ids, brands)
+    ], dtype=bool)
+
+    # Landed price including GST
+    base_price = np.where(np.isnan(price), unit_price * quantity, price)
+    landed = base_price * (1 + gst / 100)
+    price_known = ~np.isnan(landed)
+
+    # Lateness in days against the item's REQUIRED_DATE (NaN when either date is missing)
+    late_days = (delivery - required).astype("timedelta64[s]").astype(float) / 86400
+    late_days[np.isnat(delivery) | np.isnat(required)] = np.nan
+    delivery_known = ~np.isnan(late_days)
+
+    # Hard filters
+    price_limit = _to_float(requirement.get("QUOTATION_PRICE_LIMIT"))
+    over_limit = price_known & (price_limit > 0) & (landed > price_limit) if not np.isnan(price_limit) else np.zeros(len(landed), bool)
+    too_late = delivery_known & (late_days > PRESCORE_LATE_GRACE_DAYS)
+    hard_fail = over_limit | too_late | ~price_known
+
+    # Cases the rules cannot settle on their own (e.g. an equivalent brand under another name)
+    needs_review = ~brand_match | ~delivery_known
+
+    # Per-item group-by: cheapest landed price and best warranty/AMC among the quotations for that item
+    _, groups = np.unique(np.array([str(i) for i in item_ids]), return_inverse=True)
+    n_groups = groups.max() + 1
+    best_price = _group_min(np.where(price_known, landed, np.inf), groups, n_groups)[groups]
+    best_warranty = _group_max(warranty, groups, n_groups)[groups]
+    best_amc = _group_max(amc, groups, n_groups)[groups]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        price_score = np.where(price_known & (landed > 0), best_price / landed * 100, 0.0)
+        delivery_score = np.where(
+            delivery_known,
+            np.clip(100 - np.maximum(late_days, 0) / max(PRESCORE_LATE_GRACE_DAYS, 1) * 100, 0, 100),
+            50.0,  # Unknown delivery date: neutral
+        )
+        warranty_score = np.where(best_warranty > 0, warranty / best_warranty * 100, 100.0)
+        amc_score = np.where(best_amc > 0, amc / best_amc * 100, 100.0)
+
+    score = (
+        SCORE_WEIGHTS["price"] * price_score
+        + SCORE_WEIGHTS["delivery"] * delivery_score
+        + SCORE_WEIGHTS["warranty"] * warranty_score
+        + SCORE_WEIGHTS["amc"] * amc_score
+    )
+
+    quot_ids, vendor_ids = quotations.column("QUOT_ID"), quotations.column("U_ID")
+    results = []
+    for idx in range(quotations.row_count):
+        flags = []
+        if not price_known[idx]:
+            flags.append("price missing")
+        if over_limit[idx]:
+            flags.append(f"landed price {landed[idx]:.2f} exceeds quotation price limit {price_limit:.2f}")
+        if too_late[idx]:
+            flags.append(f"delivery {late_days[idx]:.0f} days after required date")
+        elif delivery_known[idx] and late_days[idx] > 0:
+            flags.append(f"delivery {late_days[idx]:.0f} days late (within grace)")
+        elif not delivery_known[idx]:
+            flags.append("delivery date unknown")
+        if not brand_match[idx]:
+            flags.append(f"brand '{brands[idx]}' differs from requested")
+
+        results.append({
+            "QUOT_ID": quot_ids[idx],
+            "ITEM_ID": item_ids[idx],
+            "U_ID": vendor_ids[idx],
+            "LANDED_PRICE": None if not price_known[idx] else round(float(landed[idx]), 2),
+            "LATE_DAYS": None if not delivery_known[idx] else round(float(late_days[idx]), 2),
+            "BRAND_MATCH": bool(brand_match[idx]),
+            "SCORE": round(float(score[idx]), 2),
+            "HARD_FAIL": bool(hard_fail[idx]),
+            "NEEDS_REVIEW": bool(needs_review[idx]),
+            "FLAGS": flags,
+        })
+    return results
+
+def prescore_vendors(requirement, items, quotations):
+    """
+    Roll quotation scores up to vendors (U_ID) and decide the clear-cut cases locally.
+
+    A vendor is rejected when any of its quotations fails a hard filter, its landed total
+    exceeds REQ_BUDGET, or its score is below PRESCORE_REJECT_SCORE. It is accepted when none
+    of its quotations needs review (brand mismatch, unknown delivery date) and it scores at
+    least PRESCORE_ACCEPT_SCORE. Everything else is "borderline"
+    and should be judged by the LLM.
+
+    Args:
+        requirement (dict): Requirement details row.
+        items (list[dict]): Requirement item rows.
+        quotations (QuotationSet | list[dict]): Quotations (see `score_quotations`).
+
+    Returns:
+        tuple[list[dict], list[dict]]: Vendor results in the `{vendor_id, score, status, reason}`
+        format (status is "accepted", "rejected" or "borderline", plus the vendor's FLAGS),
+        and the per-quotation scores from `score_quotations`.
+    """
+    quotation_scores = score_quotations(requirement, items, quotations)
+    if not quotation_scores:
+        return [], []
+
+    vendor_ids = np.array([str(q["U_ID"]) for q in quotation_scores])
+    vendors, groups = np.unique(vendor_ids, return_inverse=True)
+    scores = np.array([q["SCORE"] for q in quotation_scores])
+    landed = np.array([q["LANDED_PRICE"] if q["LANDED_PRICE"] is not None else 0.0 for q in quotation_scores])
+    hard_fail = np.array([q["HARD_FAIL"] for q in quotation_scores])
+    review = np.array([q["NEEDS_REVIEW"] for q in quotation_scores])
+
+    counts = np.bincount(groups)
+    vendor_score = np.bincount(groups, weights=scores) / counts
+    vendor_total = np.bincount(groups, weights=landed)
+    vendor_fail = np.bincount(groups, weights=hard_fail.astype(float)) > 0
+    vendor_review = np.bincount(groups, weights=review.astype(float)) > 0
+    _, item_groups = np.unique(np.array([str(q["ITEM_ID"]) for q in quotation_scores]), return_inverse=True)
+    vendor_item_pairs = np.unique(groups * (item_groups.max() + 1) + item_groups)
+    vendor_items = np.bincount(vendor_item_pairs // (item_groups.max() + 1), minlength=len(vendors))
+
+    vendor_flags = [set() for _ in vendors]
+    for q, g in zip(quotation_scores, groups):
+        vendor_flags[g].update(q["FLAGS"])
+
+    budget = _to_float(requirement.get("REQ_BUDGET"))
+    over_budget = (vendor_total > budget) if not np.isnan(budget) and budget > 0 else np.zeros(len(vendors), bool)
+    total_items = len(items) or len({q["ITEM_ID"] for q in quotation_scores})
+
+    results = []
+    for v, vendor_id in enumerate(vendors):
+        flags = sorted(vendor_flags[v])
+        if over_budget[v]:
+            flags.append(f"landed total {vendor_total[v]:.2f} exceeds budget {budget:.2f}")
+
+        if vendor_fail[v] or over_budget[v] or vendor_score[v] < PRESCORE_REJECT_SCORE:
+            status = "rejected"
+        elif not vendor_review[v] and vendor_score[v] >= PRESCORE_ACCEPT_SCORE:
+            status = "accepted"
+        else:
+            status = "borderline"
+
+        summary = f"Rule-based score {vendor_score[v]:.1f}; quotes {vendor_items[v]} of {total_items} items; landed total {vendor_total[v]:.2f}"
+        reason = f"{summary}. " + ("; ".join(flags) if flags else "Meets price, budget and delivery requirements")
+
+        results.append({
+            "vendor_id": str(vendor_id),
+            "score": round(float(vendor_score[v]), 1),
+            "status": status,
+            "reason": reason,
+            "flags": flags,
+        })
+    return results, quotation_scores
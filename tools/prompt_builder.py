@@ -0,0 +1,180 @@
+import csv
+import io
+from functools import lru_cache
+from schemas import LLM_RESPONSE_FORMAT
+from serialization import serialize_value
+
+# Approximate characters per token, used when the local tokenizer is unavailable
+CHARS_PER_TOKEN = 4
+
+@lru_cache(maxsize=None)
+def _encoding(model):
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # tiktoken missing or its vocabulary cannot be loaded (e.g. offline): fall back to an estimate
+        return None
+
+def count_tokens(text, model="gpt-4-turbo"):
+    """
+    Count the prompt tokens of `text` for `model` with the local tokenizer.
+
+    Args:
+        text (str): Prompt text.
+        model (str): OpenAI model name, used to pick the tokenizer.
+
+    Returns:
+        int: Number of tokens (estimated from length if tiktoken is unavailable).
+    """
+    encoding = _encoding(model)
+    if encoding is None:
+        return len(text) // CHARS_PER_TOKEN + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+def _cell(value):
+    value = serialize_value(value)  # Rows may hold datetimes and Decimals straight from the database
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple, set)):
+        return "; ".join(str(v) for v in value)
+    if isinstance(value, float):
+        return f"{value:g}"
+    return str(value)
+
+def to_table(rows, columns=None):
+    """
+    Serialise rows as a compact CSV table with the column header emitted once.
+
+    Args:
+        rows (list[dict] | dict): Rows to serialise. A single dict is written as one row.
+        columns (list[str], optional): Columns to include, in order. Defaults to the keys of the first row.
+
+    Returns:
+        str: CSV text, or "(none)" if there are no rows.
+    """
+    if isinstance(rows, dict):
+        rows = [rows]
+    if not rows:
+        return "(none)"
+    columns = columns or list(rows[0].keys())
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([_cell(row.get(column)) for column in columns])
+    return buffer.getvalue().rstrip("\n")
+
+def build_evaluation_prompt(requirement, items, vendors, quotations):
+    """
+    Build the vendor evaluation prompt with every section serialised as a compact table.
+
+    Args:
+        requirement (dict): Requirement details row.
+        items (list[dict]): Requirement item rows.
+        vendors (list[dict]): Borderline vendor summaries (vendor_id, rule_score, flags, history_* columns).
+        quotations (list[dict]): Quotation rows of those vendors, with their rule-based scores.
+
+    Returns:
+        str: Prompt text.
+    """
+    return f"""You are a procurement evaluation assistant. Given a set of buyer requirements, item details, and vendor quotations,
+determine which vendors should be accepted or rejected. Provide a contextual semantic similarity score for each vendor.
+
+Price limits, budget, landed price, delivery dates, warranty and AMC have already been checked by a rule-based engine.
+The vendors below could not be decided by those rules alone; their rule-based scores and flags are included.
+Focus on what the rules cannot judge, such as whether a different brand is an acceptable equivalent.
+Where known, each vendor's history across earlier requirements is included: on-time delivery ratio, price percentile
+against competing quotes for the same products (0 = cheapest, 1 = most expensive), and average warranty and AMC.
+All tables are CSV with a header row.
+
+## Buyer Requirements:
+{to_table(requirement)}
+
+## Items:
+{to_table(items)}
+
+## Borderline Vendors:
+{to_table(vendors)}
+
+## Vendor Quotations:
+{to_table(quotations)}
+
+Evaluate vendors based on overall suitability, price, delivery time, brand relevance, warranty, and other contextual factors.
+Respond with only a JSON object containing one entry per vendor above, in this format:
+{LLM_RESPONSE_FORMAT}
+"""
+
+def build_repair_prompt(prompt, errors):
+    """
+    Ask again for the vendors whose entries were missing or failed validation.
+
+    Args:
+        prompt (str): Evaluation prompt restricted to those vendors.
+        errors (dict): Validation error per vendor_id ("missing" if the vendor was left out).
+
+    Returns:
+        str: Prompt text.
+    """
+    problems = "\n".join(f"- {vendor_id}: {error}" for vendor_id, error in errors.items())
+    return f"""{prompt}
+A previous answer for these vendors was missing or invalid:
+{problems}
+Return a valid entry for every vendor listed above, with a score between 0 and 100.
+"""
+
+def chunk_quotations(quotations, token_budget, model="gpt-4-turbo"):
+    """
+    Split quotations into chunks whose quotation table fits in `token_budget` tokens.
+
+    Whole items are packed together where possible so the model compares all vendors of an
+    item in one call. An item that is too large on its own is split by vendor (U_ID).
+
+    Args:
+        quotations (list[dict]): Quotation rows.
+        token_budget (int): Tokens available for the quotation table of one chunk.
+        model (str): OpenAI model name, used to pick the tokenizer.
+
+    Returns:
+        list[list[dict]]: Chunks of quotation rows.
+    """
+    if not quotations:
+        return []
+    columns = list(quotations[0].keys())
+    header_tokens = count_tokens(",".join(columns), model)
+
+    def row_tokens(rows):
+        # Tables are measured without their header, which is paid once per chunk
+        return count_tokens(to_table(rows, columns), model) - header_tokens
+
+    # Group rows by item, then by vendor inside oversized items
+    groups = {}
+    for row in quotations:
+        groups.setdefault(row.get("ITEM_ID"), []).append(row)
+
+    pieces = []
+    for rows in groups.values():
+        tokens = row_tokens(rows)
+        if tokens + header_tokens <= token_budget:
+            pieces.append((rows, tokens))
+            continue
+        by_vendor = {}
+        for row in rows:
+            by_vendor.setdefault(row.get("U_ID"), []).append(row)
+        pieces.extend((vendor_rows, row_tokens(vendor_rows)) for vendor_rows in by_vendor.values())
+
+    # Greedily pack pieces into chunks
+    chunks, current, used = [], [], header_tokens
+    for rows, tokens in pieces:
+        if current and used + tokens > token_budget:
+            chunks.append(current)
+            current, used = [], header_tokens
+        current.extend(rows)
+        used += tokens
+    if current:
+        chunks.append(current)
+    return chunks
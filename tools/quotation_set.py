@@ -0,0 +1,246 @@
+import math
+from array import array
+from collections.abc import Mapping
+from decimal import Decimal
+
+# Column layout of quotation rows. Columns not listed here are kept as plain lists.
+FLOAT_COLUMNS = ("PRICE", "UNIT_PRICE", "TAX", "C_GST", "S_GST", "I_GST")
+INTEGER_COLUMNS = ("QUOT_ID", "ITEM_ID", "REQ_ID")
+CATEGORICAL_COLUMNS = ("U_ID", "BRAND")
+
+_NUMBER_TYPES = (int, float, Decimal)
+
+class _Column:
+    """
+    One column of a QuotationSet.
+
+    - "float": `array('d')`, NULL as NaN. Decimals come back as floats (as they are written to
+      JSON); columns of whole numbers come back as ints.
+    - "int": `array('q')`.
+    - "category": `array('i')` codes into a list of distinct values, each stored once.
+    - "object": a plain list.
+
+    A typed column holding a value it cannot represent exactly (e.g. text in PRICE) turns into
+    an "object" column, so values always come back as they were read.
+    """
+
+    __slots__ = ("kind", "data", "ints", "categories", "_codes")
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.ints = True
+        self.categories = []
+        self._codes = {}  # value -> code, for "category"
+        self.data = {"float": lambda: array("d"), "int": lambda: array("q"),
+                     "category": lambda: array("i"), "object": list}[kind]()
+
+    @classmethod
+    def for_name(cls, name):
+        if name in FLOAT_COLUMNS:
+            return cls("float")
+        if name in INTEGER_COLUMNS:
+            return cls("int")
+        if name in CATEGORICAL_COLUMNS:
+            return cls("category")
+        return cls("object")
+
+    def extend(self, values):
+        if self.kind == "float":
+            if all(value is None or type(value) in _NUMBER_TYPES for value in values):
+                self.ints = self.ints and all(type(value) is int for value in values if value is not None)
+                self.data.extend(math.nan if value is None else float(value) for value in values)
+                return
+        elif self.kind == "int":
+            if all(type(value) is int for value in values):
+                self.data.extend(values)
+                return
+        elif self.kind == "category":
+            try:
+                codes = self._codes
+                for value in values:
+                    if value not in codes:
+                        codes[value] = len(self.categories)
+                        self.categories.append(value)
+                self.data.extend(codes[value] for value in values)
+                return
+            except TypeError:
+                pass  # Unhashable value
+        else:
+            self.data.extend(values)
+            return
+        self._to_object()
+        self.data.extend(values)
+
+    def _to_object(self):
+        self.data = self.values()
+        self.kind = "object"
+        self.categories, self._codes = [], {}
+
+    def value(self, index):
+        value = self.data[index]
+        if self.kind == "float":
+            return None if value != value else (int(value) if self.ints else value)
+        if self.kind == "category":
+            return self.categories[value]
+        return value
+
+    def values(self):
+        """All values as a list, as they were read."""
+        if self.kind == "float":
+            if self.ints:
+                return [None if value != value else int(value) for value in self.data]
+            return [None if value != value else value for value in self.data]
+        if self.kind == "category":
+            categories = self.categories
+            return [categories[code] for code in self.data]
+        return list(self.data)
+
+    def take(self, indexes):
+        column = _Column.__new__(_Column)
+        column.kind, column.ints = self.kind, self.ints
+        column.categories, column._codes = self.categories, self._codes
+        data = self.data
+        column.data = array(data.typecode, [data[i] for i in indexes]) if isinstance(data, array) else [data[i] for i in indexes]
+        return column
+
+class QuotationSet(Mapping):
+    """
+    Column-oriented quotations of one requirement.
+
+    Each column is stored once instead of as one dict per row:
+    - the price and tax columns (FLOAT_COLUMNS) as float arrays, readable as NumPy arrays
+      without copying
+    - the IDs (INTEGER_COLUMNS) as integer arrays
+    - U_ID and BRAND (CATEGORICAL_COLUMNS) as integer codes into their distinct values
+
+    For the agents, the API and JSON output it behaves as the `{ITEM_ID: [rows]}` mapping that
+    `load_quotations` has always returned: row dicts are built on access, item by item.
+    `len()` and iteration are over items; `row_count` is the number of quotations.
+    """
+
+    def __init__(self, columns, data, row_count):
+        self.columns = list(columns)
+        self._data = data
+        self.row_count = row_count
+        self._groups = None
+
+    @classmethod
+    def from_batches(cls, columns, batches):
+        """
+        Build a set from `cursor.fetchmany` batches.
+
+        Args:
+            columns (list[str]): Column names, in row order.
+            batches (iterable[list[tuple]]): Batches of row tuples (or pyodbc Rows).
+        """
+        data = {name: _Column.for_name(name) for name in columns}
+        row_count = 0
+        for batch in batches:
+            if not batch:
+                continue
+            for name, values in zip(columns, zip(*batch)):
+                data[name].extend(values)
+            row_count += len(batch)
+        return cls(columns, data, row_count)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build a set from row dicts (e.g. parsed tool output); missing keys become None."""
+        rows = list(rows)
+        columns = list(dict.fromkeys(key for row in rows for key in row))
+        return cls.from_batches(columns, [[tuple(row.get(name) for name in columns) for row in rows]])
+
+    @classmethod
+    def from_grouped(cls, grouped):
+        """Build a set from `{ITEM_ID: [rows]}`; a QuotationSet is returned as it is."""
+        if isinstance(grouped, cls):
+            return grouped
+        return cls.from_rows(row for rows in grouped.values() for row in rows)
+
+    # --- Columns ---------------------------------------------------------------
+
+    def column(self, name):
+        """Values of column `name` as a list, as they were read (None for a missing column)."""
+        if name not in self._data:
+            return [None] * self.row_count
+        return self._data[name].values()
+
+    def floats(self, name):
+        """Column `name` as a float NumPy array (NaN for NULL), or None if it is not a numeric column."""
+        import numpy as np
+        column = self._data.get(name)
+        if column is None:
+            return np.full(self.row_count, np.nan)
+        if column.kind == "float":
+            return np.frombuffer(column.data, dtype=np.float64) if self.row_count else np.empty(0)
+        if column.kind == "int":
+            return np.array(column.data, dtype=np.float64)
+        return None
+
+    def codes(self, name):
+        """
+        Categorical column `name` as (codes, distinct values), or None if it is not stored as codes.
+
+        `values[codes[i]]` is the value of row i.
+        """
+        column = self._data.get(name)
+        if column is None or column.kind != "category":
+            return None
+        return column.data, column.categories
+
+    # --- Rows ------------------------------------------------------------------
+
+    def row(self, index, columns=None):
+        """Row `index` as a dict (of `columns` only, if given)."""
+        return {name: self._data[name].value(index) for name in columns or self.columns if name in self._data}
+
+    def rows(self, columns=None):
+        """Yield every row as a dict (of `columns` only, if given), in set order."""
+        names = [name for name in columns or self.columns if name in self._data]
+        values = [self._data[name].values() for name in names]
+        for row in zip(*values):
+            yield dict(zip(names, row))
+
+    def take(self, indexes):
+        """Return a new set with the rows at `indexes`, in that order."""
+        indexes = list(indexes)
+        return QuotationSet(self.columns, {name: column.take(indexes) for name, column in self._data.items()}, len(indexes))
+
+    def sorted(self, *names):
+        """Return a new set ordered by the string form of columns `names`."""
+        keys = [[str(value) for value in self.column(name)] for name in names]
+        return self.take(sorted(range(self.row_count), key=lambda i: tuple(key[i] for key in keys)))
+
+    def item_groups(self):
+        """Return `{ITEM_ID: [row indexes]}`, items in order of first appearance."""
+        if self._groups is None:
+            groups = {}
+            for index, item_id in enumerate(self.column("ITEM_ID")):
+                groups.setdefault(item_id, []).append(index)
+            self._groups = groups
+        return self._groups
+
+    def to_dict(self):
+        """The `{ITEM_ID: [rows]}` form."""
+        rows = list(self.rows())
+        return {item_id: [rows[i] for i in indexes] for item_id, indexes in self.item_groups().items()}
+
+    # --- Mapping (ITEM_ID -> rows) ---------------------------------------------
+
+    def __getitem__(self, item_id):
+        return [self.row(index) for index in self.item_groups()[item_id]]
+
+    def __contains__(self, item_id):
+        try:
+            return item_id in self.item_groups()
+        except TypeError:
+            return False
+
+    def __iter__(self):
+        return iter(self.item_groups())
+
+    def __len__(self):
+        return len(self.item_groups())
+
+    def __repr__(self):
+        return f"QuotationSet({self.row_count} quotations, {len(self)} items)"
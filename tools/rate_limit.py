@@ -0,0 +1,88 @@
+import threading
+import time
+from config import OPENAI_RPM, OPENAI_TPM
+
+class RateLimiter:
+    """
+    Token-bucket limiter for OpenAI requests-per-minute and tokens-per-minute limits.
+
+    Both buckets start full and refill continuously at `limit / 60` per second. A call waits
+    until one request and its estimated prompt tokens are available; completion tokens are
+    charged afterwards with `consume`, which may push the token bucket below zero so later
+    calls wait for the overshoot. A limit of 0 disables that bucket.
+    """
+
+    def __init__(self, rpm=OPENAI_RPM, tpm=OPENAI_TPM):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.wait_time_total = 0.0
+
+    def acquire(self, tokens=0):
+        """
+        Block until one request and `tokens` tokens fit within the limits, then take them.
+
+        Args:
+            tokens (int): Estimated tokens of the call (clamped to the per-minute limit).
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        tokens = min(tokens, self.tpm) if self.tpm else 0
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                delay = max(
+                    self._shortfall(self._requests, 1, self.rpm),
+                    self._shortfall(self._tokens, tokens, self.tpm),
+                )
+                if delay <= 0:
+                    if self.rpm:
+                        self._requests -= 1
+                    if self.tpm:
+                        self._tokens -= tokens
+                    self.wait_time_total += waited
+                    return waited
+            time.sleep(delay)
+            waited += delay
+
+    def consume(self, tokens):
+        """Charge tokens that were only known after the call (e.g. completion tokens)."""
+        if not self.tpm or not tokens:
+            return
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+
+    def _refill(self):
+        # Called with the lock held
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        if self.rpm:
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    @staticmethod
+    def _shortfall(available, needed, limit):
+        # Seconds until `needed` units are available in a bucket refilled at limit/60 per second
+        if not limit or available >= needed:
+            return 0.0
+        return (needed - available) * 60 / limit
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+def get_rate_limiter():
+    """Return the process-wide OpenAI rate limiter, creating it on first use."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter()
+    return _limiter
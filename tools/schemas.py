@@ -0,0 +1,63 @@
+import uuid
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field, field_validator
+
+class VendorEvaluation(BaseModel):
+    """Evaluation of one vendor (U_ID), in the format documented in the README."""
+
+    vendor_id: str
+    score: float = Field(ge=0, le=100)
+    status: Literal["accepted", "rejected"]
+    reason: str
+    # How the decision was made ("rules", "llm" or "fallback"); stored with the result, not part of the output
+    decided_by: Optional[Literal["rules", "llm", "fallback"]] = Field(default=None, exclude=True)
+
+    @field_validator("vendor_id", mode="before")
+    @classmethod
+    def _vendor_id_as_string(cls, value):
+        # U_IDs may come back from the model as numbers
+        return str(value) if value is not None else value
+
+    @field_validator("status", mode="before")
+    @classmethod
+    def _normalise_status(cls, value):
+        # Accept "ACCEPT"/"REJECT" and other casing the model tends to use
+        text = str(value).strip().lower()
+        if text.startswith("accept"):
+            return "accepted"
+        if text.startswith("reject"):
+            return "rejected"
+        return text
+
+class QuotationScore(BaseModel):
+    """Rule-based score of one quotation (see `prescore.score_quotations`)."""
+
+    QUOT_ID: int
+    ITEM_ID: int
+    U_ID: str
+    LANDED_PRICE: Optional[float] = None
+    LATE_DAYS: Optional[float] = None
+    BRAND_MATCH: bool
+    SCORE: float
+    HARD_FAIL: bool
+    CONTENT_HASH: Optional[str] = None  # Hash of the quotation and what it was scored against (see `evaluate_ai`)
+
+    @field_validator("U_ID", mode="before")
+    @classmethod
+    def _u_id_as_string(cls, value):
+        return str(value) if value is not None else value
+
+class VendorRanking(BaseModel):
+    """Ranked vendor evaluations for one requirement."""
+
+    req_id: int
+    vendors: List[VendorEvaluation]
+
+class EvaluationReport(VendorRanking):
+    """A VendorRanking from one evaluation run, with the quotation scores behind it."""
+
+    run_id: str = Field(default_factory=lambda: uuid.uuid4().hex)
+    item_scores: List[QuotationScore] = Field(default_factory=list)
+
+# JSON object the evaluator asks the LLM to return
+LLM_RESPONSE_FORMAT = '{"vendors": [{"vendor_id": "<U_ID>", "score": <0-100>, "status": "accepted" or "rejected", "reason": "<justification>"}]}'
@@ -0,0 +1,81 @@
+import hashlib
+import json
+from collections.abc import Mapping
+from datetime import date, datetime
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:  # Optional: the standard library encoder produces the same documents, only slower
+    orjson = None
+
+# Format of datetime values in tool output and prompts
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+def serialize_value(value):
+    """Convert a database value (datetime, Decimal) to its JSON-friendly form; other values are returned as is."""
+    if isinstance(value, datetime):
+        return value.strftime(DATETIME_FORMAT)
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+def _default(value):
+    if isinstance(value, Mapping):
+        # e.g. a QuotationSet, written as the {ITEM_ID: [rows]} dict it stands for
+        return dict(value)
+    serialized = serialize_value(value)
+    if serialized is value:
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+    return serialized
+
+def dumps(obj, indent=False):
+    """
+    Encode tool output as JSON in one pass.
+
+    Rows can be passed as fetched: datetimes and Decimals are converted by the encoder itself,
+    other mappings (a `QuotationSet`) are written as dicts, and non-string keys (e.g. ITEM_ID)
+    become strings. Uses orjson when it is installed.
+
+    Args:
+        obj: Dicts, lists and scalar database values.
+        indent (bool): Indent by two spaces, for output read by agents and people.
+
+    Returns:
+        str: JSON text.
+    """
+    if orjson is not None:
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=options).decode("utf-8")
+    return json.dumps(obj, default=_default, indent=2 if indent else None)
+
+def loads(text):
+    """Decode JSON text (str or bytes)."""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+def content_hash(*rows, seed=""):
+    """
+    SHA-256 of the contents of one or more rows, used to detect changed quotations.
+
+    Values are normalised with `serialize_value` and keys are sorted, so a row hashes the same
+    whether it was fetched with typed values or parsed back from tool JSON.
+
+    Args:
+        rows (dict): Rows to hash, in order.
+        seed (str): Prefix mixed into the hash, e.g. the hash of the rows a quotation depends on.
+
+    Returns:
+        str: Hex digest (64 characters).
+    """
+    digest = hashlib.sha256(seed.encode("utf-8"))
+    for row in rows:
+        for key in sorted(row):
+            digest.update(f"{key}={serialize_value(row[key])}\x1f".encode("utf-8"))
+        digest.update(b"\x1e")
+    return digest.hexdigest()
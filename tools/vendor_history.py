@@ -0,0 +1,244 @@
+import re
+import threading
+import time
+import argparse
+from datetime import datetime
+from decimal import Decimal
+from database import fold_vendor_history, fetch_vendor_history, fetch_unfolded_requirement_ids, fetch_procurement_data_bulk
+import metrics
+from config import VENDOR_HISTORY_ENABLED, VENDOR_HISTORY_TTL, BATCH_PREFETCH_SIZE
+
+# Totals kept per vendor, in the column order of `vendorhistory`
+_VENDOR_FIELDS = ("REQUIREMENTS", "QUOTES", "DELIVERY_KNOWN", "ON_TIME", "WARRANTY_SUM", "AMC_SUM", "PRICE_RANKED", "PRICE_PCT_SUM")
+
+def _number(value):
+    # Warranty/AMC may be stored as text such as "12 months"
+    if value is None:
+        return None
+    if isinstance(value, (int, float, Decimal)):
+        return float(value)
+    match = re.search(r"-?\d+(?:\.\d+)?", str(value))
+    return float(match.group()) if match else None
+
+def requirement_contributions(items, quotations, quotation_scores):
+    """
+    Compute what one requirement adds to the vendor history.
+
+    Each quotation's price is ranked against the other quotations for the same item: its
+    price percentile is 0 for the cheapest and 1 for the most expensive (ties share the
+    midpoint). Items quoted by a single vendor are not ranked. A delivery is on time when the
+    quoted DELIVERY_DATE is not after the item's REQUIRED_DATE.
+
+    Args:
+        items (list[dict]): Requirement item rows (ITEM_ID, PROD_ID, HSN_CODE).
+        quotations (list[dict]): Flat list of quotation rows (QUOT_ID, AMC, ITEM_WARRANTY).
+        quotation_scores (list): Per-quotation rule-based scores (`QuotationScore` or dicts)
+            with QUOT_ID, ITEM_ID, U_ID, LANDED_PRICE and LATE_DAYS.
+
+    Returns:
+        tuple[list[tuple], list[tuple]]: Vendor and price rows for `database.fold_vendor_history`.
+    """
+    items_by_id = {item.get("ITEM_ID"): item for item in items}
+    quotations_by_id = {quotation.get("QUOT_ID"): quotation for quotation in quotations}
+    scores = [score if isinstance(score, dict) else score.model_dump() for score in quotation_scores]
+
+    vendors = {}  # U_ID -> totals in _VENDOR_FIELDS order
+    prices = {}  # (U_ID, KEY_TYPE, KEY_VALUE) -> [PRICE_RANKED, PRICE_PCT_SUM]
+
+    by_item = {}
+    for score in scores:
+        u_id = str(score["U_ID"])
+        totals = vendors.setdefault(u_id, [1, 0, 0, 0, 0.0, 0.0, 0, 0.0])
+        totals[1] += 1
+        if score.get("LATE_DAYS") is not None:
+            totals[2] += 1
+            totals[3] += score["LATE_DAYS"] <= 0
+        quotation = quotations_by_id.get(score["QUOT_ID"], {})
+        totals[4] += _number(quotation.get("ITEM_WARRANTY")) or 0.0
+        totals[5] += _number(quotation.get("AMC")) or 0.0
+        if score.get("LANDED_PRICE") is not None:
+            by_item.setdefault(score["ITEM_ID"], []).append((score["LANDED_PRICE"], u_id))
+
+    for item_id, priced in by_item.items():
+        if len(priced) < 2:
+            continue
+        item = items_by_id.get(item_id, {})
+        keys = [("PROD_ID", item.get("PROD_ID")), ("HSN_CODE", item.get("HSN_CODE"))]
+        for price, u_id in priced:
+            cheaper = sum(1 for other, _ in priced if other < price)
+            equal = sum(1 for other, _ in priced if other == price) - 1
+            percentile = (cheaper + equal / 2) / (len(priced) - 1)
+            vendors[u_id][6] += 1
+            vendors[u_id][7] += percentile
+            for key_type, key_value in keys:
+                if key_value is None or key_value == "":
+                    continue
+                entry = prices.setdefault((u_id, key_type, str(key_value)), [0, 0.0])
+                entry[0] += 1
+                entry[1] += percentile
+
+    vendor_rows = [(u_id, *totals) for u_id, totals in vendors.items()]
+    price_rows = [(*key, ranked, pct_sum) for key, (ranked, pct_sum) in prices.items()]
+    return vendor_rows, price_rows
+
+class VendorHistoryIndex:
+    """
+    In-memory snapshot of the vendor history index.
+
+    The whole index is read in one pass and then answered from dicts, so looking up a vendor
+    during an evaluation costs no database round trip. The snapshot is reloaded once it is
+    older than `ttl` seconds (other processes may have folded requirements meanwhile), and
+    requirements folded by this process are applied to it immediately.
+    """
+
+    def __init__(self, ttl=VENDOR_HISTORY_TTL, enabled=VENDOR_HISTORY_ENABLED):
+        self.ttl = ttl
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._vendors = {}  # U_ID -> totals in _VENDOR_FIELDS order
+        self._prices = {}  # (U_ID, KEY_TYPE, KEY_VALUE) -> [PRICE_RANKED, PRICE_PCT_SUM]
+        self._loaded_at = None
+
+    def refresh(self):
+        """Reload the snapshot from the database."""
+        with metrics.span("db.fetch_vendor_history") as span:
+            vendor_rows, price_rows = fetch_vendor_history()
+            span.set(rows=len(vendor_rows) + len(price_rows))
+        vendors = {str(row[0]): [float(value) for value in row[1:]] for row in vendor_rows}
+        prices = {(str(row[0]), row[1], row[2]): [float(row[3]), float(row[4])] for row in price_rows}
+        with self._lock:
+            self._vendors, self._prices = vendors, prices
+            self._loaded_at = time.monotonic()
+
+    def _ensure_loaded(self):
+        with self._lock:
+            fresh = self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl
+        if fresh:
+            return
+        try:
+            self.refresh()
+        except Exception as e:
+            # Evaluations go on without history; try again after another TTL
+            print(f"⚠️ Could not load vendor history: {str(e)}")
+            with self._lock:
+                self._loaded_at = time.monotonic()
+
+    def lookup(self, vendor_ids, items=()):
+        """
+        Summarise the history of each vendor.
+
+        Args:
+            vendor_ids (iterable[str]): U_IDs to look up.
+            items (list[dict]): Items of the requirement being evaluated. Price competitiveness is
+                reported for their PROD_IDs, falling back to their HSN_CODEs, then to all products.
+
+        Returns:
+            dict[str, dict]: Per vendor with history, `{requirements, quotes, on_time_ratio,
+            price_percentile, avg_warranty, avg_amc}` (ratios are None when unknown).
+        """
+        if not self.enabled:
+            return {}
+        self._ensure_loaded()
+        keys = {
+            "PROD_ID": {str(item["PROD_ID"]) for item in items if item.get("PROD_ID") not in (None, "")},
+            "HSN_CODE": {str(item["HSN_CODE"]) for item in items if item.get("HSN_CODE") not in (None, "")},
+        }
+
+        history = {}
+        with self._lock:
+            for vendor_id in vendor_ids:
+                totals = self._vendors.get(str(vendor_id))
+                if totals is None:
+                    continue
+                requirements, quotes, delivery_known, on_time, warranty_sum, amc_sum, ranked, pct_sum = totals
+                for key_type in ("PROD_ID", "HSN_CODE"):
+                    matches = [self._prices[key] for key in ((str(vendor_id), key_type, value) for value in keys[key_type])
+                               if key in self._prices]
+                    if matches:
+                        ranked = sum(match[0] for match in matches)
+                        pct_sum = sum(match[1] for match in matches)
+                        break
+                history[str(vendor_id)] = {
+                    "requirements": int(requirements),
+                    "quotes": int(quotes),
+                    "on_time_ratio": round(on_time / delivery_known, 2) if delivery_known else None,
+                    "price_percentile": round(pct_sum / ranked, 2) if ranked else None,
+                    "avg_warranty": round(warranty_sum / quotes, 1) if quotes else None,
+                    "avg_amc": round(amc_sum / quotes, 1) if quotes else None,
+                }
+        return history
+
+    def fold(self, req_id, items, quotations, quotation_scores):
+        """
+        Add a requirement to the index (see `requirement_contributions`), once.
+
+        Returns:
+            bool: True if the requirement was added now, False if it was already part of the index.
+        """
+        if not self.enabled:
+            return False
+        vendor_rows, price_rows = requirement_contributions(items, quotations, quotation_scores)
+        with metrics.span("db.fold_vendor_history", req_id=req_id, vendors=len(vendor_rows)):
+            folded = fold_vendor_history(req_id, vendor_rows, price_rows)
+        if folded:
+            with self._lock:
+                if self._loaded_at is not None:
+                    for u_id, *deltas in vendor_rows:
+                        totals = self._vendors.setdefault(u_id, [0.0] * len(_VENDOR_FIELDS))
+                        for index, delta in enumerate(deltas):
+                            totals[index] += delta
+                    for u_id, key_type, key_value, ranked, pct_sum in price_rows:
+                        entry = self._prices.setdefault((u_id, key_type, key_value), [0.0, 0.0])
+                        entry[0] += ranked
+                        entry[1] += pct_sum
+        return folded
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_vendor_history():
+    """Return the process-wide vendor history index, creating it on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = VendorHistoryIndex()
+    return _index
+
+def refresh_index(frozen_before=None, page_size=BATCH_PREFETCH_SIZE):
+    """
+    Fold every requirement whose quotation window has closed and that is not in the index yet.
+
+    Used to build the index from existing data and to pick up requirements that were never
+    evaluated. Data is read with the set-based bulk fetch, `page_size` requirements at a time.
+
+    Returns:
+        int: Number of requirements folded.
+    """
+    from prescore import score_quotations  # NumPy is only needed once there is something to fold
+
+    index = get_vendor_history()
+    req_ids = fetch_unfolded_requirement_ids(frozen_before or datetime.now())
+    folded = 0
+    for start in range(0, len(req_ids), page_size):
+        for req_id, data in fetch_procurement_data_bulk(req_ids[start:start + page_size]).items():
+            if not data["quotations"]:
+                continue
+            scores = score_quotations(data["requirement"], data["items"], data["quotations"])
+            folded += index.fold(req_id, data["items"], data["quotations"], scores)
+        print(f"{min(start + page_size, len(req_ids))}/{len(req_ids)} requirement(s) checked, {folded} folded.")
+    return folded
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain and inspect the vendor history index.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    subcommands.add_parser("refresh", help="Fold every closed requirement that is not in the index yet.")
+    show = subcommands.add_parser("show", help="Print the history of vendors.")
+    show.add_argument("vendor_ids", nargs="+", help="Vendor U_IDs.")
+    args = parser.parse_args()
+
+    if args.command == "refresh":
+        refresh_index()
+    else:
+        from serialization import dumps
+        print(dumps(get_vendor_history().lookup(args.vendor_ids), indent=True))